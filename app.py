@@ -1,4 +1,4 @@
-from flask import Flask, render_template, redirect, url_for, session
+from flask import Flask, redirect, url_for, session
 from flask_cors import CORS
 from config import Config
 from models import db
@@ -7,6 +7,16 @@ from routes.customers import customers_bp
 from routes.auth import auth_bp
 from routes.messages import messages_bp
 from routes.invoices import invoices_bp
+from routes.admin import admin_bp
+from routes.reports import reports_bp
+from sql_instrumentation import init_sql_instrumentation
+from profiler import init_profiler
+from metrics import init_metrics
+from slow_query_log import init_slow_query_log
+from order_intake import init_order_intake
+from assets import init_assets
+from page_cache import init_page_cache, render_page
+from schema_migrations import pending_migrations
 import os
 from functools import wraps
 
@@ -14,6 +24,13 @@ app = Flask(__name__)
 app.config.from_object(Config)
 db.init_app(app)
 CORS(app, supports_credentials=True)
+init_sql_instrumentation(app)
+init_profiler(app)
+init_metrics(app)
+init_slow_query_log(app)
+init_order_intake(app)
+init_assets(app)
+init_page_cache(app)
 
 # 載入 API routes
 app.register_blueprint(products_bp, url_prefix="/api/products")
@@ -21,6 +38,8 @@ app.register_blueprint(customers_bp, url_prefix="/api/customers")
 app.register_blueprint(auth_bp, url_prefix="/api/auth")
 app.register_blueprint(messages_bp, url_prefix="/api/messages")
 app.register_blueprint(invoices_bp, url_prefix="/api/invoices")
+app.register_blueprint(admin_bp, url_prefix="/api/admin")
+app.register_blueprint(reports_bp, url_prefix="/api/reports")
 
 # 裝飾器：要求登入
 def login_required(f):
@@ -49,12 +68,12 @@ def index():
 @app.route("/login")
 def login_page():
     """登入頁面"""
-    return render_template("login.html")
+    return render_page("login.html")
 
 @app.route("/register")
 def register_page():
     """註冊頁面"""
-    return render_template("register.html")
+    return render_page("register.html")
 
 # Dashboard（登入後）
 @app.route("/dashboard")
@@ -62,7 +81,7 @@ def register_page():
 def dashboard():
     """根據用戶類型顯示不同的 Dashboard"""
     if session.get('user_type') == 'admin':
-        return render_template("dashboard.html")
+        return render_page("dashboard.html")
     else:
         # 普通客戶直接跳轉到 testing-input
         return redirect(url_for('testing_input_page'))
@@ -71,52 +90,56 @@ def dashboard():
 @app.route("/products")
 @admin_required
 def products_page():
-    return render_template("products.html")
+    return render_page("products.html")
 
 @app.route("/products/edit/<product_id>")
 @admin_required
 def product_edit_page(product_id):
-    return render_template("product_edit.html")
+    return render_page("product_edit.html")
 
 @app.route("/customers")
 @admin_required
 def customers_page():
-    return render_template("customers.html")
+    return render_page("customers.html")
 
 @app.route("/customers/edit/<int:customer_id>")
 @admin_required
 def customer_edit_page(customer_id):
-    return render_template("customer_edit.html")
+    return render_page("customer_edit.html")
 
 @app.route("/invoices")
 @admin_required
 def invoices_page():
-    return render_template("invoices.html")
+    return render_page("invoices.html")
 
 @app.route("/invoices/edit/<int:invoice_id>")
 @admin_required
 def invoice_edit_page(invoice_id):
-    return render_template("invoice_edit.html")
+    return render_page("invoice_edit.html")
 
 @app.route("/cutting-list")
 @admin_required
 def cutting_list_page():
-    return render_template("cutting_list.html")
+    return render_page("cutting_list.html")
 
 @app.route("/cutting-list/<date>")
 @admin_required
 def cutting_list_edit_page(date):
-    return render_template("cutting_list_edit.html")
+    return render_page("cutting_list_edit.html")
 
 # 所有用戶都可訪問的頁面
 @app.route("/testing-input")
 @login_required
 def testing_input_page():
-    return render_template("testing_input.html")
+    return render_page("testing_input.html")
 
 # 初始化數據庫
 with app.app_context():
     db.create_all()
+    # 既有數據庫的欄位與索引不在啟動時修改，需執行 migrate_db.py
+    pending = pending_migrations()
+    if pending:
+        app.logger.warning("Database has pending migrations (%s); run python migrate_db.py", ', '.join(pending))
 
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
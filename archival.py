@@ -0,0 +1,117 @@
+"""
+發票封存（hot / cold）
+- archive_invoices：把送貨日期早於 cutoff 的 Completed / Cancelled 發票連同訂單項目，以 INSERT ... SELECT 與 DELETE
+  分批搬到 invoices_archive / order_items_archive，每批一個交易；保留原本的 id，封存後唯讀
+  （SQLite 的 invoices / order_items 需使用 AUTOINCREMENT，新資料才不會重用封存資料的 id）
+- 查詢輔助：find_invoice / invoice_tables / include_archived_arg 讓既有的 GET 與 PDF 端點以 include_archived=1 讀取封存資料
+- 銷售彙總（sales_daily）已包含這些發票，封存時不需要調整
+"""
+
+from datetime import date, timedelta
+
+from flask import request, abort
+
+from models import db, Invoice, OrderItem, ArchivedInvoice, ArchivedOrderItem
+from db_utils import sqlite_autoincrement_missing
+
+ARCHIVABLE_STATUSES = ('Completed', 'Cancelled')
+
+INVOICE_COLUMNS = ['id', 'invoice_number', 'customer_id', 'delivery_date', 'created_date', 'status',
+                   'total_amount', 'version']
+ORDER_ITEM_COLUMNS = ['id', 'invoice_id', 'product_id', 'quantity', 'unit_price', 'total_price']
+
+
+def include_archived_arg():
+    return request.args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
+def invoice_tables(include_archived=False):
+    """依序回傳要查詢的 (發票 model, 訂單項目 model, 是否為封存表)"""
+    tables = [(Invoice, OrderItem, False)]
+    if include_archived:
+        tables.append((ArchivedInvoice, ArchivedOrderItem, True))
+    return tables
+
+
+def find_invoice(invoice_id, include_archived=False):
+    """依 id 取得發票；include_archived 時找不到會再查封存表，都沒有時 404"""
+    invoice = db.session.get(Invoice, invoice_id)
+    if invoice is None and include_archived:
+        invoice = db.session.get(ArchivedInvoice, invoice_id)
+    if invoice is None:
+        abort(404)
+    return invoice
+
+
+def archive_cutoff(days):
+    return date.today() - timedelta(days=days)
+
+
+def archivable(cutoff):
+    return db.and_(Invoice.status.in_(ARCHIVABLE_STATUSES), Invoice.delivery_date < cutoff)
+
+
+def archive_batch(invoice_ids, cutoff):
+    """在同一交易中搬移一批發票並提交，回傳 (發票數, 訂單項目數)"""
+    # 在兩次查詢之間被改回 Pending 的發票不會被搬移
+    moved = db.select(ArchivedInvoice.id).where(ArchivedInvoice.id.in_(invoice_ids))
+    invoices = db.session.execute(
+        db.insert(ArchivedInvoice).from_select(
+            INVOICE_COLUMNS,
+            db.select(*(getattr(Invoice, c) for c in INVOICE_COLUMNS))
+            .where(Invoice.id.in_(invoice_ids), archivable(cutoff))
+        )
+    ).rowcount
+    items = db.session.execute(
+        db.insert(ArchivedOrderItem).from_select(
+            ORDER_ITEM_COLUMNS,
+            db.select(*(getattr(OrderItem, c) for c in ORDER_ITEM_COLUMNS))
+            .where(OrderItem.invoice_id.in_(moved))
+        )
+    ).rowcount
+    db.session.execute(
+        db.delete(OrderItem).where(OrderItem.invoice_id.in_(moved))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.delete(Invoice).where(Invoice.id.in_(moved))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return invoices, items
+
+
+def archive_invoices(cutoff, batch_size=500, dry_run=False):
+    """
+    封存送貨日期早於 cutoff 的 Completed / Cancelled 發票，依 id 分批處理
+    回傳 {'invoices': 封存的發票數, 'items': 封存的訂單項目數, 'batches': 交易數}
+    """
+    if sqlite_autoincrement_missing(Invoice.__tablename__) or sqlite_autoincrement_missing(OrderItem.__tablename__):
+        # 否則新發票可能重用已封存發票的 id
+        raise RuntimeError("invoices / order_items must use AUTOINCREMENT before archiving; run python migrate_db.py")
+    totals = {'invoices': 0, 'items': 0, 'batches': 0}
+    last_id = 0
+    while True:
+        query = (
+            db.select(Invoice.id)
+            .where(Invoice.id > last_id, archivable(cutoff))
+            .order_by(Invoice.id)
+            .limit(batch_size)
+        )
+        invoice_ids = db.session.scalars(query.with_for_update(skip_locked=True)).all()
+        if not invoice_ids:
+            db.session.rollback()
+            break
+        last_id = invoice_ids[-1]
+
+        if dry_run:
+            totals['invoices'] += len(invoice_ids)
+            totals['items'] += db.session.query(db.func.count(OrderItem.id)).filter(
+                OrderItem.invoice_id.in_(invoice_ids)).scalar()
+            db.session.rollback()
+        else:
+            invoices, items = archive_batch(invoice_ids, cutoff)
+            totals['invoices'] += invoices
+            totals['items'] += items
+        totals['batches'] += 1
+    return totals
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+封存舊發票
+把送貨日期早於 --days 天（預設 ARCHIVE_AFTER_DAYS）的 Completed / Cancelled 發票連同訂單項目
+移到 invoices_archive / order_items_archive，每 --batch-size 張發票一個交易
+封存後仍可透過 API 以 include_archived=1 讀取
+
+用法:
+    python archive_invoices.py
+    python archive_invoices.py --days 365 --batch-size 1000
+    python archive_invoices.py --dry-run
+"""
+
+import argparse
+import time
+
+from app import app
+from archival import archive_cutoff, archive_invoices
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move old completed and cancelled invoices to the archive tables')
+    parser.add_argument('--days', type=int, default=app.config.get('ARCHIVE_AFTER_DAYS', 180),
+                        help='封存送貨日期早於幾天前的發票')
+    parser.add_argument('--batch-size', type=int, default=app.config.get('ARCHIVE_BATCH_SIZE', 500),
+                        help='每個交易搬移的發票數')
+    parser.add_argument('--dry-run', action='store_true', help='只計算數量，不搬移')
+    args = parser.parse_args()
+
+    cutoff = archive_cutoff(args.days)
+    print(f"\n🗄️  Archiving invoices delivered before {cutoff}{' (dry run)' if args.dry_run else ''}...")
+    start = time.perf_counter()
+    with app.app_context():
+        totals = archive_invoices(cutoff, args.batch_size, args.dry_run)
+    print(f"  ✅ {totals['invoices']} invoices, {totals['items']} order items "
+          f"in {totals['batches']} batches ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
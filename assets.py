@@ -0,0 +1,63 @@
+"""
+靜態資源指紋與預壓縮（由 build_assets.py 產生）
+- 模板中以 asset_url('js/invoices.js') 引用：有 manifest 時回傳含內容雜湊的 /assets/ 網址，否則回傳 /static/ 的原始檔
+- /assets/<filename> 依 Accept-Encoding 回傳 .br / .gz 預壓縮檔；內容變更時檔名也會變，因此以 immutable 長期快取
+- 開發模式（app.debug）一律使用原始檔，修改 JS / CSS 後不需要重新建置
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import current_app, request, send_file, url_for, abort
+from werkzeug.security import safe_join
+
+MANIFEST_NAME = 'manifest.json'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def load_manifest(build_dir):
+    """{原始路徑: 含雜湊的路徑}；尚未建置時為空"""
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(path):
+    manifest = current_app.extensions['assets']['manifest']
+    if path in manifest and not current_app.debug:
+        return url_for('assets', filename=manifest[path])
+    return url_for('static', filename=path)
+
+
+def serve_asset(filename):
+    path = safe_join(current_app.config['ASSET_BUILD_DIR'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] and os.path.isfile(path + suffix):
+            encoding, path = name, path + suffix
+            break
+
+    max_age = current_app.config.get('ASSET_MAX_AGE', 365 * 24 * 3600)
+    response = send_file(path, mimetype=mimetype, max_age=max_age, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """註冊 asset_url 模板函式與 /assets/ 路由"""
+    state = {'manifest': load_manifest(app.config['ASSET_BUILD_DIR'])}
+    app.add_template_global(asset_url)
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.extensions['assets'] = state
+    return state
@@ -0,0 +1,29 @@
+"""
+依 id 列表批次查詢（GET /api/products/?ids=、/api/customers/?ids=、/api/invoices/?ids=）
+- 以單一 IN 查詢取得所有記錄，依請求中的順序回傳；找不到的 id 也會有一筆 found: false 的結果
+- 一次最多 BATCH_GET_MAX_IDS 個 id
+"""
+
+from flask import request, current_app, jsonify
+
+
+def parse_ids_arg(cast=str):
+    """解析 ids=a,b,c（保留順序與重複的 id）；格式錯誤或數量超過上限時引發 ValueError"""
+    ids = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+    if not ids:
+        raise ValueError("ids is required!")
+    max_ids = current_app.config.get('BATCH_GET_MAX_IDS', 500)
+    if len(ids) > max_ids:
+        raise ValueError(f"Cannot fetch more than {max_ids} ids at once!")
+    try:
+        return [cast(value) for value in ids]
+    except ValueError:
+        raise ValueError("ids contains an invalid id!")
+
+
+def batch_response(ids, records, key):
+    """records 為 {id: 記錄 dict}；依請求順序回傳 results 與找不到的 not_found"""
+    return jsonify({
+        'results': [{'id': record_id, 'found': record_id in records, key: records.get(record_id)} for record_id in ids],
+        'not_found': list(dict.fromkeys(record_id for record_id in ids if record_id not in records))
+    })
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+API 效能基準測試腳本
+在臨時 SQLite 數據庫中生成不同規模的數據集，
+透過 Flask test client 逐一驅動 routes/ 中的 API 端點，
+記錄 p50 / p95 / p99 延遲、SQL 查詢次數與峰值記憶體，結果存為 JSON。
+
+用法:
+    python benchmark.py                              # 預設規模 200,2000,10000
+    python benchmark.py --sizes 500,5000 --iterations 30
+    python benchmark.py --output bench.json --compare baseline.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+# 必須在載入 app 之前指定數據庫，避免覆蓋開發數據庫
+_bench_dir = tempfile.mkdtemp(prefix='bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_bench_dir, 'bench.db')}"
+# 背景下單 worker 會定期輪詢數據庫，干擾各端點的查詢數統計
+os.environ['ORDER_INTAKE_WORKER'] = '0'
+
+from sqlalchemy import event, insert
+from werkzeug.security import generate_password_hash
+
+from app import app
+from models import db, Product, Customer, Invoice, OrderItem, Admin, Message
+from rollups import rebuild_sales_rollup
+
+SUBCLASSES = ['Beef', 'Chicken', 'Lamb', 'Pork', 'Seafood']
+BASE_DATE = date(2030, 1, 1)
+DELIVERY_DAYS = 30
+BENCH_PASSWORD = 'bench1234'
+
+
+class QueryCounter:
+    """以 SQLAlchemy 事件統計 SQL 執行次數"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentile(samples, pct):
+    """最近秩法百分位數（秩 = ceil(pct / 100 * n)，限制在 1..n）"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def seed_dataset(size, rng):
+    """生成指定規模的數據集（size = 發票數量）"""
+    db.drop_all()
+    db.create_all()
+
+    product_count = max(10, size // 10)
+    customer_count = max(5, size // 20)
+
+    products = [{
+        'id': f'P{i:05d}',
+        'name': f'{SUBCLASSES[i % len(SUBCLASSES)]} Cut {i}',
+        'price': round(rng.uniform(5, 60), 2),
+        'subclass': SUBCLASSES[i % len(SUBCLASSES)]
+    } for i in range(product_count)]
+    db.session.execute(insert(Product), products)
+
+    # 所有客戶共用同一個密碼雜湊，避免生成數據時花費大量時間
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    customers = [{
+        'id': i + 1,
+        'name': f'Customer {i + 1}',
+        'email': f'customer{i + 1}@bench.local',
+        'password': password_hash,
+        'special_item_ids': '[]'
+    } for i in range(customer_count)]
+    db.session.execute(insert(Customer), customers)
+
+    admin = Admin(username='bench_admin', email='bench_admin@bench.local')
+    admin.set_password(BENCH_PASSWORD)
+    db.session.add(admin)
+
+    db.session.execute(insert(Message), [
+        {'user': f'user{i % 7}', 'content': f'message {i}'} for i in range(max(20, size // 10))
+    ])
+
+    price_by_id = {p['id']: p['price'] for p in products}
+    invoices = []
+    items = []
+    item_id = 1
+    used_keys = set()
+    for invoice_id in range(1, size + 1):
+        # 每個 (客戶, 日期) 只保留一張 Pending 發票，與合併邏輯一致
+        while True:
+            customer_id = rng.randint(1, customer_count)
+            delivery_date = BASE_DATE + timedelta(days=rng.randrange(DELIVERY_DAYS))
+            status = rng.choice(['Pending', 'Completed', 'Completed', 'Cancelled'])
+            if status != 'Pending' or (customer_id, delivery_date) not in used_keys:
+                break
+        if status == 'Pending':
+            used_keys.add((customer_id, delivery_date))
+
+        total = 0.0
+        for product in rng.sample(products, rng.randint(1, 5)):
+            quantity = rng.randint(1, 10)
+            unit_price = price_by_id[product['id']]
+            items.append({
+                'id': item_id,
+                'invoice_id': invoice_id,
+                'product_id': product['id'],
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total_price': unit_price * quantity
+            })
+            item_id += 1
+            total += unit_price * quantity
+
+        invoices.append({
+            'id': invoice_id,
+            'invoice_number': f'INV-BENCH-{invoice_id:06d}',
+            'customer_id': customer_id,
+            'delivery_date': delivery_date,
+            'created_date': datetime(2029, 12, 1) + timedelta(minutes=invoice_id),
+            'status': status,
+            'total_amount': total
+        })
+
+    db.session.execute(insert(Invoice), invoices)
+    db.session.execute(insert(OrderItem), items)
+    db.session.commit()
+    rebuild_sales_rollup()
+
+    pending = sorted(used_keys)
+    return {
+        'products': [p['id'] for p in products],
+        'customer_count': customer_count,
+        'invoice_count': size,
+        'item_count': len(items),
+        'pending_keys': pending,
+    }
+
+
+def build_scenarios(dataset, rng):
+    """建立各端點的請求產生器，回傳 (名稱, 產生函數) 列表"""
+    products = dataset['products']
+    customer_count = dataset['customer_count']
+    invoice_count = dataset['invoice_count']
+    pending_keys = dataset['pending_keys']
+    busiest_date = (BASE_DATE + timedelta(days=DELIVERY_DAYS // 2)).strftime('%Y-%m-%d')
+    create_counter = iter(range(1, 10 ** 9))
+
+    def cart(count):
+        return [{'product_id': p, 'quantity': rng.randint(1, 5)}
+                for p in rng.sample(products, count)]
+
+    def create_new():
+        # 使用全新的送貨日期，確保每次都建立新發票
+        day = BASE_DATE + timedelta(days=DELIVERY_DAYS + next(create_counter))
+        return ('POST', '/api/invoices/create', {
+            'customer_id': rng.randint(1, customer_count),
+            'delivery_date': day.strftime('%Y-%m-%d'),
+            'items': cart(3)
+        })
+
+    def create_merge():
+        customer_id, delivery_date = rng.choice(pending_keys)
+        return ('POST', '/api/invoices/create', {
+            'customer_id': customer_id,
+            'delivery_date': delivery_date.strftime('%Y-%m-%d'),
+            'items': cart(2)
+        })
+
+    def update_invoice():
+        invoice_id = rng.randint(1, invoice_count)
+        with app.app_context():
+            item_ids = [i.id for i in OrderItem.query.filter_by(invoice_id=invoice_id).all()]
+        return ('PUT', f'/api/invoices/{invoice_id}', {
+            'items': [{'id': i, 'quantity': rng.randint(1, 10)} for i in item_ids]
+        })
+
+    return [
+        ('auth.login', lambda: ('POST', '/api/auth/login',
+                                {'username': 'bench_admin', 'password': BENCH_PASSWORD})),
+        ('auth.check_session', lambda: ('GET', '/api/auth/check-session', None)),
+        ('messages.get_messages', lambda: ('GET', '/api/messages/', None)),
+        ('messages.add_message', lambda: ('POST', '/api/messages/',
+                                          {'user': 'bench', 'content': 'hello'})),
+        ('products.get_products', lambda: ('GET', '/api/products/', None)),
+        ('products.search', lambda: ('GET', f'/api/products/?search=Cut {rng.randint(0, 9)}&limit=20', None)),
+        ('products.get_product', lambda: ('GET', f'/api/products/{rng.choice(products)}', None)),
+        ('customers.get_customers', lambda: ('GET', '/api/customers/', None)),
+        ('customers.search', lambda: ('GET', f'/api/customers/?search=Customer {rng.randint(1, 9)}&limit=20', None)),
+        ('customers.get_customer', lambda: ('GET', f'/api/customers/{rng.randint(1, customer_count)}', None)),
+        ('invoices.get_invoices', lambda: ('GET', '/api/invoices/', None)),
+        ('invoices.get_invoices_by_date', lambda: ('GET', f'/api/invoices/?date={busiest_date}', None)),
+        ('invoices.search', lambda: ('GET', f'/api/invoices/?search=Customer {rng.randint(1, 9)}', None)),
+        ('invoices.get_invoice', lambda: ('GET', f'/api/invoices/{rng.randint(1, invoice_count)}', None)),
+        ('invoices.create', create_new),
+        ('invoices.create_merge', create_merge),
+        ('invoices.intake', lambda: ('POST', '/api/invoices/intake', create_merge()[2])),
+        ('invoices.update', update_invoice),
+        ('invoices.invoice_pdf', lambda: ('GET', f'/api/invoices/{rng.randint(1, invoice_count)}/pdf', None)),
+        ('invoices.cutting_list_pdf', lambda: ('GET', f'/api/invoices/cutting-list/{busiest_date}/pdf', None)),
+        ('invoices.cutting_list_range_pdf', lambda: ('GET', '/api/invoices/cutting-list/pdf'
+                                                           f'?from={BASE_DATE}&to={BASE_DATE + timedelta(days=6)}', None)),
+        ('invoices.production', lambda: ('GET', f'/api/invoices/production?date={busiest_date}', None)),
+        ('reports.sales', lambda: ('GET', '/api/reports/sales?group_by=subclass,day'
+                                          f'&from={BASE_DATE}&to={BASE_DATE + timedelta(days=DELIVERY_DAYS)}', None)),
+    ]
+
+
+def run_scenario(client, counter, make_request, iterations, warmup):
+    """執行單一端點並收集延遲、查詢數與峰值記憶體"""
+
+    def call():
+        method, url, payload = make_request()
+        response = client.open(url, method=method, json=payload)
+        response.get_data()
+        return response.status_code
+
+    for _ in range(warmup):
+        call()
+
+    latencies = []
+    queries = []
+    statuses = {}
+    for _ in range(iterations):
+        counter.count = 0
+        start = time.perf_counter()
+        status = call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    # tracemalloc 會拖慢執行，因此峰值記憶體另外量測一次
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'queries_p50': percentile(queries, 50),
+        'queries_max': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'status_codes': statuses,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current, baseline_path, threshold):
+    """與舊結果比較 p95 延遲與查詢次數，列出退化的端點"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\n📊 Comparing with {baseline_path} (commit {baseline.get('commit')})")
+    for size, endpoints in current['results'].items():
+        old_endpoints = baseline.get('results', {}).get(size, {})
+        for name, stats in endpoints.items():
+            old = old_endpoints.get(name)
+            if not old:
+                continue
+            ratio = stats['p95_ms'] / old['p95_ms'] if old['p95_ms'] else 1.0
+            query_delta = stats['queries_p50'] - old['queries_p50']
+            marker = '  '
+            if ratio > 1 + threshold or query_delta > 0:
+                marker = '❌'
+                regressions.append((size, name))
+            elif ratio < 1 - threshold or query_delta < 0:
+                marker = '✅'
+            print(f"  {marker} [{size}] {name:<32} p95 {old['p95_ms']:>9.2f} → {stats['p95_ms']:>9.2f} ms"
+                  f"  queries {old['queries_p50']:>5} → {stats['queries_p50']:>5}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark API endpoints against generated datasets')
+    parser.add_argument('--sizes', default='200,2000,10000', help='逗號分隔的發票數量')
+    parser.add_argument('--iterations', type=int, default=20, help='每個端點的量測次數')
+    parser.add_argument('--warmup', type=int, default=2, help='每個端點的暖身次數')
+    parser.add_argument('--only', default='', help='只執行名稱包含此字串的端點')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='要比較的舊結果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p95 退化判定比例')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': sys.version.split()[0],
+        'iterations': args.iterations,
+        'datasets': {},
+        'results': {},
+    }
+
+    print("=" * 60)
+    print("⏱️  API BENCHMARK")
+    print("=" * 60)
+
+    for size in sizes:
+        rng = random.Random(args.seed)
+        with app.app_context():
+            print(f"\n🌱 Seeding dataset with {size} invoices...")
+            dataset = seed_dataset(size, rng)
+            counter = QueryCounter()
+            event.listen(db.engine, 'before_cursor_execute', counter)
+
+        report['datasets'][str(size)] = {
+            'products': len(dataset['products']),
+            'customers': dataset['customer_count'],
+            'invoices': dataset['invoice_count'],
+            'order_items': dataset['item_count'],
+        }
+        results = report['results'][str(size)] = {}
+
+        client = app.test_client()
+        try:
+            for name, make_request in build_scenarios(dataset, rng):
+                if args.only and args.only not in name:
+                    continue
+                stats = run_scenario(client, counter, make_request, args.iterations, args.warmup)
+                results[name] = stats
+                print(f"  {name:<32} p50 {stats['p50_ms']:>9.2f}  p95 {stats['p95_ms']:>9.2f}"
+                      f"  p99 {stats['p99_ms']:>9.2f} ms  queries {stats['queries_p50']:>5}"
+                      f"  peak {stats['peak_memory_kb']:>9.1f} KB")
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', counter)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare_results(report, args.compare, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) detected")
+            sys.exit(1)
+        print("\n✅ No regressions detected")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+建置靜態資源（部署時執行一次）
+把 static/ 底下的 .css / .js 複製到 ASSET_BUILD_DIR，檔名加上內容雜湊（例如 js/invoices.3f9a1c2b7d4e.js），
+並為每個檔案產生 .gz 與 .br 預壓縮檔，最後寫出 manifest.json（原始路徑 -> 含雜湊的路徑）
+
+未安裝 brotli 套件時只產生 .gz
+
+用法:
+    python build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from config import BASE_DIR, Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+ASSET_EXTENSIONS = ('.css', '.js')
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+
+
+def source_files(build_dir):
+    """static/ 底下所有 .css / .js 的相對路徑（略過建置輸出目錄本身）"""
+    for directory, subdirs, files in os.walk(STATIC_DIR):
+        subdirs[:] = sorted(d for d in subdirs if os.path.join(directory, d) != build_dir)
+        for name in sorted(files):
+            if name.endswith(ASSET_EXTENSIONS):
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+
+
+def fingerprint_name(path, content):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def write_asset(build_dir, name, content):
+    """寫出原始檔與預壓縮檔，回傳各檔案大小"""
+    target = os.path.join(build_dir, *name.split('/'))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    sizes = {'raw': len(content)}
+    with open(target, 'wb') as f:
+        f.write(content)
+    # mtime=0 讓相同內容每次建置出相同的 .gz
+    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+    with open(target + '.gz', 'wb') as f:
+        f.write(compressed)
+    sizes['gzip'] = len(compressed)
+    if brotli is not None:
+        compressed = brotli.compress(content, quality=11)
+        with open(target + '.br', 'wb') as f:
+            f.write(compressed)
+        sizes['br'] = len(compressed)
+    return sizes
+
+
+def build(build_dir):
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    manifest = {}
+    for path in source_files(build_dir):
+        with open(os.path.join(STATIC_DIR, *path.split('/')), 'rb') as f:
+            content = f.read()
+        name = fingerprint_name(path, content)
+        sizes = write_asset(build_dir, name, content)
+        manifest[path] = name
+        print(f"  {name:<48} " + '  '.join(f"{k} {v:>7,}" for k, v in sizes.items()))
+
+    with open(os.path.join(build_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main():
+    build_dir = os.path.abspath(Config.ASSET_BUILD_DIR)
+    print("=" * 60)
+    print("📦 BUILDING STATIC ASSETS")
+    print("=" * 60)
+    print(f"  {STATIC_DIR} -> {build_dir}")
+    if brotli is None:
+        print("  ⚠️  brotli is not installed, only .gz files will be written")
+    manifest = build(build_dir)
+    print(f"\n✅ {len(manifest)} asset(s) written to {MANIFEST_NAME}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
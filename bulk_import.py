@@ -0,0 +1,80 @@
+"""
+CSV 批次匯入共用工具（產品、客戶）
+- read_csv_chunks：逐行解析上傳的 CSV，不整份載入記憶體，每 chunk_size 列回傳一批
+- ImportReport：累計新增／更新筆數與逐列錯誤
+- hash_passwords：在 process pool 中計算密碼雜湊
+"""
+
+import csv
+import io
+
+from flask import request, current_app
+from werkzeug.security import generate_password_hash
+
+from workers import process_pool
+
+IMPORT_MODES = ('upsert', 'insert')
+
+
+def upload_stream():
+    """上傳的 CSV：multipart 的 file 欄位，或直接以 text/csv 作為 request body"""
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        return upload.stream if upload else None
+    if request.mimetype in ('text/csv', 'text/plain', 'application/csv'):
+        return request.stream
+    return None
+
+
+def read_csv_chunks(stream, required_columns, chunk_size):
+    """
+    逐批產生 [(行號, {欄位: 值}), ...]，欄位名稱不分大小寫
+    缺少必要欄位時引發 ValueError
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [name.strip().lower() for name in next(reader, [])]
+    missing = [name for name in required_columns if name not in header]
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+
+    chunk = []
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        chunk.append((reader.line_num, {name: value.strip() for name, value in zip(header, values)}))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def error(self, line, key, message):
+        self.errors.append({'line': line, 'key': key, 'message': message})
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda e: (e['line'] is None, e['line'] or 0))
+        }
+
+
+def hash_passwords(passwords):
+    """批次計算密碼雜湊（PASSWORD_HASH_WORKERS > 1 時在 process pool 中平行計算）"""
+    passwords = list(passwords)
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 1)
+    pool = process_pool('password_hash', workers) if len(passwords) > 1 else None
+    if pool is None:
+        return [generate_password_hash(password) for password in passwords]
+    return list(pool.map(generate_password_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
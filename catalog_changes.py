@@ -0,0 +1,140 @@
+"""
+產品與客戶的變更記錄與增量同步（GET /api/products/changes、/api/customers/changes）
+- 新增、修改、刪除與 CSV 匯入在同一交易中寫入 catalog_changes，記錄的 id 即為單調遞增的版本號
+  （寫入前取得 lock_change_log，id 依提交順序遞增，讀取端不會跳過較晚提交的變更）
+- since=<version> 只回傳此版本之後有變更的資料：upserts 為目前的完整資料，deletes 為已刪除的 id
+- 未帶 since（第一次同步）、since 比最後一次壓縮清除的版本舊，或不是此數據庫的版本時回傳 reset: true 與完整資料
+- 壓縮：刪除已被同一筆資料較新記錄取代的記錄，以及超過 CATALOG_CHANGE_RETENTION_DAYS 的刪除記錄
+  （每個行程最多每 CATALOG_COMPACT_INTERVAL 秒執行一次）
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from flask import request, current_app, jsonify
+
+from models import db, CatalogChange, CatalogCompaction
+from db_utils import lock_change_log
+
+_last_compact = 0.0
+
+
+def record_catalog_changes(entity, entity_ids, action='upsert'):
+    """在同一交易中寫入變更記錄（entity 為 product 或 customer，action 為 upsert 或 delete）"""
+    now = datetime.utcnow()
+    rows = [
+        {'entity': entity, 'entity_id': str(entity_id), 'action': action, 'created_at': now}
+        for entity_id in dict.fromkeys(entity_ids)
+    ]
+    if rows:
+        lock_change_log(CatalogChange.__tablename__)
+        db.session.execute(db.insert(CatalogChange), rows)
+
+
+def floor_version():
+    return db.session.query(db.func.max(CatalogCompaction.floor_version)).scalar() or 0
+
+
+def current_version():
+    return max(db.session.query(db.func.max(CatalogChange.id)).scalar() or 0, floor_version())
+
+
+def compact_catalog_changes(retention_days):
+    """壓縮變更記錄並提交，回傳 {'superseded': 數量, 'expired': 數量, 'floor_version': 版本}"""
+    latest = (
+        db.select(db.func.max(CatalogChange.id))
+        .group_by(CatalogChange.entity, CatalogChange.entity_id)
+    )
+    superseded = db.session.execute(
+        db.delete(CatalogChange)
+        .where(CatalogChange.id.not_in(latest))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    # 刪除記錄清除後，比它舊的客戶端無法得知資料已刪除，需要重新取得完整資料
+    expired_condition = db.and_(
+        CatalogChange.action == 'delete',
+        CatalogChange.created_at < datetime.utcnow() - timedelta(days=retention_days)
+    )
+    expired_version = db.session.query(db.func.max(CatalogChange.id)).filter(expired_condition).scalar()
+    expired = 0
+    if expired_version is not None:
+        expired = db.session.execute(
+            db.delete(CatalogChange)
+            .where(expired_condition, CatalogChange.id <= expired_version)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    if superseded or expired:
+        db.session.add(CatalogCompaction(
+            floor_version=max(expired_version or 0, floor_version()),
+            superseded=superseded,
+            expired=expired
+        ))
+    db.session.commit()
+    return {'superseded': superseded, 'expired': expired, 'floor_version': floor_version()}
+
+
+def maybe_compact():
+    """每個行程最多每 CATALOG_COMPACT_INTERVAL 秒壓縮一次"""
+    global _last_compact
+    now = time.monotonic()
+    if now - _last_compact < current_app.config.get('CATALOG_COMPACT_INTERVAL', 3600):
+        return
+    _last_compact = now
+    compact_catalog_changes(current_app.config.get('CATALOG_CHANGE_RETENTION_DAYS', 30))
+
+
+def changes_response(entity, model, to_dict, cast=str):
+    """
+    GET .../changes?since=<version>&limit=<n>
+    回傳 {version, reset, upserts, deletes, has_more}；has_more 時以回傳的 version 繼續查詢
+    """
+    maybe_compact()
+    since = request.args.get('since', type=int)
+    max_limit = current_app.config.get('CATALOG_CHANGES_MAX_LIMIT', 1000)
+    limit = min(request.args.get('limit', max_limit, type=int), max_limit)
+    if limit < 1:
+        return jsonify({"message": "limit must be positive!"}), 400
+
+    version = current_version()
+    if since is None or since < 0 or since < floor_version() or since > version:
+        # 先取得版本再讀取資料；之間的變更會在下次同步時重送（upsert 可重複套用）
+        return jsonify({
+            'version': version,
+            'reset': True,
+            'upserts': [to_dict(record) for record in model.query.order_by(model.id)],
+            'deletes': [],
+            'has_more': False
+        })
+
+    changes = db.session.execute(
+        db.select(CatalogChange.id, CatalogChange.entity_id, CatalogChange.action)
+        .where(CatalogChange.entity == entity, CatalogChange.id > since)
+        .order_by(CatalogChange.id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        version = changes[-1].id
+    elif changes:
+        version = max(version, changes[-1].id)
+
+    # 同一筆資料在此範圍內多次變更時只取最後一次
+    actions = {}
+    for change in changes:
+        actions.pop(change.entity_id, None)
+        actions[change.entity_id] = change.action
+    upsert_ids = [cast(entity_id) for entity_id, action in actions.items() if action == 'upsert']
+    records = {}
+    if upsert_ids:
+        records = {record.id: record for record in model.query.filter(model.id.in_(upsert_ids))}
+
+    return jsonify({
+        'version': version,
+        'reset': False,
+        # 讀取時已被刪除的資料略過，其刪除記錄的版本較新，會在之後回傳
+        'upserts': [to_dict(records[entity_id]) for entity_id in upsert_ids if entity_id in records],
+        'deletes': [cast(entity_id) for entity_id, action in actions.items() if action == 'delete'],
+        'has_more': has_more
+    })
@@ -1,5 +1,7 @@
 import os
 
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     # 秘密金鑰
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-please-change-in-production'
@@ -24,4 +26,86 @@ class Config:
     
     # CORS 設置
     CORS_HEADERS = 'Content-Type'
-    CORS_SUPPORTS_CREDENTIALS = True
\ No newline at end of file
+    CORS_SUPPORTS_CREDENTIALS = True
+    
+    # SQL 監控（Server-Timing 標頭與 N+1 偵測）
+    SQL_TIMING_ENABLED = os.environ.get('SQL_TIMING_ENABLED', '1') == '1'
+    SQL_DEBUG = os.environ.get('SQL_DEBUG', '0') == '1'
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    # X-SQL-Summary 標頭上限（位元組），常見代理的標頭上限為 8 KB
+    SQL_SUMMARY_HEADER_MAX = int(os.environ.get('SQL_SUMMARY_HEADER_MAX', 4096))
+    
+    # 請求分析器（X-Profile 標頭、取樣率或管理員開關）
+    PROFILER_DIR = os.environ.get('PROFILER_DIR') or os.path.join(BASE_DIR, 'instance', 'profiles')
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+    PROFILER_INTERVAL = float(os.environ.get('PROFILER_INTERVAL', 0.005))  # 秒
+    PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', 200))
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+    
+    # Prometheus /metrics（各 worker 定期寫入共用目錄後彙整）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(BASE_DIR, 'instance', 'metrics')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))  # 秒
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # 慢查詢記錄（未設定門檻時停用）
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ['SLOW_QUERY_THRESHOLD_MS']) if os.environ.get('SLOW_QUERY_THRESHOLD_MS') else None
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE') or os.path.join(BASE_DIR, 'instance', 'slow_queries.log')
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUP_COUNT = int(os.environ.get('SLOW_QUERY_LOG_BACKUP_COUNT', 5))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '1') == '1'
+    
+    # Server-Sent Events（串流在 SSE_MAX_DURATION 後結束，瀏覽器會自動以 Last-Event-ID 重連）
+    # 每個串流占用一個 worker 執行緒；每個行程同時最多 SSE_MAX_STREAMS 個，需小於 gunicorn 的 --threads
+    SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 2))  # 秒
+    SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))
+    SSE_MAX_DURATION = float(os.environ.get('SSE_MAX_DURATION', 300))
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 8))
+    MESSAGES_MAX_LIMIT = int(os.environ.get('MESSAGES_MAX_LIMIT', 500))
+    
+    # PDF 輸出超過此大小時改寫到磁碟暫存檔（bytes）
+    PDF_SPOOL_MAX_SIZE = int(os.environ.get('PDF_SPOOL_MAX_SIZE', 5 * 1024 * 1024))
+    
+    # 多日 Cutting List：單次最多天數、平行生成 PDF 的 worker process 數（1 表示不使用 process pool）
+    CUTTING_LIST_MAX_DAYS = int(os.environ.get('CUTTING_LIST_MAX_DAYS', 31))
+    CUTTING_LIST_WORKERS = int(os.environ.get('CUTTING_LIST_WORKERS', min(4, os.cpu_count() or 1)))
+    
+    # CSV / NDJSON 匯出每批從 server-side cursor 讀取的列數
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+    
+    # CSV 批次匯入：每批驗證與寫入的列數、計算密碼雜湊的 worker process 數（1 表示不使用 process pool）
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    
+    # 非同步下單佇列（POST /api/invoices/intake）的背景 worker
+    ORDER_INTAKE_WORKER = os.environ.get('ORDER_INTAKE_WORKER', '1') == '1'
+    ORDER_INTAKE_BATCH_SIZE = int(os.environ.get('ORDER_INTAKE_BATCH_SIZE', 50))
+    ORDER_INTAKE_POLL_INTERVAL = float(os.environ.get('ORDER_INTAKE_POLL_INTERVAL', 1))  # 秒
+    ORDER_INTAKE_CLAIM_TIMEOUT = float(os.environ.get('ORDER_INTAKE_CLAIM_TIMEOUT', 300))  # 秒
+    ORDER_INTAKE_MAX_ATTEMPTS = int(os.environ.get('ORDER_INTAKE_MAX_ATTEMPTS', 3))
+    
+    # Idempotency-Key：儲存第一次回應的時間、處理中紀錄視為中斷的時間、清除過期紀錄的間隔（秒）
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 24 * 3600))
+    IDEMPOTENCY_PENDING_TIMEOUT = int(os.environ.get('IDEMPOTENCY_PENDING_TIMEOUT', 60))
+    IDEMPOTENCY_PURGE_INTERVAL = int(os.environ.get('IDEMPOTENCY_PURGE_INTERVAL', 300))
+    IDEMPOTENCY_SPOOL_MAX_SIZE = int(os.environ.get('IDEMPOTENCY_SPOOL_MAX_SIZE', 5 * 1024 * 1024))  # 計算上傳內容雜湊時暫存於記憶體的上限（bytes）
+    
+    # 靜態資源：build_assets.py 輸出含內容雜湊的檔名與 .gz / .br 預壓縮檔的目錄（不存在時直接使用 static/ 的原始檔）
+    ASSET_BUILD_DIR = os.environ.get('ASSET_BUILD_DIR') or os.path.join(BASE_DIR, 'static', 'dist')
+    ASSET_MAX_AGE = int(os.environ.get('ASSET_MAX_AGE', 365 * 24 * 3600))  # 秒
+    
+    # 頁面快取：依模板與角色快取渲染結果；Jinja bytecode 快取目錄（留空則停用）
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') == '1'
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(BASE_DIR, 'instance', 'jinja_cache'))
+    
+    # 發票封存（archive_invoices.py）：送貨日期超過此天數的 Completed / Cancelled 發票、每個交易搬移的發票數
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 180))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+    
+    # 依 id 列表批次查詢（?ids=a,b,c）一次最多的 id 數
+    BATCH_GET_MAX_IDS = int(os.environ.get('BATCH_GET_MAX_IDS', 500))
+    
+    # 產品 / 客戶變更記錄（GET /api/products/changes?since=）：單次回傳上限、刪除記錄保留天數、每個行程壓縮記錄的間隔（秒）
+    CATALOG_CHANGES_MAX_LIMIT = int(os.environ.get('CATALOG_CHANGES_MAX_LIMIT', 1000))
+    CATALOG_CHANGE_RETENTION_DAYS = int(os.environ.get('CATALOG_CHANGE_RETENTION_DAYS', 30))
+    CATALOG_COMPACT_INTERVAL = int(os.environ.get('CATALOG_COMPACT_INTERVAL', 3600))
@@ -0,0 +1,185 @@
+"""
+Cutting List PDF 版面
+只依賴 reportlab，不存取數據庫，因此可以在背景 worker process 中執行。
+明細列格式（依送貨日期、客戶名稱、發票、訂單項目排序）:
+    (delivery_date, customer_name, invoice_id, invoice_number, status,
+     product_id, product_name, subclass, quantity)
+"""
+
+import io
+from collections import defaultdict
+from itertools import groupby
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+
+
+class StreamingFlowables(list):
+    """
+    讓 reportlab 逐步取用 flowables
+    doc.build 每處理一個 flowable 前都會呼叫 len()，此時才從產生器補充，
+    因此記憶體中只保留少數幾個客戶的表格
+    """
+    def __init__(self, source, lookahead=4):
+        super().__init__()
+        self._source = iter(source)
+        self._lookahead = lookahead
+
+    def __len__(self):
+        while list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                break
+        return list.__len__(self)
+
+
+class ProductionTally:
+    """在讀取明細列的同時累計各產品數量（不含已取消的發票）"""
+
+    def __init__(self):
+        self.quantities = defaultdict(int)
+
+    def add(self, row):
+        if row[5] is not None and row[8] is not None and row[4] != 'Cancelled':
+            self.quantities[(row[7] or '', row[6] or 'Unknown', row[5])] += row[8]
+
+    def subclasses(self):
+        """與 production_totals 相同的結構：依 subclass、產品名稱排序"""
+        result = []
+        for (subclass, product_name, product_id), quantity in sorted(self.quantities.items()):
+            if not result or result[-1]['subclass'] != subclass:
+                result.append({'subclass': subclass, 'total_quantity': 0, 'products': []})
+            result[-1]['total_quantity'] += quantity
+            result[-1]['products'].append({
+                'product_id': product_id,
+                'product_name': product_name,
+                'quantity': quantity
+            })
+        return result
+
+
+def group_customer_invoices(rows, tally=None):
+    """把同一送貨日期、已排序的明細列分組為 (客戶名稱, [(發票號碼, [(產品名稱, 數量), ...]), ...])"""
+    for customer_name, customer_rows in groupby(rows, key=lambda row: row[1]):
+        customer_invoices = []
+        for (_, invoice_number), invoice_rows in groupby(customer_rows, key=lambda row: (row[2], row[3])):
+            items = []
+            for row in invoice_rows:
+                if row[8] is None:
+                    continue
+                items.append((row[6] or 'Unknown', row[8]))
+                if tally is not None:
+                    tally.add(row)
+            customer_invoices.append((invoice_number, items))
+        yield customer_name, customer_invoices
+
+
+def cutting_list_table_data(customer_name, customer_invoices):
+    """單一客戶的 Cutting List 表格內容"""
+    table_data = []
+
+    for idx, (invoice_number, items) in enumerate(customer_invoices):
+        if idx == 0:
+            # ROW 1: 客戶名稱 | 第一個產品 | 數量 | 空格
+            if items:
+                first_name, first_quantity = items[0]
+                table_data.append([customer_name, first_name, str(first_quantity), ''])
+
+                # 如果第一張發票有多個產品，添加到 ROW1 之後
+                for product_name, quantity in items[1:]:
+                    table_data.append(['', product_name, str(quantity), ''])
+
+            # ROW 2: 發票號碼 | 第二個產品（如果第二張發票存在）| 空格 | 空格
+            second_product = ''
+            if len(customer_invoices) > 1 and customer_invoices[1][1]:
+                second_product = customer_invoices[1][1][0][0]
+
+            table_data.append([invoice_number, second_product, '', ''])
+        elif idx == 1:
+            # 第二張發票的剩餘產品（第一個已經在 ROW2 顯示）
+            for product_name, quantity in items[1:]:
+                table_data.append(['', product_name, str(quantity), ''])
+
+            # 添加發票號碼
+            table_data.append([invoice_number, '', '', ''])
+        else:
+            # 第三張及以後的發票
+            for product_name, quantity in items:
+                table_data.append(['', product_name, str(quantity), ''])
+
+            table_data.append([invoice_number, '', '', ''])
+
+    # ROW 3: 空行（方便閱讀）
+    table_data.append(['', '', '', ''])
+    return table_data
+
+
+def cutting_list_customer_table(table_data):
+    customer_table = Table(table_data, colWidths=[2*inch, 2.5*inch, 1*inch, 1*inch])
+    customer_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),  # 客戶名稱加粗
+        ('FONTSIZE', (0, 0), (0, 0), 12),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),  # 除了最後一行空行
+        ('LINEBELOW', (0, -2), (-1, -2), 1, colors.black),  # 表格底部線
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+    ]))
+    return customer_table
+
+
+def production_summary_elements(subclasses, styles):
+    """Cutting List PDF 的生產彙總頁（各產品總數量）"""
+    elements = [PageBreak(), Paragraph("<b>Production Summary</b>", styles['Title']), Spacer(1, 0.2*inch)]
+    for group in subclasses:
+        elements.append(Paragraph(f"<b>{group['subclass']}</b> ({group['total_quantity']})", styles['Heading2']))
+        table_data = [['Product ID', 'Product Name', 'Quantity']]
+        for product in group['products']:
+            table_data.append([product['product_id'], product['product_name'], str(product['quantity'])])
+        summary_table = Table(table_data, colWidths=[1.5*inch, 3.5*inch, 1.5*inch])
+        summary_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ]))
+        elements.append(summary_table)
+        elements.append(Spacer(1, 0.2*inch))
+    return elements
+
+
+def cutting_list_flowables(date_label, rows, styles):
+    """逐一產生某個送貨日期的標題、各客戶表格與最後的生產彙總頁"""
+    # 標題 - 日期
+    yield Paragraph(f"<b>{date_label}</b>", styles['Title'])
+    yield Spacer(1, 0.3*inch)
+
+    tally = ProductionTally()
+    for customer_name, customer_invoices in group_customer_invoices(rows, tally):
+        yield cutting_list_customer_table(cutting_list_table_data(customer_name, customer_invoices))
+        yield Spacer(1, 0.2*inch)
+
+    # 最後一頁：各產品總生產數量（明細讀取完畢後才產生）
+    yield from production_summary_elements(tally.subclasses(), styles)
+
+
+def build_cutting_list(output, date_label, rows):
+    """把單一送貨日期的明細列寫成 PDF 到 output"""
+    doc = SimpleDocTemplate(output, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
+    doc.build(StreamingFlowables(cutting_list_flowables(date_label, rows, getSampleStyleSheet())))
+
+
+def render_cutting_list_pdf(date_label, rows):
+    """worker process 進入點：回傳單一送貨日期 Cutting List 的 PDF bytes"""
+    output = io.BytesIO()
+    build_cutting_list(output, date_label, rows)
+    return output.getvalue()
@@ -0,0 +1,51 @@
+"""
+跨數據庫（SQLite / PostgreSQL）的 SQL 輔助函數
+"""
+
+import zlib
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db
+
+
+# 以 IN 列表傳入 id 時每批的數量（避免超過 SQLite / psycopg 的參數上限）
+ID_BATCH_SIZE = 500
+
+
+def id_batches(ids, size=ID_BATCH_SIZE):
+    """把 id 列表切成每批最多 size 個"""
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def dialect_insert(model):
+    """回傳支援 on_conflict_do_update / on_conflict_do_nothing 的 INSERT 建構器"""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def sqlite_autoincrement_missing(table):
+    """SQLite 資料表未使用 AUTOINCREMENT（刪除最大 id 後會重用 id）時回傳 True；其他數據庫的 sequence 不會重用"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    sql = db.session.execute(
+        db.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': table}
+    ).scalar()
+    return sql is not None and 'AUTOINCREMENT' not in sql.upper()
+
+
+def lock_change_log(table):
+    """
+    寫入以自動遞增 id 作為游標的變更記錄（invoice_events、catalog_changes）前呼叫
+    PostgreSQL 的 id 在 INSERT 時配發，提交順序可能不同，讀取端會跳過較晚提交的較小 id；
+    以交易層級 advisory lock 串行化寫入記錄到提交之間的區段，使 id 依提交順序遞增
+    變更記錄必須是交易中最後的寫入：取得鎖之後再鎖定其他資料列，會與先鎖定資料列再等待此鎖的請求死結；
+    因此先 flush 尚未寫入的 ORM 變更，讓其資料列鎖在 advisory lock 之前取得
+    SQLite 的寫入交易本來就是串行的，不需要處理
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.flush()
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': zlib.crc32(table.encode())})
@@ -0,0 +1,214 @@
+"""
+Idempotency-Key 支援（@idempotent 裝飾器）
+帶有 Idempotency-Key 標頭的請求，第一次的回應會存入 idempotency_keys 表，IDEMPOTENCY_TTL 秒後過期；
+過期前以相同 key 重送時直接回傳儲存的回應，不會再次執行驗證或寫入訂單資料
+- 相同 key 用於不同的請求（方法、路徑或內容不同）時回傳 422；CSV 上傳也會比對檔案內容
+- 第一次請求仍在處理中時回傳 409；超過 IDEMPOTENCY_PENDING_TIMEOUT 仍未完成視為已中斷，可重新執行
+  （分批提交的長時間請求以 refresh_pending_key 延長處理中的期限）
+- 5xx 回應與例外不會儲存，重送時會重新執行
+"""
+
+import hashlib
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, jsonify, current_app, make_response, g
+
+from models import db, IdempotencyKey
+from db_utils import dialect_insert
+from metrics import metrics
+
+MAX_KEY_LENGTH = 255
+BLOCK_SIZE = 64 * 1024
+
+_last_purge = 0.0
+
+
+def request_fingerprint():
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n{request.headers.get('If-Match', '')}\n".encode())
+    if request.mimetype == 'application/json':
+        digest.update(request.get_data())
+    elif request.mimetype == 'multipart/form-data':
+        digest_form(digest)
+    else:
+        digest_stream(digest)
+    return digest.hexdigest()
+
+
+def digest_form(digest):
+    """
+    multipart 以解析後的欄位與檔案內容計算（每次送出的 boundary 不同）
+    werkzeug 會把較大的檔案寫入暫存檔，讀完後把檔案串流移回開頭供路由使用
+    """
+    for name, value in sorted(request.form.items(multi=True)):
+        digest.update(f'{name}={value}\n'.encode())
+    for name, upload in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+        digest.update(f'{name}:\n'.encode())
+        for block in iter(lambda: upload.stream.read(BLOCK_SIZE), b''):
+            digest.update(block)
+        digest.update(b'\n')
+        upload.stream.seek(0)
+
+
+def digest_stream(digest):
+    """
+    其他 body（text/csv 串流上傳）一邊計算雜湊一邊寫入暫存檔（超過 IDEMPOTENCY_SPOOL_MAX_SIZE 時寫到磁碟），
+    再以暫存檔取代 request.stream，不把整個 body 讀入記憶體
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=current_app.config.get('IDEMPOTENCY_SPOOL_MAX_SIZE', 5 * 1024 * 1024))
+    digest.update(f'{request.mimetype}\n'.encode())
+    for block in iter(lambda: request.stream.read(BLOCK_SIZE), b''):
+        digest.update(block)
+        spool.write(block)
+    spool.seek(0)
+    request.environ['wsgi.input'] = spool
+    # 暫存檔已是完整的 body，不需要再依 Content-Length 截斷
+    request.environ['wsgi.input_terminated'] = True
+    # 重新以暫存檔建立 request.stream（請求結束後暫存檔隨 environ 釋放並刪除）
+    request.__dict__.pop('stream', None)
+
+
+def purge_expired():
+    """每個行程最多每 IDEMPOTENCY_PURGE_INTERVAL 秒刪除一次過期紀錄"""
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < current_app.config.get('IDEMPOTENCY_PURGE_INTERVAL', 300):
+        return
+    _last_purge = now
+    db.session.execute(
+        db.delete(IdempotencyKey)
+        .where(IdempotencyKey.expires_at < datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def claim_key(key, fingerprint):
+    """
+    以 INSERT ... ON CONFLICT DO NOTHING 佔用 key
+    成功時回傳 None；key 已被使用時回傳既有的 IdempotencyKey
+    """
+    now = datetime.utcnow()
+    pending_cutoff = now - timedelta(seconds=current_app.config.get('IDEMPOTENCY_PENDING_TIMEOUT', 60))
+    db.session.execute(
+        db.delete(IdempotencyKey)
+        .where(
+            IdempotencyKey.key == key,
+            db.or_(
+                IdempotencyKey.expires_at < now,
+                db.and_(IdempotencyKey.status == 'pending', IdempotencyKey.created_at < pending_cutoff)
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    result = db.session.execute(
+        dialect_insert(IdempotencyKey)
+        .values(
+            key=key,
+            fingerprint=fingerprint,
+            status='pending',
+            created_at=now,
+            expires_at=now + timedelta(seconds=current_app.config.get('IDEMPOTENCY_TTL', 86400))
+        )
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+    )
+    db.session.commit()
+    if result.rowcount:
+        return None
+    existing = db.session.get(IdempotencyKey, key)
+    # 既有紀錄在兩個查詢之間剛好被刪除時重新佔用
+    return existing if existing is not None else claim_key(key, fingerprint)
+
+
+def refresh_pending_key():
+    """
+    長時間的請求（例如 CSV 匯入）在每批提交後呼叫，更新處理中 key 的 created_at，
+    避免逾時後重送的請求再次執行；距上次更新不到 IDEMPOTENCY_PENDING_TIMEOUT 的四分之一時不寫入
+    """
+    key = g.get('idempotency_key')
+    if key is None:
+        return
+    now = time.monotonic()
+    if now - g.idempotency_refreshed_at < current_app.config.get('IDEMPOTENCY_PENDING_TIMEOUT', 60) / 4:
+        return
+    g.idempotency_refreshed_at = now
+    db.session.execute(
+        db.update(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.status == 'pending')
+        .values(created_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def release_key(key):
+    """處理失敗時移除佔用，讓重送的請求重新執行"""
+    db.session.rollback()
+    db.session.execute(
+        db.delete(IdempotencyKey)
+        .where(IdempotencyKey.key == key, IdempotencyKey.status == 'pending')
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def store_response(key, response):
+    # 未提交的變更屬於失敗的請求，不應與回應一起寫入
+    db.session.rollback()
+    db.session.execute(
+        db.update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(
+            status='done',
+            response_code=response.status_code,
+            response_body=response.get_data(as_text=True),
+            content_type=response.content_type
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def idempotent(f):
+    """讓路由支援 Idempotency-Key 標頭；未帶標頭的請求照常執行"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"message": "Idempotency-Key is too long!"}), 400
+
+        purge_expired()
+        fingerprint = request_fingerprint()
+        existing = claim_key(key, fingerprint)
+        if existing is not None:
+            if existing.fingerprint != fingerprint:
+                return jsonify({"message": "Idempotency-Key was already used for a different request!"}), 422
+            if existing.status != 'done':
+                return jsonify({"message": "A request with this Idempotency-Key is still being processed!"}), 409
+            metrics.inc('idempotent_replays_total', {'endpoint': request.endpoint})
+            response = current_app.response_class(
+                existing.response_body,
+                status=existing.response_code,
+                content_type=existing.content_type
+            )
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        g.idempotency_key = key
+        g.idempotency_refreshed_at = time.monotonic()
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            release_key(key)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            release_key(key)
+        else:
+            store_response(key, response)
+        return response
+    return decorated_function
@@ -0,0 +1,132 @@
+"""
+發票回應的欄位選擇（GET /api/invoices/ 與 /api/invoices/<id>）
+- fields=id,status,total_amount：只回傳指定的欄位，查詢也只選取這些欄位（客戶名稱、Email 需要時才 JOIN customer）
+- include=items：附上訂單項目；未包含時不查詢 order_items / product（items_count 改用 COUNT 子查詢）
+未帶任何參數時與 Invoice.to_dict() 的輸出相同；格式需與 to_dict() 保持一致
+"""
+
+from datetime import datetime
+
+from flask import request
+
+from models import db, Customer, Product
+
+INVOICE_FIELDS = (
+    'id', 'invoice_number', 'customer_id', 'customer_name', 'customer_email', 'delivery_date',
+    'created_date', 'status', 'total_amount', 'version', 'items_count'
+)
+INCLUDES = ('items',)
+CUSTOMER_FIELDS = {'customer_name': Customer.name, 'customer_email': Customer.email}
+ITEM_BATCH_SIZE = 500
+
+
+def parse_field_args():
+    """
+    回傳 (fields, include_items)
+    未指定 fields 時為所有欄位；未指定 include 時，只有在未指定 fields（或 fields 包含 items）時附上訂單項目
+    不支援的欄位引發 ValueError
+    """
+    fields_arg = request.args.get('fields')
+    include_arg = request.args.get('include')
+    include = None
+    if include_arg is not None:
+        include = {name.strip() for name in include_arg.split(',') if name.strip()}
+        unknown = sorted(include.difference(INCLUDES))
+        if unknown:
+            raise ValueError(f"Unknown include: {', '.join(unknown)}")
+
+    if not fields_arg:
+        return list(INVOICE_FIELDS), include is None or 'items' in include
+
+    fields = list(dict.fromkeys(name.strip() for name in fields_arg.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in INVOICE_FIELDS and name not in INCLUDES]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    include_items = 'items' in fields or (include is not None and 'items' in include)
+    return [name for name in fields if name != 'items'], include_items
+
+
+def load_items(item_model, invoice_ids):
+    """以每批一次查詢載入訂單項目與產品名稱，回傳 {invoice_id: [item, ...]}"""
+    items = {invoice_id: [] for invoice_id in invoice_ids}
+    for start in range(0, len(invoice_ids), ITEM_BATCH_SIZE):
+        rows = db.session.execute(
+            db.select(
+                item_model.invoice_id,
+                item_model.id,
+                item_model.product_id,
+                Product.name,
+                Product.subclass,
+                item_model.quantity,
+                item_model.unit_price,
+                item_model.total_price
+            )
+            .select_from(item_model)
+            .outerjoin(Product, item_model.product_id == Product.id)
+            .where(item_model.invoice_id.in_(invoice_ids[start:start + ITEM_BATCH_SIZE]))
+            .order_by(item_model.invoice_id, item_model.id)
+        )
+        for invoice_id, item_id, product_id, name, subclass, quantity, unit_price, total_price in rows:
+            items[invoice_id].append({
+                'id': item_id,
+                'product_id': product_id,
+                'product_name': name if name is not None else 'Unknown',
+                'product_subclass': subclass if subclass is not None else '',
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total_price': total_price
+            })
+    return items
+
+
+def load_invoice_dicts(model, item_model, conditions, fields, include_items, join_customer=False, archived=False):
+    """
+    依 fields / include_items 查詢發票（Invoice 或 ArchivedInvoice），依送貨日期、建立時間、id 由新到舊
+    回傳 [(排序鍵, invoice_dict), ...]，排序鍵供合併熱資料與封存資料使用
+    （舊資料的 created_date 可能為 NULL，視為最舊，與 SQL 的 NULLS LAST 一致）
+    """
+    columns = [model.id, model.delivery_date, model.created_date]
+    for name in fields:
+        if name in CUSTOMER_FIELDS:
+            columns.append(CUSTOMER_FIELDS[name].label(name))
+        elif name == 'items_count' and not include_items:
+            columns.append(
+                db.select(db.func.count(item_model.id))
+                .where(item_model.invoice_id == model.id)
+                .scalar_subquery().label(name)
+            )
+        elif name not in ('id', 'delivery_date', 'created_date', 'items_count'):
+            columns.append(getattr(model, name).label(name))
+
+    query = db.select(*columns).select_from(model)
+    if join_customer or CUSTOMER_FIELDS.keys() & set(fields):
+        query = query.outerjoin(Customer, model.customer_id == Customer.id)
+    rows = db.session.execute(
+        query.where(*conditions).order_by(model.delivery_date.desc(), model.created_date.desc().nulls_last(),
+                                          model.id.desc())
+    ).all()
+    items = load_items(item_model, [row.id for row in rows]) if include_items else {}
+
+    results = []
+    for row in rows:
+        values = row._mapping
+        data = {}
+        for name in fields:
+            if name == 'customer_name':
+                data[name] = values[name] if values[name] is not None else 'Unknown'
+            elif name == 'customer_email':
+                data[name] = values[name] if values[name] is not None else ''
+            elif name == 'delivery_date':
+                data[name] = row.delivery_date.strftime('%Y-%m-%d')
+            elif name == 'created_date':
+                data[name] = row.created_date.strftime('%Y-%m-%d %H:%M:%S') if row.created_date else None
+            elif name == 'items_count':
+                data[name] = len(items[row.id]) if include_items else values[name]
+            else:
+                data[name] = values[name]
+        if include_items:
+            data['items'] = items[row.id]
+        if archived:
+            data['archived'] = True
+        results.append(((row.delivery_date, row.created_date or datetime.min, row.id), data))
+    return results
@@ -0,0 +1,178 @@
+"""
+發票資料維護
+- ensure_pending_invoice_index：既有數據庫（db.create_all 不會為既有資料表補建索引）由 migrate_db.py 補建
+  uq_invoices_pending_customer_date，建立前先合併重複的待處理發票（需先補上 invoices.version 欄位）
+- merge_duplicate_pending_invoices：把同客戶、同送貨日期的多張待處理發票合併到最早建立的一張
+- reprice_pending_lines：產品改價時（選擇性）把待處理發票中該產品的單價更新為新價格，以 SQL 重新加總發票
+- repair_invoice_totals：以集合式 UPDATE 重新推導所有明細小計與發票總金額（repair_invoice_totals.py）
+"""
+
+from sqlalchemy import inspect
+
+from models import db, Invoice, OrderItem
+from db_utils import id_batches
+from rollups import adjust_sales_rollup
+from routes.invoices import record_invoice_event, record_bulk_events, invoice_notifier
+
+PENDING_INVOICE_INDEX = 'uq_invoices_pending_customer_date'
+
+# 浮點金額比對的容許誤差
+TOTAL_TOLERANCE = 1e-6
+
+def adjust_sales_rollup_batched(invoice_ids, sign):
+    for batch in id_batches(invoice_ids):
+        adjust_sales_rollup(batch, sign)
+
+
+def record_bulk_events_batched(invoice_ids):
+    for batch in id_batches(invoice_ids):
+        record_bulk_events(batch)
+
+
+def merge_duplicate_pending_invoices():
+    """合併重複的待處理發票並提交（每組一個交易，變更記錄在該組的寫入之後），回傳被合併（刪除）的發票數"""
+    duplicates = db.session.execute(
+        db.select(Invoice.customer_id, Invoice.delivery_date)
+        .where(Invoice.status == 'Pending')
+        .group_by(Invoice.customer_id, Invoice.delivery_date)
+        .having(db.func.count(Invoice.id) > 1)
+    ).all()
+
+    merged = 0
+    for customer_id, delivery_date in duplicates:
+        invoice_ids = db.session.scalars(
+            db.select(Invoice.id)
+            .where(Invoice.customer_id == customer_id, Invoice.delivery_date == delivery_date,
+                   Invoice.status == 'Pending')
+            .order_by(Invoice.id)
+        ).all()
+        keep_id, other_ids = invoice_ids[0], invoice_ids[1:]
+
+        adjust_sales_rollup(invoice_ids, -1)
+        db.session.execute(
+            db.update(OrderItem)
+            .where(OrderItem.invoice_id.in_(other_ids))
+            .values(invoice_id=keep_id)
+            .execution_options(synchronize_session=False)
+        )
+        others = Invoice.query.filter(Invoice.id.in_(other_ids)).all()
+        for other in others:
+            # 明細已移到保留的發票，避免以已載入的集合串聯刪除
+            db.session.expire(other, ['order_items'])
+            db.session.delete(other)
+
+        invoice = db.session.get(Invoice, keep_id)
+        db.session.expire(invoice, ['order_items'])
+        invoice.calculate_total()
+        db.session.flush()
+        adjust_sales_rollup([keep_id], 1)
+        for other in others:
+            record_invoice_event(other, 'deleted')
+        record_invoice_event(invoice, 'merged', invoice.to_dict())
+        db.session.commit()
+        merged += len(other_ids)
+
+    return merged
+
+
+def ensure_pending_invoice_index():
+    """補建待處理發票的部分唯一索引（已存在時不做任何事），回傳合併掉的重複發票數"""
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(Invoice.__tablename__)}
+    if PENDING_INVOICE_INDEX in existing:
+        return 0
+
+    merged = merge_duplicate_pending_invoices()
+    index = next(index for index in Invoice.__table__.indexes if index.name == PENDING_INVOICE_INDEX)
+    index.create(db.engine, checkfirst=True)
+    return merged
+
+
+def invoice_total_subquery():
+    return (
+        db.select(db.func.coalesce(db.func.sum(OrderItem.total_price), 0.0))
+        .where(OrderItem.invoice_id == Invoice.id)
+        .scalar_subquery()
+    )
+
+
+def recompute_invoice_totals(*conditions):
+    """以單一 UPDATE ... RETURNING 把符合條件的發票總金額重設為訂單項目加總並遞增 version，回傳發票 id（不提交）"""
+    return db.session.scalars(
+        db.update(Invoice)
+        .where(*conditions)
+        .values(total_amount=invoice_total_subquery(), version=Invoice.version + 1)
+        .returning(Invoice.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def reprice_pending_lines(product_id, price):
+    """
+    把待處理發票中 product_id 的訂單項目改為新單價，並重新計算小計、發票總金額與銷售彙總（不提交）
+    回傳 (更新的訂單項目數, 受影響的發票 id)
+    """
+    pending_lines = db.and_(
+        OrderItem.product_id == product_id,
+        OrderItem.invoice_id.in_(db.select(Invoice.id).where(Invoice.status == 'Pending'))
+    )
+    invoice_ids = db.session.scalars(
+        db.select(OrderItem.invoice_id).where(pending_lines, OrderItem.unit_price != price).distinct()
+    ).all()
+    if not invoice_ids:
+        return 0, []
+
+    adjust_sales_rollup_batched(invoice_ids, -1)
+    lines = 0
+    repriced_ids = []
+    for batch in id_batches(invoice_ids):
+        lines += db.session.execute(
+            db.update(OrderItem)
+            .where(pending_lines, OrderItem.invoice_id.in_(batch))
+            .values(unit_price=price, total_price=OrderItem.quantity * price)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        repriced_ids.extend(recompute_invoice_totals(Invoice.id.in_(batch)))
+    adjust_sales_rollup_batched(repriced_ids, 1)
+    record_bulk_events_batched(repriced_ids)
+    return lines, repriced_ids
+
+
+def line_total_mismatch():
+    return db.func.abs(OrderItem.total_price - OrderItem.quantity * OrderItem.unit_price) > TOTAL_TOLERANCE
+
+
+def invoice_total_mismatch():
+    return db.func.abs(db.func.coalesce(Invoice.total_amount, 0.0) - invoice_total_subquery()) > TOTAL_TOLERANCE
+
+
+def repair_invoice_totals(dry_run=False):
+    """
+    小計改為 quantity * unit_price、發票總金額改為小計加總，只寫入不一致的資料並提交
+    回傳 {'lines': 修正的訂單項目數, 'invoices': 修正的發票數}
+    """
+    if dry_run:
+        return {
+            'lines': db.session.query(db.func.count(OrderItem.id)).filter(line_total_mismatch()).scalar(),
+            'invoices': db.session.query(db.func.count(Invoice.id)).filter(
+                db.or_(invoice_total_mismatch(), Invoice.id.in_(
+                    db.select(OrderItem.invoice_id).where(line_total_mismatch())))
+            ).scalar()
+        }
+
+    line_invoice_ids = db.session.scalars(
+        db.select(OrderItem.invoice_id).where(line_total_mismatch()).distinct()
+    ).all()
+    adjust_sales_rollup_batched(line_invoice_ids, -1)
+    lines = db.session.execute(
+        db.update(OrderItem)
+        .where(line_total_mismatch())
+        .values(total_price=OrderItem.quantity * OrderItem.unit_price)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    adjust_sales_rollup_batched(line_invoice_ids, 1)
+
+    invoice_ids = recompute_invoice_totals(invoice_total_mismatch())
+    record_bulk_events_batched(sorted(set(invoice_ids) | set(line_invoice_ids)))
+    db.session.commit()
+    invoice_notifier.notify()
+    return {'lines': lines, 'invoices': len(set(invoice_ids) | set(line_invoice_ids))}
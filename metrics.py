@@ -0,0 +1,344 @@
+"""
+Prometheus 文字格式的執行期指標
+- 每個 worker 在記憶體中累計計數器、直方圖與量表，記錄時只需一次加鎖的字典操作
+- 每隔 METRICS_FLUSH_INTERVAL 秒把自己的累計值寫到 METRICS_DIR 下的專屬檔案
+- /metrics 讀取所有 worker 的檔案加總輸出，因此 gunicorn 多 worker 時數值一致
+- 已結束的 worker 檔案會併入 archive，計數器不會因 worker 重啟而倒退
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from flask import Response, g, request, abort
+
+try:
+    import fcntl
+except ImportError:  # Windows 開發環境
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ARCHIVE_FILE = 'metrics_archive.json'
+
+# 名稱: (類型, 說明, 直方圖 buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests by endpoint, method and status.', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint.', LATENCY_BUCKETS),
+    'pdf_render_duration_seconds': ('histogram', 'PDF render time by document kind.', LATENCY_BUCKETS),
+    'pdf_size_bytes': ('histogram', 'Rendered PDF size by document kind.', SIZE_BUCKETS),
+    'invoices_created_total': ('counter', 'Invoices created by create_invoice.', None),
+    'invoices_merged_total': ('counter', 'Orders merged into an existing pending invoice.', None),
+    'export_rows_total': ('counter', 'Rows streamed by the CSV / NDJSON exports.', None),
+    'order_intake_total': ('counter', 'Asynchronous orders by status (queued, done, failed).', None),
+    'order_intake_batch_duration_seconds': ('histogram', 'Time to process one batch of queued orders.', LATENCY_BUCKETS),
+    'page_cache_total': ('counter', 'Rendered HTML page cache lookups by result (hit, miss).', None),
+    'idempotent_replays_total': ('counter', 'Requests answered from a stored Idempotency-Key response.', None),
+    'login_hash_duration_seconds': ('histogram', 'Password hash verification time on login.', LATENCY_BUCKETS),
+    'db_pool_checkouts_total': ('counter', 'Connections checked out of the SQLAlchemy pool.', None),
+    'db_pool_wait_seconds': ('histogram', 'Time spent waiting for a pool connection.', LATENCY_BUCKETS),
+    'db_pool_checked_out': ('gauge', 'Connections currently checked out.', None),
+    'db_pool_overflow': ('gauge', 'Current pool overflow (negative means unused capacity).', None),
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+class MetricsStore:
+    """單一 worker 的指標累計與跨 worker 彙整"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 同一行程的執行緒共用同一個暫存檔，寫入需串行
+        self._flush_lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.gauge_callbacks = []
+        self.directory = None
+        self.flush_interval = 5.0
+        self._last_flush = 0.0
+        self._file_name = None
+
+    def configure(self, directory, flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._file_name = f'metrics_{os.getpid()}_{uuid.uuid4().hex[:8]}.json'
+        os.makedirs(directory, exist_ok=True)
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._maybe_flush()
+
+    def observe(self, name, value, labels=None):
+        buckets = METRICS[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            series = self.histograms.get(key)
+            if series is None:
+                # 每個 bucket 的非累計次數，最後兩格為 +Inf 次數與總和
+                series = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(buckets)] += 1
+            series[-1] += value
+        self._maybe_flush()
+
+    def set_gauge(self, name, value, labels=None):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def _snapshot(self):
+        for callback in self.gauge_callbacks:
+            callback(self)
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'counters': [[n, dict(l), v] for (n, l), v in self.counters.items()],
+                'histograms': [[n, dict(l), list(v)] for (n, l), v in self.histograms.items()],
+                'gauges': [[n, dict(l), v] for (n, l), v in self.gauges.items()],
+            }
+
+    def _maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            # 其他執行緒正在寫入時略過，請求不需等待
+            self.flush(blocking=False)
+
+    def flush(self, blocking=True):
+        """把本 worker 的累計值原子寫入專屬檔案"""
+        if not self.directory or not self._flush_lock.acquire(blocking=blocking):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            path = os.path.join(self.directory, self._file_name)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """彙整所有 worker 的數值，回傳 (counters, histograms, gauges)"""
+        if not self.directory:
+            snapshots = [self._snapshot()]
+        else:
+            self.flush()
+            self._compact_dead_workers()
+            snapshots = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+
+        counters, histograms, gauges = {}, {}, {}
+        for snapshot in snapshots:
+            _merge_snapshot(snapshot, counters, histograms)
+            for name, labels, value in snapshot.get('gauges', []):
+                key = (name, _label_key(labels))
+                gauges[key] = gauges.get(key, 0) + value
+        return counters, histograms, gauges
+
+    def _compact_dead_workers(self):
+        """把已結束 worker 的計數器與直方圖併入 archive 檔後刪除原檔"""
+        if fcntl is None:
+            return
+        lock_path = os.path.join(self.directory, '.lock')
+        with open(lock_path, 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            dead = []
+            for name in os.listdir(self.directory):
+                if not name.startswith('metrics_') or not name.endswith('.json') or name == ARCHIVE_FILE:
+                    continue
+                try:
+                    pid = int(name.split('_')[1])
+                except (IndexError, ValueError):
+                    continue
+                if not _pid_alive(pid):
+                    dead.append(name)
+            if not dead:
+                return
+
+            archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+            counters, histograms = {}, {}
+            for name in [ARCHIVE_FILE] + dead:
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        _merge_snapshot(json.load(f), counters, histograms)
+                except (OSError, ValueError):
+                    continue
+            archive = {
+                'pid': None,
+                'counters': [[n, dict(l), v] for (n, l), v in counters.items()],
+                'histograms': [[n, dict(l), v] for (n, l), v in histograms.items()],
+                'gauges': [],
+            }
+            with open(f'{archive_path}.tmp', 'w') as f:
+                json.dump(archive, f)
+            os.replace(f'{archive_path}.tmp', archive_path)
+            for name in dead:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def render(self):
+        """輸出 Prometheus text exposition format"""
+        counters, histograms, gauges = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (n, labels), value in sorted(counters.items()):
+                    if n == name:
+                        lines.append(f'{name}{_format_labels(labels)} {value}')
+            elif kind == 'gauge':
+                for (n, labels), value in sorted(gauges.items()):
+                    if n == name:
+                        lines.append(f'{name}{_format_labels(labels)} {value}')
+            else:
+                for (n, labels), series in sorted(histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets, series):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(labels + (("le", repr(float(bound))),))} {cumulative}')
+                    cumulative += series[len(buckets)]
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {series[-1]}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge_snapshot(snapshot, counters, histograms):
+    for name, labels, value in snapshot.get('counters', []):
+        key = (name, _label_key(labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, series in snapshot.get('histograms', []):
+        key = (name, _label_key(labels))
+        if key in histograms and len(histograms[key]) == len(series):
+            histograms[key] = [a + b for a, b in zip(histograms[key], series)]
+        else:
+            histograms[key] = list(series)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in labels
+    )
+    return '{' + escaped + '}'
+
+
+# 全域實例：各模組直接 `from metrics import metrics` 記錄指標
+metrics = MetricsStore()
+
+
+class timed:
+    """量測區塊耗時並記錄到直方圖"""
+
+    def __init__(self, name, labels=None):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        metrics.observe(self.name, self.elapsed, self.labels)
+        return False
+
+
+def _instrument_pool(engine):
+    """記錄連線池 checkout 次數、等待時間與目前使用量"""
+    from sqlalchemy import event
+
+    pool = engine.pool
+    event.listen(pool, 'checkout', lambda *args: metrics.inc('db_pool_checkouts_total'))
+
+    # Pool 沒有「開始等待」事件，因此包裝 _do_get 量測取得連線所花的時間
+    original_do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return original_do_get()
+        finally:
+            metrics.observe('db_pool_wait_seconds', time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+
+    def pool_gauges(store):
+        if hasattr(pool, 'checkedout'):
+            store.set_gauge('db_pool_checked_out', pool.checkedout())
+        if hasattr(pool, 'overflow'):
+            store.set_gauge('db_pool_overflow', pool.overflow())
+
+    metrics.gauge_callbacks.append(pool_gauges)
+
+
+def init_metrics(app):
+    """註冊請求指標 hook 與 /metrics 端點"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    from models import db
+
+    metrics.configure(app.config['METRICS_DIR'], app.config.get('METRICS_FLUSH_INTERVAL', 5.0))
+    with app.app_context():
+        _instrument_pool(db.engine)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start_time = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('metrics_start_time', None)
+        if start is None or request.endpoint == 'metrics_endpoint':
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        metrics.inc('http_requests_total', {
+            'endpoint': endpoint, 'method': request.method, 'status': str(response.status_code)
+        })
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - start,
+                        {'endpoint': endpoint})
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+遷移既有數據庫
+補上 db.create_all 不會為既有資料表建立的欄位與索引（見 schema_migrations.py），可重複執行
+升級既有部署時，在啟動新版本前執行一次
+
+用法:
+    python migrate_db.py
+    python migrate_db.py --dry-run
+"""
+
+import argparse
+
+from app import app
+from schema_migrations import run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations to an existing database')
+    parser.add_argument('--dry-run', action='store_true', help='只列出尚未套用的遷移')
+    args = parser.parse_args()
+
+    print(f"\n🛠️  Migrating database{' (dry run)' if args.dry_run else ''}...")
+    with app.app_context():
+        results = run_migrations(args.dry_run)
+    for name, detail in results:
+        print(f"  ✅ {name}: {detail}")
+    if not results:
+        print("  ✅ Database is up to date")
+
+
+if __name__ == '__main__':
+    main()
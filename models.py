@@ -50,11 +50,27 @@ class Invoice(db.Model):
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='Pending')  # Pending, Completed, Cancelled
     total_amount = db.Column(db.Float, default=0.0)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # 樂觀鎖版本號
     
     # 關聯
     customer = db.relationship('Customer', backref='invoices')
     order_items = db.relationship('OrderItem', backref='invoice', cascade='all, delete-orphan')
     
+    # ORM 寫入時自動檢查並遞增 version，並發修改會引發 StaleDataError
+    __mapper_args__ = {'version_id_col': version}
+    
+    # 每個客戶、每個送貨日期最多一張待處理發票（create_invoice 以此索引做 upsert 合併）
+    __table_args__ = (
+        db.Index(
+            'uq_invoices_pending_customer_date', 'customer_id', 'delivery_date',
+            unique=True,
+            sqlite_where=db.text("status = 'Pending'"),
+            postgresql_where=db.text("status = 'Pending'")
+        ),
+        # SQLite 需要 AUTOINCREMENT，刪除最大 id 的發票後 id 才不會被重用（封存表保留原本的 id）
+        {'sqlite_autoincrement': True},
+    )
+    
     def __repr__(self):
         return f'<Invoice {self.invoice_number}>'
     
@@ -74,6 +90,7 @@ class Invoice(db.Model):
             'created_date': self.created_date.strftime('%Y-%m-%d %H:%M:%S'),
             'status': self.status,
             'total_amount': self.total_amount,
+            'version': self.version,
             'items_count': len(self.order_items),
             'items': [item.to_dict() for item in self.order_items]
         }
@@ -91,6 +108,8 @@ class OrderItem(db.Model):
     # 關聯
     product = db.relationship('Product', backref='order_items')
     
+    __table_args__ = {'sqlite_autoincrement': True}
+    
     def __repr__(self):
         return f'<OrderItem {self.product_id} x {self.quantity}>'
     
@@ -104,7 +123,168 @@ class OrderItem(db.Model):
             'unit_price': self.unit_price,
             'total_price': self.total_price
         }
+
+class ArchivedInvoice(db.Model):
+    """已封存的發票（archival.py 把較舊的 Completed / Cancelled 發票連同訂單項目移到此處，保留原本的 id）"""
+    __tablename__ = 'invoices_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    invoice_number = db.Column(db.String(50), unique=True, nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    delivery_date = db.Column(db.Date, nullable=False, index=True)
+    created_date = db.Column(db.DateTime)
+    status = db.Column(db.String(20), nullable=False)
+    total_amount = db.Column(db.Float, default=0.0)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    customer = db.relationship('Customer')
+    order_items = db.relationship('ArchivedOrderItem', backref='invoice', order_by='ArchivedOrderItem.id')
+    
+    def __repr__(self):
+        return f'<ArchivedInvoice {self.invoice_number}>'
+    
+    def to_dict(self):
+        # 與 Invoice 相同的格式，另外標示為已封存（唯讀）
+        data = Invoice.to_dict(self)
+        data['archived'] = True
+        return data
+
+class ArchivedOrderItem(db.Model):
+    __tablename__ = 'order_items_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoices_archive.id'), nullable=False, index=True)
+    product_id = db.Column(db.String(50), db.ForeignKey('product.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    
+    product = db.relationship('Product')
+    
+    def to_dict(self):
+        return OrderItem.to_dict(self)
+
+class InvoiceNumberSequence(db.Model):
+    """每日發票流水號（INV-YYYYMMDD-XXXX 的 XXXX），以單一 UPDATE / upsert 遞增"""
+    __tablename__ = 'invoice_number_sequences'
     
+    day = db.Column(db.String(8), primary_key=True)  # YYYYMMDD
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+
+class InvoiceEvent(db.Model):
+    """發票變更記錄（供 SSE 變更串流與增量同步使用）"""
+    __tablename__ = 'invoice_events'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    invoice_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(20), nullable=False)  # created, merged, updated, deleted
+    delivery_date = db.Column(db.Date, nullable=False, index=True)
+    previous_delivery_date = db.Column(db.Date)  # 更改送貨日期時的原日期
+    payload = db.Column(db.Text)  # 變更後的 invoice.to_dict()（JSON），刪除時為空
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'event_id': self.id,
+            'invoice_id': self.invoice_id,
+            'action': self.action,
+            'delivery_date': self.delivery_date.strftime('%Y-%m-%d'),
+            'previous_delivery_date': self.previous_delivery_date.strftime('%Y-%m-%d') if self.previous_delivery_date else None,
+            'invoice': json.loads(self.payload) if self.payload else None
+        }
+
+class CatalogChange(db.Model):
+    """產品與客戶的變更記錄（id 即版本號，供 GET /api/products/changes、/api/customers/changes 增量同步）"""
+    __tablename__ = 'catalog_changes'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(20), nullable=False)  # product, customer
+    entity_id = db.Column(db.String(50), nullable=False)
+    action = db.Column(db.String(20), nullable=False)  # upsert, delete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # SQLite 需要 AUTOINCREMENT，壓縮刪除最新的記錄後版本號才不會被重用
+    __table_args__ = (
+        db.Index('ix_catalog_changes_entity_id', 'entity', 'id'),
+        db.Index('ix_catalog_changes_entity_key', 'entity', 'entity_id'),
+        {'sqlite_autoincrement': True},
+    )
+
+class CatalogCompaction(db.Model):
+    """變更記錄壓縮紀錄；floor_version 以前的刪除記錄已被清除，比此版本舊的客戶端需要重新取得完整資料"""
+    __tablename__ = 'catalog_compactions'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    floor_version = db.Column(db.Integer, nullable=False)
+    superseded = db.Column(db.Integer, nullable=False, default=0)  # 被同一筆資料較新記錄取代而刪除的記錄數
+    expired = db.Column(db.Integer, nullable=False, default=0)  # 超過保留期限而刪除的刪除記錄數
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SalesDaily(db.Model):
+    """每日銷售彙總（依送貨日期、產品、客戶），隨發票異動增量維護；不含已取消的發票"""
+    __tablename__ = 'sales_daily'
+    
+    sales_date = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.String(50), primary_key=True)
+    customer_id = db.Column(db.Integer, primary_key=True)
+    subclass = db.Column(db.String(50), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_sales_daily_subclass_date', 'subclass', 'sales_date'),
+        db.Index('ix_sales_daily_customer_date', 'customer_id', 'sales_date'),
+        db.Index('ix_sales_daily_product_date', 'product_id', 'sales_date'),
+    )
+    
+class OrderIntake(db.Model):
+    """非同步下單佇列（POST /api/invoices/intake 寫入，背景 worker 依 id 順序批次處理）"""
+    __tablename__ = 'order_intake'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ticket = db.Column(db.String(32), unique=True, nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # 與 create_invoice 相同格式的 JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, processing, done, failed
+    claim_token = db.Column(db.String(32))  # 正在處理此列的 worker 批次
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    invoice_id = db.Column(db.Integer)
+    result = db.Column(db.Text)  # 處理結果（JSON，與 create_invoice 的回應相同）
+    result_code = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_order_intake_status_id', 'status', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'ticket': self.ticket,
+            'status': self.status,
+            'attempts': self.attempts,
+            'invoice_id': self.invoice_id,
+            'result_code': self.result_code,
+            'result': json.loads(self.result) if self.result else None,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'processed_at': self.processed_at.strftime('%Y-%m-%d %H:%M:%S') if self.processed_at else None
+        }
+
+class IdempotencyKey(db.Model):
+    """Idempotency-Key 對應的第一次回應，在 expires_at 前重送相同請求時直接回傳"""
+    __tablename__ = 'idempotency_keys'
+    
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)  # method、路徑與 request body 的 SHA-256
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, done
+    response_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    content_type = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
 class Admin(db.Model):
     __tablename__ = 'admins'
     
@@ -0,0 +1,180 @@
+"""
+非同步下單佇列的背景 worker
+- POST /api/invoices/intake 只把訂單寫入 order_intake 表並回傳 ticket
+- 每個行程一個背景執行緒：以條件式 UPDATE 認領一批 queued 的訂單（多個 gunicorn worker 不會重複認領），
+  依 id 順序逐筆套用 place_order（與 create_invoice 相同的驗證與合併邏輯），每筆訂單與 ticket 結果在同一交易中提交
+- 每筆訂單各自提交：record_invoice_event 的 advisory lock 會持有到提交，整批同一交易時後面的訂單
+  會在持有該鎖時再鎖定其他待處理發票，與 create_invoice 的鎖定順序相反（PostgreSQL 上會死結）
+- 佇列為空時只執行 SELECT ... LIMIT 1，不會每次輪詢都取得寫入鎖
+- 行程在處理中途結束時，認領逾時（ORDER_INTAKE_CLAIM_TIMEOUT）的訂單會重新排入佇列
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from models import db, OrderIntake
+from metrics import metrics, timed
+from routes.invoices import OrderError, place_order, invoice_notifier, intake_notifier
+
+logger = logging.getLogger(__name__)
+
+
+def requeue_stale_claims(claim_timeout, max_attempts):
+    """把認領逾時的訂單重新排入佇列；已嘗試 max_attempts 次的標記為失敗"""
+    stale = db.and_(
+        OrderIntake.status == 'processing',
+        OrderIntake.claimed_at < datetime.utcnow() - timedelta(seconds=claim_timeout)
+    )
+    if db.session.scalar(db.select(OrderIntake.id).where(stale).limit(1)) is None:
+        return
+    db.session.execute(
+        db.update(OrderIntake)
+        .where(stale, OrderIntake.attempts >= max_attempts)
+        .values(status='failed', claim_token=None, result_code=500, processed_at=datetime.utcnow(),
+                result=json.dumps({"message": "Order processing did not complete!"}))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        db.update(OrderIntake)
+        .where(stale)
+        .values(status='queued', claim_token=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def claim_batch(batch_size):
+    """以單一 UPDATE 認領最早的 batch_size 筆訂單並提交，回傳依 id 排序的 OrderIntake"""
+    queued = db.select(OrderIntake.id).where(OrderIntake.status == 'queued').limit(1)
+    if db.session.scalar(queued) is None:
+        db.session.commit()
+        return []
+    
+    token = uuid.uuid4().hex
+    oldest = (
+        db.select(OrderIntake.id)
+        .where(OrderIntake.status == 'queued')
+        .order_by(OrderIntake.id)
+        .limit(batch_size)
+    )
+    result = db.session.execute(
+        db.update(OrderIntake)
+        .where(OrderIntake.id.in_(oldest), OrderIntake.status == 'queued')
+        .values(status='processing', claim_token=token, claimed_at=datetime.utcnow(),
+                attempts=OrderIntake.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if not result.rowcount:
+        return []
+    return OrderIntake.query.filter_by(claim_token=token).order_by(OrderIntake.id).all()
+
+
+def apply_ticket(intake):
+    """套用單筆訂單並記錄結果（不提交），回傳是否合併到既有發票"""
+    merged = None
+    try:
+        message, invoice_data, merged = place_order(json.loads(intake.payload))
+    except OrderError as e:
+        # 驗證失敗發生在任何寫入之前，不影響同批的其他訂單
+        intake.status = 'failed'
+        intake.result_code = e.code
+        intake.result = json.dumps({"message": e.message})
+    else:
+        intake.status = 'done'
+        intake.invoice_id = invoice_data['id']
+        intake.result_code = 201
+        intake.result = json.dumps({"message": message, "invoice": invoice_data})
+    intake.claim_token = None
+    intake.processed_at = datetime.utcnow()
+    return merged
+
+
+def process_batch(intakes):
+    """逐筆套用並提交；發生非預期錯誤時回滾並把該筆訂單標記為失敗，不影響同批的其他訂單"""
+    ids = [intake.id for intake in intakes]
+    outcomes = []
+    for intake_id in ids:
+        intake = db.session.get(OrderIntake, intake_id)
+        try:
+            outcomes.append(apply_ticket(intake))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Order intake %s failed', intake_id)
+            intake = db.session.get(OrderIntake, intake_id)
+            intake.status = 'failed'
+            intake.claim_token = None
+            intake.result_code = 500
+            intake.result = json.dumps({"message": f"Order processing failed: {e}"})
+            intake.processed_at = datetime.utcnow()
+            db.session.commit()
+            outcomes.append(None)
+
+    invoice_notifier.notify()
+    for merged in outcomes:
+        if merged is None:
+            metrics.inc('order_intake_total', {'status': 'failed'})
+        else:
+            metrics.inc('order_intake_total', {'status': 'done'})
+            metrics.inc('invoices_merged_total' if merged else 'invoices_created_total')
+
+
+def drain_once(app):
+    """處理一批佇列中的訂單，回傳處理筆數"""
+    with app.app_context():
+        requeue_stale_claims(app.config.get('ORDER_INTAKE_CLAIM_TIMEOUT', 300),
+                             app.config.get('ORDER_INTAKE_MAX_ATTEMPTS', 3))
+        intakes = claim_batch(app.config.get('ORDER_INTAKE_BATCH_SIZE', 50))
+        if intakes:
+            with timed('order_intake_batch_duration_seconds'):
+                process_batch(intakes)
+        return len(intakes)
+
+
+class OrderIntakeWorker(threading.Thread):
+    """背景執行緒：有新訂單時立即處理，否則每 ORDER_INTAKE_POLL_INTERVAL 秒檢查一次（其他 worker 寫入的訂單）"""
+
+    def __init__(self, app):
+        super().__init__(daemon=True, name='order-intake')
+        self.app = app
+        self.pid = os.getpid()
+
+    def run(self):
+        interval = self.app.config.get('ORDER_INTAKE_POLL_INTERVAL', 1.0)
+        version = intake_notifier.version
+        while True:
+            try:
+                if drain_once(self.app):
+                    continue
+            except Exception:
+                logger.exception('Order intake worker failed')
+                time.sleep(interval)
+            version = intake_notifier.wait(version, interval)
+
+
+def init_order_intake(app):
+    """啟動非同步下單的背景 worker（ORDER_INTAKE_WORKER=0 時停用，例如只負責 API 的行程）"""
+    if not app.config.get('ORDER_INTAKE_WORKER', True):
+        return None
+    state = {'worker': None}
+    lock = threading.Lock()
+
+    def ensure_worker():
+        # gunicorn --preload 會在 fork 後遺失 master 行程的執行緒，因此在每個行程第一次處理請求時啟動
+        worker = state['worker']
+        if worker is not None and worker.pid == os.getpid() and worker.is_alive():
+            return
+        with lock:
+            worker = state['worker']
+            if worker is None or worker.pid != os.getpid() or not worker.is_alive():
+                state['worker'] = OrderIntakeWorker(app)
+                state['worker'].start()
+
+    app.before_request(ensure_worker)
+    app.extensions['order_intake'] = state
+    return state
@@ -0,0 +1,96 @@
+"""
+頁面快取（app.py 的 HTML 頁面）
+- 頁面內容只取決於模板與使用者角色（資料都由前端 JS 透過 API 載入），因此每個行程依 (模板, 角色) 快取渲染結果
+- 回應帶有內容雜湊的 ETag，瀏覽器以 If-None-Match 重新驗證時回傳 304
+- 快取鍵包含模板目錄與靜態資源 manifest 的版本（檔案大小與修改時間），部署更新模板後自動失效；
+  開發模式（app.debug 或 TEMPLATES_AUTO_RELOAD）每次請求都重新檢查版本
+- Jinja 編譯後的 bytecode 存在 TEMPLATE_BYTECODE_CACHE_DIR，新啟動的 worker 不需要重新編譯模板
+  （Jinja 會比對模板原始碼的 checksum，模板變更時自動捨棄舊的 bytecode）
+"""
+
+import hashlib
+import os
+import threading
+
+from flask import current_app, request, session, render_template
+from jinja2 import FileSystemBytecodeCache
+
+from metrics import metrics
+
+
+def template_version(app):
+    """模板目錄與 asset manifest 所有檔案的 (路徑, 大小, 修改時間) 雜湊"""
+    digest = hashlib.sha256()
+    paths = []
+    for directory, subdirs, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+        subdirs.sort()
+        paths.extend(os.path.join(directory, name) for name in sorted(files))
+    paths.append(os.path.join(app.config['ASSET_BUILD_DIR'], 'manifest.json'))
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        digest.update(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()[:16]
+
+
+class PageCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = {}
+        self.version = None
+
+    def current_version(self, app):
+        if self.version is None or app.debug or app.config.get('TEMPLATES_AUTO_RELOAD'):
+            version = template_version(app)
+            with self._lock:
+                if version != self.version:
+                    self.pages.clear()
+                    self.version = version
+        return self.version
+
+    def get(self, app, template, role):
+        """回傳 (HTML bytes, ETag)；未快取時渲染並存入"""
+        key = (self.current_version(app), template, role)
+        page = self.pages.get(key)
+        if page is not None:
+            metrics.inc('page_cache_total', {'result': 'hit'})
+            return page
+        metrics.inc('page_cache_total', {'result': 'miss'})
+        body = render_template(template).encode()
+        page = (body, hashlib.sha256(body).hexdigest()[:32])
+        with self._lock:
+            if key[0] == self.version:
+                self.pages[key] = page
+        return page
+
+
+def render_page(template):
+    """以快取的渲染結果回應頁面（取代 render_template）"""
+    app = current_app._get_current_object()
+    if not app.config.get('PAGE_CACHE_ENABLED', True):
+        return render_template(template)
+
+    role = session.get('user_type') or 'anonymous'
+    body, etag = app.extensions['page_cache'].get(app, template, role)
+    headers = {
+        'ETag': f'"{etag}"',
+        # 頁面需要登入，只允許瀏覽器快取，且每次使用前都要重新驗證（登出後不會直接顯示舊頁面）
+        'Cache-Control': 'private, no-cache',
+        'Vary': 'Cookie',
+    }
+    if request.if_none_match.contains(etag):
+        return app.response_class(status=304, headers=headers)
+    return app.response_class(body, mimetype='text/html', headers=headers)
+
+
+def init_page_cache(app):
+    """設定 Jinja bytecode 快取並建立頁面快取"""
+    directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    cache = PageCache()
+    app.extensions['page_cache'] = cache
+    return cache
@@ -0,0 +1,184 @@
+"""
+請求取樣分析器（sampling profiler）
+- 以背景執行緒定期擷取處理請求之執行緒的呼叫堆疊
+- 結果以 collapsed stack（folded）格式存檔，可直接用 speedscope / flamegraph.pl 開啟
+- 觸發方式：X-Profile 標頭、PROFILER_SAMPLE_RATE 取樣率、或管理員開關
+- 未觸發時只有一次字典查詢與一次亂數比較，幾乎沒有額外成本
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request, session
+
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+SETTINGS_FILE = '_settings.json'
+SETTINGS_CACHE_SECONDS = 2.0
+
+
+class StackSampler(threading.Thread):
+    """擷取指定執行緒堆疊的背景取樣執行緒"""
+
+    def __init__(self, target_thread_id, interval):
+        super().__init__(daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.samples
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class ProfileStore:
+    """管理分析結果目錄與跨 worker 共用的開關設定"""
+
+    def __init__(self, directory, max_files):
+        self.directory = directory
+        self.max_files = max_files
+        self._settings = {}
+        self._settings_loaded_at = 0.0
+
+    def settings(self):
+        """讀取管理員開關（快取數秒，讓所有 gunicorn worker 共用同一設定檔）"""
+        now = time.monotonic()
+        if now - self._settings_loaded_at > SETTINGS_CACHE_SECONDS:
+            try:
+                with open(os.path.join(self.directory, SETTINGS_FILE)) as f:
+                    self._settings = json.load(f)
+            except (OSError, ValueError):
+                self._settings = {}
+            self._settings_loaded_at = now
+        return self._settings
+
+    def update_settings(self, **values):
+        os.makedirs(self.directory, exist_ok=True)
+        settings = dict(self.settings())
+        settings.update(values)
+        tmp_path = os.path.join(self.directory, f'{SETTINGS_FILE}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(settings, f)
+        os.replace(tmp_path, os.path.join(self.directory, SETTINGS_FILE))
+        self._settings = settings
+        self._settings_loaded_at = time.monotonic()
+        return settings
+
+    def save(self, samples, method, endpoint, duration_ms, status_code):
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        name = _SAFE_NAME.sub('_', f"{timestamp}_{method}_{endpoint}_{status_code}_{duration_ms:.0f}ms")
+        path = os.path.join(self.directory, f'{name}.folded')
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        self.prune()
+        return path
+
+    def prune(self):
+        profiles = self.list_profiles()
+        for profile in profiles[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, profile['name']))
+            except OSError:
+                pass
+
+    def list_profiles(self):
+        """依時間由新到舊列出分析結果"""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith('.folded')]
+        except OSError:
+            return []
+        profiles = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            profiles.append({
+                'name': name,
+                'size': stat.st_size,
+                'created': datetime.utcfromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            })
+        profiles.sort(key=lambda p: p['name'], reverse=True)
+        return profiles
+
+
+def _should_profile(app, store):
+    header = request.headers.get('X-Profile')
+    if header:
+        token = app.config.get('PROFILER_TOKEN')
+        if session.get('user_type') == 'admin' or (token and header == token):
+            return True
+
+    sample_rate = app.config.get('PROFILER_SAMPLE_RATE', 0.0)
+    settings = store.settings()
+    if settings.get('enabled'):
+        sample_rate = max(sample_rate, settings.get('sample_rate', 1.0))
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def init_profiler(app):
+    """註冊請求分析 hook，並把 ProfileStore 存於 app.extensions"""
+    store = ProfileStore(app.config['PROFILER_DIR'], app.config.get('PROFILER_MAX_FILES', 200))
+    app.extensions['profiler'] = store
+    interval = app.config.get('PROFILER_INTERVAL', 0.005)
+
+    @app.before_request
+    def start_profiling():
+        if not _should_profile(app, store):
+            return
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        g.profiler = (sampler, time.perf_counter())
+
+    @app.after_request
+    def save_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        sampler, start = profiler
+        samples = sampler.stop()
+        duration_ms = (time.perf_counter() - start) * 1000
+        if samples:
+            path = store.save(samples, request.method, request.endpoint or 'unknown',
+                              duration_ms, response.status_code)
+            response.headers['X-Profile-Id'] = os.path.basename(path)
+        return response
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        # 發生例外時 after_request 不會執行，確保取樣執行緒停止
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler[0].stop()
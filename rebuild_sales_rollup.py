@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+重建銷售彙總表（sales_daily）
+用於首次部署後回填歷史數據，或修正彙總與明細不一致的情況
+
+用法:
+    python rebuild_sales_rollup.py
+    python rebuild_sales_rollup.py --from 2025-01-01 --to 2025-12-31
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from app import app
+from rollups import rebuild_sales_rollup
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the sales_daily rollup table')
+    parser.add_argument('--from', dest='date_from', type=parse_date, help='起始送貨日期 YYYY-MM-DD')
+    parser.add_argument('--to', dest='date_to', type=parse_date, help='結束送貨日期 YYYY-MM-DD')
+    args = parser.parse_args()
+
+    print("\n📊 Rebuilding sales rollup...")
+    start = time.perf_counter()
+    with app.app_context():
+        rows = rebuild_sales_rollup(args.date_from, args.date_to)
+    print(f"  ✅ Wrote {rows} rollup rows in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
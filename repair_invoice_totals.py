@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+修正發票金額
+把每個訂單項目的小計重設為 quantity * unit_price、每張發票的總金額重設為小計加總，
+以集合式 UPDATE 執行並只寫入不一致的資料（同時更新銷售彙總與發票變更記錄）
+
+用法:
+    python repair_invoice_totals.py
+    python repair_invoice_totals.py --dry-run
+"""
+
+import argparse
+import time
+
+from app import app
+from invoice_maintenance import repair_invoice_totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-derive order line and invoice totals')
+    parser.add_argument('--dry-run', action='store_true', help='只計算不一致的數量，不寫入')
+    args = parser.parse_args()
+
+    print(f"\n🧮 Repairing invoice totals{' (dry run)' if args.dry_run else ''}...")
+    start = time.perf_counter()
+    with app.app_context():
+        result = repair_invoice_totals(args.dry_run)
+    verb = 'Found' if args.dry_run else 'Fixed'
+    print(f"  ✅ {verb} {result['lines']} order lines and {result['invoices']} invoices "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+銷售彙總表維護
+- adjust_sales_rollup：以 +1 / -1 把指定發票的訂單項目累加或扣除到 sales_daily
+  異動發票時先扣除修改前的內容、再加回修改後的內容，與發票寫入在同一交易中
+- rebuild_sales_rollup：以單一 INSERT ... SELECT 重建（回填）指定日期範圍，包含已封存的發票
+- sync_rollup_subclass：產品改分類時，在同一交易中更新 sales_daily 儲存的 subclass
+"""
+
+from models import db, Invoice, OrderItem, ArchivedInvoice, ArchivedOrderItem, Product, SalesDaily
+from db_utils import dialect_insert, id_batches
+
+
+def _invoice_lines_query():
+    return (
+        db.select(
+            Invoice.delivery_date,
+            OrderItem.product_id,
+            Invoice.customer_id,
+            Product.subclass,
+            db.func.sum(OrderItem.quantity),
+            db.func.sum(OrderItem.total_price),
+            db.func.count(OrderItem.id),
+        )
+        .select_from(OrderItem)
+        .join(Invoice, OrderItem.invoice_id == Invoice.id)
+        .join(Product, OrderItem.product_id == Product.id)
+        .where(Invoice.status != 'Cancelled')
+        .group_by(Invoice.delivery_date, OrderItem.product_id, Invoice.customer_id, Product.subclass)
+    )
+
+
+def adjust_sales_rollup(invoice_ids, sign):
+    """把發票目前的訂單項目乘上 sign 後累加到彙總表（需在提交前呼叫）"""
+    invoice_ids = list(invoice_ids)
+    if not invoice_ids:
+        return
+
+    rows = db.session.execute(_invoice_lines_query().where(Invoice.id.in_(invoice_ids))).all()
+    if not rows:
+        return
+
+    stmt = dialect_insert(SalesDaily).values([{
+        'sales_date': sales_date,
+        'product_id': product_id,
+        'customer_id': customer_id,
+        'subclass': subclass,
+        'quantity': sign * quantity,
+        'revenue': sign * revenue,
+        'line_count': sign * line_count,
+    } for sales_date, product_id, customer_id, subclass, quantity, revenue, line_count in rows])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SalesDaily.sales_date, SalesDaily.product_id, SalesDaily.customer_id],
+        set_={
+            'subclass': stmt.excluded.subclass,
+            'quantity': SalesDaily.quantity + stmt.excluded.quantity,
+            'revenue': SalesDaily.revenue + stmt.excluded.revenue,
+            'line_count': SalesDaily.line_count + stmt.excluded.line_count,
+        }
+    )
+    db.session.execute(stmt)
+
+    # 移除已經沒有任何訂單項目的彙總列
+    dates = {row[0] for row in rows}
+    db.session.execute(
+        db.delete(SalesDaily)
+        .where(SalesDaily.sales_date.in_(dates), SalesDaily.line_count <= 0)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def sync_rollup_subclass(product_ids):
+    """把彙總表中這些產品的 subclass 更新為產品目前的分類（需在提交前、變更記錄之前呼叫）"""
+    subclass = db.select(Product.subclass).where(Product.id == SalesDaily.product_id).scalar_subquery()
+    for batch in id_batches(product_ids):
+        db.session.execute(
+            db.update(SalesDaily)
+            .where(SalesDaily.product_id.in_(batch), SalesDaily.subclass != subclass)
+            .values(subclass=subclass)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _order_lines(invoice_model, item_model, date_from, date_to):
+    """未取消發票的訂單項目（熱資料表或封存表）"""
+    query = (
+        db.select(
+            invoice_model.delivery_date.label('delivery_date'),
+            item_model.product_id.label('product_id'),
+            invoice_model.customer_id.label('customer_id'),
+            item_model.quantity.label('quantity'),
+            item_model.total_price.label('total_price'),
+            item_model.id.label('item_id'),
+        )
+        .select_from(item_model)
+        .join(invoice_model, item_model.invoice_id == invoice_model.id)
+        .where(invoice_model.status != 'Cancelled')
+    )
+    if date_from:
+        query = query.where(invoice_model.delivery_date >= date_from)
+    if date_to:
+        query = query.where(invoice_model.delivery_date <= date_to)
+    return query
+
+
+def rebuild_sales_rollup(date_from=None, date_to=None):
+    """重建彙總表（可限定送貨日期範圍），回傳寫入的列數"""
+    delete = db.delete(SalesDaily)
+    if date_from:
+        delete = delete.where(SalesDaily.sales_date >= date_from)
+    if date_to:
+        delete = delete.where(SalesDaily.sales_date <= date_to)
+    lines = db.union_all(
+        _order_lines(Invoice, OrderItem, date_from, date_to),
+        _order_lines(ArchivedInvoice, ArchivedOrderItem, date_from, date_to)
+    ).subquery()
+    source = (
+        db.select(
+            lines.c.delivery_date,
+            lines.c.product_id,
+            lines.c.customer_id,
+            Product.subclass,
+            db.func.sum(lines.c.quantity),
+            db.func.sum(lines.c.total_price),
+            db.func.count(lines.c.item_id),
+        )
+        .select_from(lines)
+        .join(Product, lines.c.product_id == Product.id)
+        .group_by(lines.c.delivery_date, lines.c.product_id, lines.c.customer_id, Product.subclass)
+    )
+
+    db.session.execute(delete.execution_options(synchronize_session=False))
+    result = db.session.execute(
+        db.insert(SalesDaily).from_select(
+            ['sales_date', 'product_id', 'customer_id', 'subclass', 'quantity', 'revenue', 'line_count'],
+            source
+        )
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,66 @@
+from flask import Blueprint, request, jsonify, session, send_from_directory, current_app, abort
+from functools import wraps
+
+admin_bp = Blueprint("admin", __name__)
+
+# 裝飾器：API 需要 Admin 權限
+def admin_api_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if session.get('user_type') != 'admin':
+            return jsonify({"message": "Admin access required!"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+@admin_bp.route("/profiler", methods=["GET"])
+@admin_api_required
+def get_profiler_settings():
+    """查看分析器設定"""
+    store = current_app.extensions['profiler']
+    return jsonify({
+        "enabled": bool(store.settings().get('enabled')),
+        "sample_rate": store.settings().get('sample_rate', 1.0),
+        "config_sample_rate": current_app.config.get('PROFILER_SAMPLE_RATE', 0.0)
+    })
+
+@admin_bp.route("/profiler", methods=["PUT"])
+@admin_api_required
+def update_profiler_settings():
+    """開啟或關閉分析器（所有 worker 共用）"""
+    data = request.json or {}
+    values = {}
+    if 'enabled' in data:
+        values['enabled'] = bool(data['enabled'])
+    if 'sample_rate' in data:
+        try:
+            sample_rate = float(data['sample_rate'])
+        except (TypeError, ValueError):
+            return jsonify({"message": "Invalid sample rate!"}), 400
+        if not 0 <= sample_rate <= 1:
+            return jsonify({"message": "Sample rate must be between 0 and 1!"}), 400
+        values['sample_rate'] = sample_rate
+
+    settings = current_app.extensions['profiler'].update_settings(**values)
+    return jsonify({"message": "Profiler settings updated!", "settings": settings})
+
+@admin_bp.route("/profiles", methods=["GET"])
+@admin_api_required
+def list_profiles():
+    """列出最近的分析結果"""
+    limit = request.args.get('limit', 50, type=int)
+    if limit < 1:
+        return jsonify({"message": "limit must be positive!"}), 400
+    return jsonify(current_app.extensions['profiler'].list_profiles()[:limit])
+
+@admin_bp.route("/profiles/<path:name>", methods=["GET"])
+@admin_api_required
+def download_profile(name):
+    """下載分析結果（folded 格式）"""
+    if not name.endswith('.folded'):
+        abort(404)
+    return send_from_directory(
+        current_app.extensions['profiler'].directory,
+        name,
+        as_attachment=True,
+        mimetype='text/plain'
+    )
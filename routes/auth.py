@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from models import db, Customer, Admin
 from werkzeug.security import check_password_hash
+from metrics import timed
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -17,7 +18,10 @@ def login():
     
     # 首先檢查是否是 Admin
     admin = Admin.query.filter_by(username=username).first()
-    if admin and admin.check_password(password):
+    if admin:
+        with timed('login_hash_duration_seconds', {'user_type': 'admin'}):
+            admin_valid = admin.check_password(password)
+    if admin and admin_valid:
         session['user_id'] = admin.id
         session['user_type'] = 'admin'
         session['username'] = admin.username
@@ -29,7 +33,10 @@ def login():
     
     # 如果不是 Admin，檢查是否是 Customer
     customer = Customer.query.filter_by(name=username).first()
-    if customer and check_password_hash(customer.password, password):
+    if customer:
+        with timed('login_hash_duration_seconds', {'user_type': 'customer'}):
+            customer_valid = check_password_hash(customer.password, password)
+    if customer and customer_valid:
         session['user_id'] = customer.id
         session['user_type'] = 'customer'
         session['username'] = customer.name
@@ -1,12 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import IntegrityError
 from models import db, Customer
 from werkzeug.security import generate_password_hash
+from bulk_import import IMPORT_MODES, ImportReport, hash_passwords, read_csv_chunks, upload_stream
+import csv
 import json
+from idempotency import idempotent, refresh_pending_key
+from batch_lookup import parse_ids_arg, batch_response
+from catalog_changes import record_catalog_changes, changes_response
 
 customers_bp = Blueprint("customers", __name__)
 
+def customer_to_dict(customer):
+    return {
+        "id": customer.id,
+        "name": customer.name,
+        "email": customer.email,
+        "special_item_ids": customer.get_special_items()
+    }
+
 @customers_bp.route("/", methods=["GET"])
 def get_customers():
+    if 'ids' in request.args:
+        return get_customers_by_ids()
+    
     limit = request.args.get('limit', type=int)
     search = request.args.get('search', type=str)
     
@@ -33,22 +50,26 @@ def get_customers():
     else:
         customers = query.all()
     
-    return jsonify([{
-        "id": c.id,
-        "name": c.name,
-        "email": c.email,
-        "special_item_ids": c.get_special_items()
-    } for c in customers])
+    return jsonify([customer_to_dict(c) for c in customers])
+
+def get_customers_by_ids():
+    """GET /api/customers/?ids=1,2,3：以單一 IN 查詢取得多個客戶，依請求順序回傳"""
+    try:
+        ids = parse_ids_arg(int)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    customers = Customer.query.filter(Customer.id.in_(set(ids)))
+    return batch_response(ids, {c.id: customer_to_dict(c) for c in customers}, 'customer')
+
+@customers_bp.route("/changes", methods=["GET"])
+def get_customer_changes():
+    """增量同步客戶資料：since=<version> 之後新增、修改的客戶與刪除的客戶 id"""
+    return changes_response('customer', Customer, customer_to_dict, int)
 
 @customers_bp.route("/<int:customer_id>", methods=["GET"])
 def get_customer(customer_id):
     customer = Customer.query.get_or_404(customer_id)
-    return jsonify({
-        "id": customer.id,
-        "name": customer.name,
-        "email": customer.email,
-        "special_item_ids": customer.get_special_items()
-    })
+    return jsonify(customer_to_dict(customer))
 
 @customers_bp.route("/", methods=["POST"])
 def add_customer():
@@ -79,10 +100,124 @@ def add_customer():
     new_customer.set_special_items(special_items)
     
     db.session.add(new_customer)
+    db.session.flush()
+    record_catalog_changes('customer', [new_customer.id])
     db.session.commit()
     
     return jsonify({"message": "Customer added!", "id": new_customer.id}), 201
 
+@customers_bp.route("/import", methods=["POST"])
+@idempotent
+def import_customers():
+    """
+    從 CSV 批次匯入客戶（欄位: name, email, password，選填 special_item_ids 以 ; 分隔）
+    以 email 判斷客戶是否已存在:
+    - mode=upsert（預設）: 更新已存在的客戶，空白欄位保持不變；mode=insert: 已存在的客戶列為錯誤
+    密碼雜湊在 process pool 中計算，每批單一交易寫入，回傳逐列錯誤報告
+    """
+    mode = request.args.get('mode', 'upsert')
+    if mode not in IMPORT_MODES:
+        return jsonify({"message": f"Unknown mode: {mode}"}), 400
+    stream = upload_stream()
+    if stream is None:
+        return jsonify({"message": "CSV file is required!"}), 400
+    
+    report = ImportReport()
+    seen = set()
+    chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', 500)
+    try:
+        for chunk in read_csv_chunks(stream, ('name', 'email', 'password'), chunk_size):
+            rows = []
+            for line, row in chunk:
+                report.rows += 1
+                email = row.get('email', '')
+                if not email:
+                    report.error(line, email, "名稱、密碼和電子郵件都是必填的！")
+                    continue
+                if email in seen:
+                    report.error(line, email, "電子郵件在檔案中重複！")
+                    continue
+                special_items = [item.strip() for item in row.get('special_item_ids', '').split(';') if item.strip()]
+                if len(special_items) > 99:
+                    report.error(line, email, "特殊產品 ID 數量不能超過 99 個！")
+                    continue
+                seen.add(email)
+                rows.append((line, {
+                    'name': row.get('name', ''),
+                    'email': email,
+                    'password': row.get('password', ''),
+                    'special_item_ids': special_items
+                }))
+            
+            if rows:
+                import_customer_chunk(rows, mode, report)
+            refresh_pending_key()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except (csv.Error, UnicodeDecodeError) as e:
+        report.error(None, None, f"Invalid CSV: {e}")
+    
+    return jsonify(report.to_dict())
+
+def import_customer_chunk(rows, mode, report):
+    """寫入一批已驗證的客戶並提交"""
+    existing = dict(db.session.execute(
+        db.select(Customer.email, Customer.id).where(Customer.email.in_([values['email'] for _, values in rows]))
+    ).all())
+    
+    accepted = []
+    for line, values in rows:
+        if values['email'] in existing:
+            if mode == 'insert':
+                report.error(line, values['email'], "電子郵件已存在！")
+                continue
+        elif not values['name'] or not values['password']:
+            report.error(line, values['email'], "名稱、密碼和電子郵件都是必填的！")
+            continue
+        accepted.append((line, values))
+    if not accepted:
+        return
+    
+    # 密碼雜湊在交易開始前完成，不佔用數據庫連線
+    hashed = iter(hash_passwords(values['password'] for _, values in accepted if values['password']))
+    inserts, updates = [], []
+    for _, values in accepted:
+        record = {}
+        if values['name']:
+            record['name'] = values['name']
+        if values['password']:
+            record['password'] = next(hashed)
+        if values['special_item_ids']:
+            record['special_item_ids'] = json.dumps(values['special_item_ids'])
+        
+        customer_id = existing.get(values['email'])
+        if customer_id is None:
+            record['email'] = values['email']
+            record.setdefault('special_item_ids', '[]')
+            inserts.append(record)
+        elif record:
+            record['id'] = customer_id
+            updates.append(record)
+    
+    try:
+        if inserts:
+            db.session.execute(db.insert(Customer), inserts)
+        if updates:
+            db.session.execute(db.update(Customer), updates)
+        record_catalog_changes('customer', db.session.scalars(
+            db.select(Customer.id).where(Customer.email.in_([values['email'] for _, values in accepted]))
+        ).all())
+        db.session.commit()
+    except IntegrityError as e:
+        # 與其他請求同時新增相同 email 時，整批放棄並列為錯誤
+        db.session.rollback()
+        for line, values in accepted:
+            report.error(line, values['email'], f"Database error: {e.orig}")
+        return
+    
+    report.created += len(inserts)
+    report.updated += len(accepted) - len(inserts)
+
 @customers_bp.route("/<int:customer_id>", methods=["PUT"])
 def update_customer(customer_id):
     customer = Customer.query.get_or_404(customer_id)
@@ -110,6 +245,7 @@ def update_customer(customer_id):
             return jsonify({"message": "特殊產品 ID 數量不能超過 99 個！"}), 400
         customer.set_special_items(special_items)
     
+    record_catalog_changes('customer', [customer.id])
     db.session.commit()
     
     return jsonify({"message": "Customer updated!"})
@@ -118,6 +254,7 @@ def update_customer(customer_id):
 def delete_customer(customer_id):
     customer = Customer.query.get_or_404(customer_id)
     db.session.delete(customer)
+    record_catalog_changes('customer', [customer.id], 'delete')
     db.session.commit()
     
     return jsonify({"message": "Customer deleted!"})
\ No newline at end of file
@@ -1,109 +1,252 @@
-from flask import Blueprint, request, jsonify, send_file
-from models import db, Invoice, OrderItem, Customer, Product
+from flask import Blueprint, request, jsonify, send_file, current_app, url_for
+from models import db, Invoice, OrderItem, Customer, Product, InvoiceEvent, OrderIntake, InvoiceNumberSequence, ArchivedInvoice, ArchivedOrderItem
+from db_utils import dialect_insert, lock_change_log, id_batches
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+import heapq
 import io
+import json
+import tempfile
+import uuid
+from itertools import chain, groupby
+from pypdf import PdfWriter
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.units import inch
+from cutting_list_pdf import build_cutting_list, render_cutting_list_pdf
+from metrics import metrics, timed
+from sse import ChangeNotifier, event_stream, last_event_id
+from rollups import adjust_sales_rollup
+from workers import process_pool
+from idempotency import idempotent
+from archival import find_invoice, include_archived_arg, invoice_tables
+from invoice_fields import parse_field_args, load_invoice_dicts
+from batch_lookup import parse_ids_arg, batch_response
 
 invoices_bp = Blueprint("invoices", __name__)
 
+INVOICE_STATUSES = ('Pending', 'Completed', 'Cancelled')
+
+# 同一 worker 內發票變更提交後喚醒 SSE 串流
+invoice_notifier = ChangeNotifier()
+
+# 同一 worker 內有新的非同步訂單時喚醒 order_intake 背景 worker
+intake_notifier = ChangeNotifier()
+
+def record_invoice_event(invoice, action, payload=None, previous_delivery_date=None):
+    """在同一交易中寫入發票變更記錄，需在交易的其他寫入之後呼叫（見 lock_change_log；提交後需呼叫 invoice_notifier.notify()）"""
+    lock_change_log(InvoiceEvent.__tablename__)
+    db.session.add(InvoiceEvent(
+        invoice_id=invoice.id,
+        action=action,
+        delivery_date=invoice.delivery_date,
+        previous_delivery_date=previous_delivery_date if previous_delivery_date != invoice.delivery_date else None,
+        payload=json.dumps(payload) if payload is not None else None
+    ))
+
+def latest_invoice_event_id():
+    return db.session.query(db.func.max(InvoiceEvent.id)).scalar() or 0
+
+def invoice_events_query(since_id, date=None):
+    query = InvoiceEvent.query.filter(InvoiceEvent.id > since_id)
+    if date:
+        query = query.filter(db.or_(
+            InvoiceEvent.delivery_date == date,
+            InvoiceEvent.previous_delivery_date == date
+        ))
+    return query.order_by(InvoiceEvent.id)
+
+def parse_date_arg(name='date'):
+    """解析 YYYY-MM-DD 查詢參數，格式錯誤時回傳 None"""
+    value = request.args.get(name, type=str)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
 def generate_invoice_number():
-    """生成唯一的發票編號 格式: INV-YYYYMMDD-XXXX"""
+    """
+    生成唯一的發票編號 格式: INV-YYYYMMDD-XXXX
+    流水號存在 invoice_number_sequences，以單一 UPDATE（當日第一張則 upsert）遞增，同時建立發票也不會重複
+    """
     today = datetime.now().strftime('%Y%m%d')
-    last_invoice = Invoice.query.filter(
-        Invoice.invoice_number.like(f'INV-{today}-%')
-    ).order_by(Invoice.id.desc()).first()
-    
-    if last_invoice:
-        last_num = int(last_invoice.invoice_number.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
-    
-    return f'INV-{today}-{new_num:04d}'
+    next_value = db.session.execute(
+        db.update(InvoiceNumberSequence)
+        .where(InvoiceNumberSequence.day == today)
+        .values(last_value=InvoiceNumberSequence.last_value + 1)
+        .returning(InvoiceNumberSequence.last_value)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    
+    if next_value is None:
+        # 當日第一張：從既有發票的最大編號接續
+        last_invoice = Invoice.query.filter(
+            Invoice.invoice_number.like(f'INV-{today}-%')
+        ).order_by(Invoice.id.desc()).first()
+        last_num = int(last_invoice.invoice_number.split('-')[-1]) if last_invoice else 0
+        
+        stmt = dialect_insert(InvoiceNumberSequence).values(day=today, last_value=last_num + 1)
+        next_value = db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[InvoiceNumberSequence.day],
+                set_={'last_value': InvoiceNumberSequence.last_value + 1}
+            ).returning(InvoiceNumberSequence.last_value)
+        ).scalar()
+    
+    return f'INV-{today}-{next_value:04d}'
 
-@invoices_bp.route("/", methods=["GET"])
-def get_invoices():
-    search = request.args.get('search', type=str)
-    date = request.args.get('date', type=str)
-    
-    query = Invoice.query
+def claim_pending_invoice(customer_id, delivery_date):
+    """
+    以單一 upsert 取得此客戶、此送貨日期的待處理發票，不存在時建立
+    由 uq_invoices_pending_customer_date 部分唯一索引保證同時送出的訂單只會有一張發票
+    （PostgreSQL 會鎖定該列直到交易結束，合併依序進行）
+    回傳 (invoice, created)
+    """
+    placeholder = f'PENDING-{uuid.uuid4().hex}'
+    stmt = dialect_insert(Invoice).values(
+        invoice_number=placeholder,
+        customer_id=customer_id,
+        delivery_date=delivery_date,
+        status='Pending'
+    )
+    invoice_id, invoice_number = db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Invoice.customer_id, Invoice.delivery_date],
+            index_where=db.text("status = 'Pending'"),
+            set_={'version': Invoice.version}
+        ).returning(Invoice.id, Invoice.invoice_number)
+    ).one()
+    
+    invoice = db.session.get(Invoice, invoice_id)
+    created = invoice_number == placeholder
+    if created:
+        invoice.invoice_number = generate_invoice_number()
+    return invoice, created
+
+def invoice_list_conditions(model, search, filter_date):
+    """發票列表的篩選條件（model 為 Invoice 或 ArchivedInvoice；search 需要 JOIN customer）"""
+    conditions = []
     
     # 搜索功能
     if search:
-        query = query.join(Customer).filter(
-            db.or_(
-                Invoice.invoice_number.like(f'%{search}%'),
-                Customer.name.like(f'%{search}%')
-            )
-        )
+        conditions.append(db.or_(
+            model.invoice_number.like(f'%{search}%'),
+            Customer.name.like(f'%{search}%')
+        ))
     
     # 日期篩選（按送貨日期）
-    if date:
-        try:
-            filter_date = datetime.strptime(date, '%Y-%m-%d').date()
-            query = query.filter(Invoice.delivery_date == filter_date)
-        except ValueError:
-            pass
+    if filter_date:
+        conditions.append(model.delivery_date == filter_date)
     
-    invoices = query.order_by(Invoice.delivery_date.desc(), Invoice.created_date.desc()).all()
-    return jsonify([invoice.to_dict() for invoice in invoices])
+    return conditions
+
+@invoices_bp.route("/", methods=["GET"])
+def get_invoices():
+    """
+    發票列表
+    - fields / include=items：只回傳需要的欄位與訂單項目（見 invoice_fields.py）
+    - include_archived=1：一併回傳已封存的發票
+    - ids=1,2,3：依 id 列表批次查詢（見 get_invoices_by_ids）
+    """
+    search = request.args.get('search', type=str)
+    filter_date = parse_date_arg()
+    try:
+        fields, include_items = parse_field_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if 'ids' in request.args:
+        return get_invoices_by_ids(fields, include_items)
+    
+    # 先記錄目前的變更序號，客戶端可從此處訂閱變更串流而不會漏掉事件
+    event_id = latest_invoice_event_id()
+    results = [
+        load_invoice_dicts(model, item_model, invoice_list_conditions(model, search, filter_date),
+                           fields, include_items, join_customer=bool(search), archived=archived)
+        for model, item_model, archived in invoice_tables(include_archived_arg())
+    ]
+    invoices = heapq.merge(*results, key=lambda result: result[0], reverse=True)
+    response = jsonify([data for _, data in invoices])
+    response.headers['X-Invoice-Event-Id'] = str(event_id)
+    return response
+
+def get_invoices_by_ids(fields, include_items):
+    """以單一 IN 查詢（include_archived 時再查一次封存表）取得多張發票，依請求順序回傳"""
+    try:
+        ids = parse_ids_arg(int)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    
+    # 以 id 對應結果，未要求 id 欄位時回應前再移除
+    query_fields = fields if 'id' in fields else ['id'] + fields
+    records = {}
+    for model, item_model, archived in invoice_tables(include_archived_arg()):
+        remaining = set(ids).difference(records)
+        if not remaining:
+            break
+        for _, data in load_invoice_dicts(model, item_model, [model.id.in_(remaining)], query_fields,
+                                          include_items, archived=archived):
+            records[data['id'] if 'id' in fields else data.pop('id')] = data
+    return batch_response(ids, records, 'invoice')
 
 @invoices_bp.route("/<int:invoice_id>", methods=["GET"])
 def get_invoice(invoice_id):
-    invoice = Invoice.query.get_or_404(invoice_id)
-    return jsonify(invoice.to_dict())
+    try:
+        fields, include_items = parse_field_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    
+    for model, item_model, archived in invoice_tables(include_archived_arg()):
+        results = load_invoice_dicts(model, item_model, [model.id == invoice_id], fields, include_items,
+                                     archived=archived)
+        if results:
+            return jsonify(results[0][1])
+    return jsonify({"message": "Invoice not found!"}), 404
 
-@invoices_bp.route("/create", methods=["POST"])
-def create_invoice():
+class OrderError(Exception):
+    """訂單驗證失敗（回應訊息與 HTTP 狀態碼）"""
+    def __init__(self, message, code=400):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+def place_order(data):
     """
-    創建發票（可包含多個訂單項目）
-    接收格式: {
-        "customer_id": 1,
-        "delivery_date": "2025-10-05",
-        "items": [
-            {"product_id": "PROD001", "quantity": 2},
-            {"product_id": "PROD002", "quantity": 1}
-        ]
-    }
+    驗證訂單並寫入目前的交易（不提交）
+    相同客戶、相同送貨日期已有待處理發票時合併到該發票，否則建立新發票
+    回傳 (message, invoice_data, merged)；驗證失敗時在任何寫入前引發 OrderError
     """
-    data = request.json
-    
     # 驗證必填欄位
-    if not data.get('customer_id') or not data.get('delivery_date') or not data.get('items'):
-        return jsonify({"message": "Customer ID, delivery date, and order items are required!"}), 400
+    if not data or not data.get('customer_id') or not data.get('delivery_date') or not data.get('items'):
+        raise OrderError("Customer ID, delivery date, and order items are required!")
     
     # 驗證客戶存在
     customer = Customer.query.get(data['customer_id'])
     if not customer:
-        return jsonify({"message": "Customer not found!"}), 404
+        raise OrderError("Customer not found!", 404)
     
     # 解析送貨日期
     try:
         delivery_date = datetime.strptime(data['delivery_date'], '%Y-%m-%d').date()
     except ValueError:
-        return jsonify({"message": "Invalid delivery date format!"}), 400
-    
-    # 檢查是否已存在相同客戶、相同送貨日期的待處理發票
-    existing_invoice = Invoice.query.filter_by(
-        customer_id=data['customer_id'],
-        delivery_date=delivery_date,
-        status='Pending'
-    ).first()
+        raise OrderError("Invalid delivery date format!")
     
     # 驗證並添加訂單項目
     new_items = []
     for item_data in data['items']:
         product = Product.query.get(item_data['product_id'])
         if not product:
-            return jsonify({"message": f"Product {item_data['product_id']} not found!"}), 404
+            raise OrderError(f"Product {item_data['product_id']} not found!", 404)
         
-        quantity = int(item_data['quantity'])
+        try:
+            quantity = int(item_data['quantity'])
+        except (TypeError, ValueError):
+            raise OrderError("Invalid quantity!")
         if quantity <= 0:
-            return jsonify({"message": "Quantity must be greater than 0!"}), 400
+            raise OrderError("Quantity must be greater than 0!")
         
         unit_price = product.price
         total_price = unit_price * quantity
@@ -115,22 +258,13 @@ def create_invoice():
             'total_price': total_price
         })
     
-    # 如果存在相同的發票，添加到現有發票
-    if existing_invoice:
-        invoice = existing_invoice
-        message = f"Order added to existing invoice! {invoice.invoice_number}！"
+    # 合併到相同客戶、相同送貨日期的待處理發票，不存在時建立新發票
+    invoice, created = claim_pending_invoice(data['customer_id'], delivery_date)
+    if created:
+        message = f"Invoice {invoice.invoice_number} created successfully!"
     else:
-        # 創建新發票
-        invoice_number = generate_invoice_number()
-        invoice = Invoice(
-            invoice_number=invoice_number,
-            customer_id=data['customer_id'],
-            delivery_date=delivery_date,
-            status='Pending'
-        )
-        db.session.add(invoice)
-        db.session.flush()  # 獲取 invoice.id
-        message = f"Invoice {invoice_number} created successfully!"
+        adjust_sales_rollup([invoice.id], -1)
+        message = f"Order added to existing invoice! {invoice.invoice_number}！"
     
     # 添加所有新的訂單項目
     for item_info in new_items:
@@ -145,198 +279,527 @@ def create_invoice():
     
     # 更新發票總金額
     invoice.calculate_total()
+    db.session.flush()
+    adjust_sales_rollup([invoice.id], 1)
+    invoice_data = invoice.to_dict()
+    record_invoice_event(invoice, 'created' if created else 'merged', invoice_data)
+    return message, invoice_data, not created
+
+@invoices_bp.route("/create", methods=["POST"])
+@idempotent
+def create_invoice():
+    """
+    創建發票（可包含多個訂單項目）
+    接收格式: {
+        "customer_id": 1,
+        "delivery_date": "2025-10-05",
+        "items": [
+            {"product_id": "PROD001", "quantity": 2},
+            {"product_id": "PROD002", "quantity": 1}
+        ]
+    }
+    """
+    try:
+        message, invoice_data, merged = place_order(request.json)
+    except OrderError as e:
+        return jsonify({"message": e.message}), e.code
+    
     db.session.commit()
+    invoice_notifier.notify()
+    metrics.inc('invoices_merged_total' if merged else 'invoices_created_total')
     
     return jsonify({
         "message": message,
-        "invoice": invoice.to_dict()
+        "invoice": invoice_data
     }), 201
 
+@invoices_bp.route("/intake", methods=["POST"])
+@idempotent
+def enqueue_order():
+    """
+    非同步下單：與 /create 相同格式，只寫入佇列後立即回傳 202 與 ticket
+    背景 worker 依送出順序處理（見 order_intake.py），結果以 GET /intake/<ticket> 查詢
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('customer_id') or not data.get('delivery_date') or not data.get('items'):
+        return jsonify({"message": "Customer ID, delivery date, and order items are required!"}), 400
+    
+    ticket = uuid.uuid4().hex
+    db.session.add(OrderIntake(ticket=ticket, payload=json.dumps(data)))
+    db.session.commit()
+    intake_notifier.notify()
+    metrics.inc('order_intake_total', {'status': 'queued'})
+    
+    return jsonify({
+        "message": "Order queued!",
+        "ticket": ticket,
+        "status_url": url_for('invoices.get_intake_ticket', ticket=ticket)
+    }), 202
+
+@invoices_bp.route("/intake/<ticket>", methods=["GET"])
+def get_intake_ticket(ticket):
+    """查詢非同步訂單的處理狀態（queued、processing、done、failed）與結果"""
+    intake = OrderIntake.query.filter_by(ticket=ticket).first()
+    if not intake:
+        return jsonify({"message": "Ticket not found!"}), 404
+    return jsonify(intake.to_dict())
+
 @invoices_bp.route("/<int:invoice_id>", methods=["PUT"])
+@idempotent
 def update_invoice(invoice_id):
+    """
+    更新發票（樂觀鎖）
+    - version 欄位或 If-Match 標頭帶入讀取時的版本，版本不符時回傳 409（conflict: version），不持有任何鎖
+    - 改為 Pending 或更改送貨日期後與同客戶同日期的待處理發票衝突時回傳 409（conflict: pending_invoice）
+    - 所有訂單項目數量以單一 UPDATE ... CASE 套用，總金額以 SQL 重新加總
+    """
     invoice = Invoice.query.get_or_404(invoice_id)
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Invalid request body!"}), 400
+    previous_delivery_date = invoice.delivery_date
+    
+    expected_version = data.get('version', request.headers.get('If-Match'))
+    if expected_version is not None:
+        try:
+            expected_version = int(str(expected_version).replace('W/', '').strip('"'))
+        except ValueError:
+            return jsonify({"message": "Invalid version!"}), 400
     
+    values = {}
     if 'status' in data:
-        invoice.status = data['status']
+        if data['status'] not in INVOICE_STATUSES:
+            return jsonify({"message": f"status must be one of: {', '.join(INVOICE_STATUSES)}!"}), 400
+        values['status'] = data['status']
     
     if 'delivery_date' in data:
         try:
-            invoice.delivery_date = datetime.strptime(data['delivery_date'], '%Y-%m-%d').date()
-        except ValueError:
+            values['delivery_date'] = datetime.strptime(data['delivery_date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
             return jsonify({"message": "Invalid date format!"}), 400
     
-    # 更新訂單項目數量
-    if 'items' in data:
-        for item_data in data['items']:
-            order_item = OrderItem.query.get(item_data['id'])
-            if order_item and order_item.invoice_id == invoice_id:
-                quantity = int(item_data.get('quantity', order_item.quantity))
-                if quantity <= 0:
-                    return jsonify({"message": "Quantity must be greater than 0!"}), 400
-                order_item.quantity = quantity
-                order_item.total_price = order_item.unit_price * quantity
+    # 先驗證所有數量，再一次寫入
+    items = data.get('items', [])
+    if not isinstance(items, list) or not all(isinstance(item_data, dict) for item_data in items):
+        return jsonify({"message": "items must be a list of order items!"}), 400
+    quantities = {}
+    for item_data in items:
+        if 'quantity' not in item_data:
+            continue
+        try:
+            item_id = int(item_data['id'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"message": "Order item id is required!"}), 400
+        try:
+            quantity = int(item_data['quantity'])
+        except (TypeError, ValueError):
+            return jsonify({"message": "Invalid quantity!"}), 400
+        if quantity <= 0:
+            return jsonify({"message": "Quantity must be greater than 0!"}), 400
+        quantities[item_id] = quantity
+    
+    # 先從銷售彙總扣除修改前的內容，成功更新後再加回
+    adjust_sales_rollup([invoice_id], -1)
+    
+    if quantities:
+        quantity_case = db.case(quantities, value=OrderItem.id)
+        db.session.execute(
+            db.update(OrderItem)
+            .where(OrderItem.invoice_id == invoice_id, OrderItem.id.in_(list(quantities)))
+            .values(quantity=quantity_case, total_price=OrderItem.unit_price * quantity_case)
+            .execution_options(synchronize_session=False)
+        )
     
-    invoice.calculate_total()
+    # 以版本號做條件更新，同時重新計算總金額並遞增版本
+    total_subquery = db.select(db.func.coalesce(db.func.sum(OrderItem.total_price), 0.0)) \
+        .where(OrderItem.invoice_id == invoice_id).scalar_subquery()
+    claim = db.update(Invoice).where(Invoice.id == invoice_id)
+    if expected_version is not None:
+        claim = claim.where(Invoice.version == expected_version)
+    try:
+        result = db.session.execute(
+            claim.values(total_amount=total_subquery, version=Invoice.version + 1, **values)
+            .execution_options(synchronize_session=False)
+        )
+    except IntegrityError:
+        # 改為 Pending 或更改送貨日期後，與同客戶同日期的另一張待處理發票衝突
+        db.session.rollback()
+        return jsonify({
+            "message": "This customer already has a pending invoice for that delivery date!",
+            "conflict": "pending_invoice"
+        }), 409
+    if result.rowcount == 0:
+        db.session.rollback()
+        current_version = db.session.query(Invoice.version).filter_by(id=invoice_id).scalar()
+        return jsonify({
+            "message": "Invoice was modified by someone else, please reload!",
+            "conflict": "version",
+            "current_version": current_version
+        }), 409
+    
+    adjust_sales_rollup([invoice_id], 1)
+    db.session.expire(invoice)
+    invoice_data = invoice.to_dict()
+    record_invoice_event(invoice, 'updated', invoice_data, previous_delivery_date)
     db.session.commit()
+    invoice_notifier.notify()
     
-    return jsonify({"message": "Invoice updated successfully!", "invoice": invoice.to_dict()})
+    return jsonify({"message": "Invoice updated successfully!", "invoice": invoice_data})
 
 @invoices_bp.route("/<int:invoice_id>", methods=["DELETE"])
 def delete_invoice(invoice_id):
     invoice = Invoice.query.get_or_404(invoice_id)
+    adjust_sales_rollup([invoice_id], -1)
     db.session.delete(invoice)
+    record_invoice_event(invoice, 'deleted')
     db.session.commit()
+    invoice_notifier.notify()
     
     return jsonify({"message": "Invoice deleted successfully!"})
 
+BULK_STATUSES = ('Completed', 'Cancelled')
+BULK_MAX_IDS = 1000
+
+def bulk_conditions(data):
+    """
+    批次操作的篩選條件：delivery_date、customer_id、ids（發票 id 列表）、current_status，至少需要前三者之一
+    回傳 (條件列表, 錯誤訊息)
+    """
+    conditions = []
+    if data.get('delivery_date'):
+        try:
+            conditions.append(Invoice.delivery_date == datetime.strptime(data['delivery_date'], '%Y-%m-%d').date())
+        except (TypeError, ValueError):
+            return None, "Invalid date format!"
+    if data.get('customer_id') is not None:
+        try:
+            conditions.append(Invoice.customer_id == int(data['customer_id']))
+        except (TypeError, ValueError):
+            return None, "Invalid customer_id!"
+    if data.get('ids') is not None:
+        ids = data['ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return None, "ids must be a list of invoice ids!"
+        if len(ids) > BULK_MAX_IDS:
+            return None, f"Cannot update more than {BULK_MAX_IDS} ids at once!"
+        conditions.append(Invoice.id.in_(ids))
+    if not conditions:
+        return None, "delivery_date, customer_id or ids is required!"
+    if data.get('current_status'):
+        conditions.append(Invoice.status == data['current_status'])
+    return conditions, None
+
+def record_bulk_events(invoice_ids):
+    """為批次更新後的發票寫入變更記錄（一次載入發票、明細與產品）"""
+    invoices = Invoice.query.options(
+        db.selectinload(Invoice.customer),
+        db.selectinload(Invoice.order_items).selectinload(OrderItem.product)
+    ).filter(Invoice.id.in_(invoice_ids)).order_by(Invoice.id).populate_existing()
+    for invoice in invoices:
+        record_invoice_event(invoice, 'updated', invoice.to_dict())
+
+@invoices_bp.route("/bulk/status", methods=["POST"])
+@idempotent
+def bulk_update_status():
+    """
+    以 UPDATE 把符合條件的發票改為 Completed 或 Cancelled（例如結束一個送貨日），每批最多 ID_BATCH_SIZE 張
+    未指定 current_status 時不改動已取消的發票（結束送貨日不會把已取消的發票改為 Completed）
+    不支援改回 Pending：多張發票同時改為 Pending 可能違反每客戶每日一張待處理發票的唯一索引
+    """
+    data = request.json or {}
+    status = data.get('status')
+    if status not in BULK_STATUSES:
+        return jsonify({"message": f"status must be one of: {', '.join(BULK_STATUSES)}!"}), 400
+    conditions, error = bulk_conditions(data)
+    if error:
+        return jsonify({"message": error}), 400
+    if not data.get('current_status'):
+        conditions.append(Invoice.status != 'Cancelled')
+    
+    invoice_ids = db.session.scalars(
+        db.select(Invoice.id).where(*conditions, Invoice.status != status).with_for_update()
+    ).all()
+    if not invoice_ids:
+        return jsonify({"message": "No invoices to update!", "updated": 0, "ids": []})
+    
+    updated_ids = []
+    for batch in id_batches(invoice_ids):
+        adjust_sales_rollup(batch, -1)
+        updated_ids.extend(db.session.scalars(
+            db.update(Invoice)
+            .where(Invoice.id.in_(batch), Invoice.status != status)
+            .values(status=status, version=Invoice.version + 1)
+            .returning(Invoice.id)
+            .execution_options(synchronize_session=False)
+        ).all())
+        adjust_sales_rollup(batch, 1)
+    # 變更記錄在所有寫入之後才寫入（見 lock_change_log）
+    for batch in id_batches(updated_ids):
+        record_bulk_events(batch)
+    db.session.commit()
+    invoice_notifier.notify()
+    
+    return jsonify({
+        "message": f"{len(updated_ids)} invoices marked as {status}!",
+        "updated": len(updated_ids),
+        "ids": sorted(updated_ids)
+    })
+
+@invoices_bp.route("/bulk/delete", methods=["POST"])
+@idempotent
+def bulk_delete_invoices():
+    """以 DELETE 刪除符合條件的發票與其訂單項目，每批最多 ID_BATCH_SIZE 張"""
+    conditions, error = bulk_conditions(request.json or {})
+    if error:
+        return jsonify({"message": error}), 400
+    
+    invoices = db.session.execute(
+        db.select(Invoice.id, Invoice.delivery_date).where(*conditions).with_for_update()
+    ).all()
+    if not invoices:
+        return jsonify({"message": "No invoices to delete!", "deleted": 0, "ids": []})
+    invoice_ids = [invoice.id for invoice in invoices]
+    
+    deleted = 0
+    for batch in id_batches(invoice_ids):
+        adjust_sales_rollup(batch, -1)
+        db.session.execute(
+            db.delete(OrderItem).where(OrderItem.invoice_id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        deleted += db.session.execute(
+            db.delete(Invoice).where(Invoice.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    # 變更記錄在所有寫入之後才寫入，縮短持有 lock_change_log 的時間
+    for invoice in invoices:
+        record_invoice_event(invoice, 'deleted')
+    db.session.commit()
+    invoice_notifier.notify()
+    
+    return jsonify({
+        "message": f"{deleted} invoices deleted successfully!",
+        "deleted": deleted,
+        "ids": sorted(invoice_ids)
+    })
+
+@invoices_bp.route("/changes", methods=["GET"])
+def get_invoice_changes():
+    """
+    增量取得發票變更
+    - since_id: 上次收到的 event_id
+    - date: 只回傳與此送貨日期相關的變更（含從此日期移出的發票）
+    """
+    since_id = request.args.get('since_id', 0, type=int)
+    limit = min(request.args.get('limit', 500, type=int), 500)
+    if limit < 1:
+        return jsonify({"message": "limit must be positive!"}), 400
+    events = invoice_events_query(since_id, parse_date_arg()).limit(limit).all()
+    return jsonify({
+        "events": [e.to_dict() for e in events],
+        "last_event_id": events[-1].id if events else since_id
+    })
+
+@invoices_bp.route("/changes/stream", methods=["GET"])
+def stream_invoice_changes():
+    """以 Server-Sent Events 推送發票變更，支援 Last-Event-ID 續傳與 date 篩選"""
+    if 'Last-Event-ID' in request.headers or 'since_id' in request.args:
+        since_id = last_event_id()
+    else:
+        since_id = latest_invoice_event_id()
+    date = parse_date_arg()
+
+    def fetch(cursor):
+        return [(e.id, e.to_dict()) for e in invoice_events_query(cursor, date).limit(500).all()]
+
+    return event_stream(fetch, since_id, invoice_notifier, event='invoice')
+
+def production_lines(invoice_model, item_model, date_from, date_to):
+    """日期範圍內未取消發票的訂單項目（熱資料表或封存表）"""
+    return (
+        db.select(item_model.product_id, item_model.quantity, item_model.invoice_id)
+        .join(invoice_model, item_model.invoice_id == invoice_model.id)
+        .where(invoice_model.delivery_date.between(date_from, date_to), invoice_model.status != 'Cancelled')
+    )
+
+def production_totals(date_from, date_to, include_archived=False):
+    """以單一 GROUP BY 計算各產品的總生產數量（不含已取消的發票），依 subclass 分組"""
+    lines = production_lines(Invoice, OrderItem, date_from, date_to)
+    if include_archived:
+        lines = db.union_all(lines, production_lines(ArchivedInvoice, ArchivedOrderItem, date_from, date_to))
+    lines = lines.subquery()
+    rows = db.session.execute(
+        db.select(
+            Product.subclass,
+            lines.c.product_id,
+            Product.name,
+            db.func.sum(lines.c.quantity),
+            db.func.count(db.distinct(lines.c.invoice_id))
+        )
+        .select_from(lines)
+        .join(Product, lines.c.product_id == Product.id)
+        .group_by(Product.subclass, lines.c.product_id, Product.name)
+        .order_by(Product.subclass, Product.name)
+    ).all()
+    
+    subclasses = []
+    for subclass, product_id, product_name, quantity, invoice_count in rows:
+        if not subclasses or subclasses[-1]['subclass'] != subclass:
+            subclasses.append({'subclass': subclass, 'total_quantity': 0, 'products': []})
+        subclasses[-1]['total_quantity'] += quantity
+        subclasses[-1]['products'].append({
+            'product_id': product_id,
+            'product_name': product_name,
+            'quantity': quantity,
+            'invoices': invoice_count
+        })
+    return subclasses
+
+@invoices_bp.route("/production", methods=["GET"])
+def get_production_totals():
+    """
+    指定送貨日期（date）或日期範圍（from / to）的各產品總生產數量
+    回傳依 subclass 分組的產品數量
+    """
+    date_from = parse_date_arg('from') or parse_date_arg('date')
+    date_to = parse_date_arg('to') or parse_date_arg('date') or date_from
+    if not date_from:
+        return jsonify({"message": "A valid date or from/to range is required!"}), 400
+    if date_to < date_from:
+        return jsonify({"message": "Invalid date range!"}), 400
+    
+    subclasses = production_totals(date_from, date_to, include_archived_arg())
+    return jsonify({
+        "date_from": date_from.strftime('%Y-%m-%d'),
+        "date_to": date_to.strftime('%Y-%m-%d'),
+        "total_quantity": sum(group['total_quantity'] for group in subclasses),
+        "subclasses": subclasses
+    })
+
+def cutting_list_query(invoice_model, item_model, date_from, date_to):
+    """日期範圍內的明細列（熱資料表或封存表），最後一欄為排序用的訂單項目 id"""
+    return (
+        db.select(
+            invoice_model.delivery_date,
+            Customer.name,
+            invoice_model.id,
+            invoice_model.invoice_number,
+            invoice_model.status,
+            Product.id,
+            Product.name,
+            Product.subclass,
+            item_model.quantity,
+            item_model.id
+        )
+        .select_from(invoice_model)
+        .join(Customer, invoice_model.customer_id == Customer.id)
+        .outerjoin(item_model, item_model.invoice_id == invoice_model.id)
+        .outerjoin(Product, item_model.product_id == Product.id)
+        .where(invoice_model.delivery_date.between(date_from, date_to))
+    )
+
+def cutting_list_rows(date_from, date_to, include_archived=False):
+    """以單一查詢取得日期範圍內所有明細列，依送貨日期、客戶、發票排序並分批讀取"""
+    if not include_archived:
+        query = cutting_list_query(Invoice, OrderItem, date_from, date_to)
+        columns = list(query.selected_columns)
+    else:
+        lines = db.union_all(
+            cutting_list_query(Invoice, OrderItem, date_from, date_to),
+            cutting_list_query(ArchivedInvoice, ArchivedOrderItem, date_from, date_to)
+        ).subquery()
+        columns = list(lines.c)
+        query = db.select(*columns)
+    return db.session.execute(
+        query.with_only_columns(*columns[:-1], maintain_column_froms=True)
+        .order_by(columns[0], columns[1], columns[2], columns[-1])
+        .execution_options(yield_per=500)
+    )
+
+def pdf_spool():
+    # 超過 PDF_SPOOL_MAX_SIZE 時自動改寫到磁碟
+    return tempfile.SpooledTemporaryFile(max_size=current_app.config.get('PDF_SPOOL_MAX_SIZE', 5 * 1024 * 1024))
+
 @invoices_bp.route("/cutting-list/<date>/pdf", methods=["GET"])
 def generate_cutting_list_pdf(date):
-    """生成指定日期的 Cutting List PDF"""
+    """生成指定日期的 Cutting List PDF（單一查詢、逐客戶輸出、寫入暫存檔）"""
     try:
         delivery_date = datetime.strptime(date, '%Y-%m-%d').date()
     except ValueError:
         return jsonify({"message": "Invalid date format!"}), 400
     
-    # 獲取該日期的所有發票
-    invoices = Invoice.query.filter_by(delivery_date=delivery_date).all()
-    
-    if not invoices:
+    rows = iter(cutting_list_rows(delivery_date, delivery_date, include_archived_arg()))
+    first_row = next(rows, None)
+    if first_row is None:
         return jsonify({"message": "No orders for this date!"}), 404
     
-    # 按客戶分組
-    customer_groups = {}
-    for invoice in invoices:
-        customer_name = invoice.customer.name
-        if customer_name not in customer_groups:
-            customer_groups[customer_name] = []
-        customer_groups[customer_name].append(invoice)
-    
-    # 創建 PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # 標題 - 日期
-    title_style = styles['Title']
-    title = Paragraph(f"<b>{date}</b>", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.3*inch))
+    output = pdf_spool()
     
-    # 按客戶名稱排序
-    sorted_customers = sorted(customer_groups.keys())
+    # 生成 PDF（生產彙總頁在同一次讀取明細時累計）
+    with timed('pdf_render_duration_seconds', {'kind': 'cutting_list'}):
+        build_cutting_list(output, date, chain([first_row], rows))
+    metrics.observe('pdf_size_bytes', output.tell(), {'kind': 'cutting_list'})
+    output.seek(0)
     
-    for customer_name in sorted_customers:
-        customer_invoices = customer_groups[customer_name]
-        
-        # 準備該客戶的表格數據
-        table_data = []
-        
-        for idx, invoice in enumerate(customer_invoices):
-            if idx == 0:
-                # ROW 1: 客戶名稱 | 第一個產品 | 數量 | 空格
-                if invoice.order_items:
-                    first_item = invoice.order_items[0]
-                    table_data.append([
-                        customer_name,
-                        first_item.product.name,
-                        str(first_item.quantity),
-                        ''
-                    ])
-                    
-                    # 如果第一張發票有多個產品，添加到 ROW1 之後
-                    for item in invoice.order_items[1:]:
-                        table_data.append([
-                            '',
-                            item.product.name,
-                            str(item.quantity),
-                            ''
-                        ])
-                
-                # ROW 2: 發票號碼 | 第二個產品（如果第二張發票存在）| 空格 | 空格
-                second_product = ''
-                if len(customer_invoices) > 1 and customer_invoices[1].order_items:
-                    second_product = customer_invoices[1].order_items[0].product.name
-                
-                table_data.append([
-                    invoice.invoice_number,
-                    second_product,
-                    '',
-                    ''
-                ])
-            elif idx == 1:
-                # 第二張發票的剩餘產品
-                for item_idx, item in enumerate(invoice.order_items):
-                    if item_idx == 0:
-                        continue  # 第一個已經在 ROW2 顯示
-                    table_data.append([
-                        '',
-                        item.product.name,
-                        str(item.quantity),
-                        ''
-                    ])
-                
-                # 添加發票號碼
-                table_data.append([
-                    invoice.invoice_number,
-                    '',
-                    '',
-                    ''
-                ])
-            else:
-                # 第三張及以後的發票
-                for item in invoice.order_items:
-                    table_data.append([
-                        '',
-                        item.product.name,
-                        str(item.quantity),
-                        ''
-                    ])
-                
-                table_data.append([
-                    invoice.invoice_number,
-                    '',
-                    '',
-                    ''
-                ])
-        
-        # ROW 3: 空行（方便閱讀）
-        table_data.append(['', '', '', ''])
+    return send_file(
+        output,
+        as_attachment=True,
+        download_name=f'cutting_list_{date}.pdf',
+        mimetype='application/pdf'
+    )
+
+def cutting_list_days(date_from, date_to, include_archived=False):
+    """以單一查詢讀取整個日期範圍，依送貨日期切成 (日期, [明細列, ...])"""
+    for delivery_date, rows in groupby(cutting_list_rows(date_from, date_to, include_archived), key=lambda row: row[0]):
+        yield delivery_date.strftime('%Y-%m-%d'), [tuple(row) for row in rows]
+
+@invoices_bp.route("/cutting-list/pdf", methods=["GET"])
+def generate_cutting_list_range_pdf():
+    """
+    生成日期範圍（from / to）內每個送貨日期的 Cutting List，合併為單一 PDF
+    各日期在 worker process 中平行生成，依日期順序合併並加上書籤
+    """
+    date_from = parse_date_arg('from')
+    date_to = parse_date_arg('to') or date_from
+    if not date_from:
+        return jsonify({"message": "A valid from/to range is required!"}), 400
+    if date_to < date_from:
+        return jsonify({"message": "Invalid date range!"}), 400
+    max_days = current_app.config.get('CUTTING_LIST_MAX_DAYS', 31)
+    if (date_to - date_from).days + 1 > max_days:
+        return jsonify({"message": f"Date range cannot exceed {max_days} days!"}), 400
+    
+    output = pdf_spool()
+    with timed('pdf_render_duration_seconds', {'kind': 'cutting_list_range'}):
+        days = cutting_list_days(date_from, date_to, include_archived_arg())
+        executor = process_pool('cutting_list', current_app.config.get('CUTTING_LIST_WORKERS', 1)) if date_from != date_to else None
+        if executor:
+            # 讀取下一個日期的同時，前面的日期已在 worker 中生成
+            pages = [(label, executor.submit(render_cutting_list_pdf, label, rows)) for label, rows in days]
+            pages = [(label, future.result()) for label, future in pages]
+        else:
+            pages = [(label, render_cutting_list_pdf(label, rows)) for label, rows in days]
         
-        # 創建表格
-        customer_table = Table(table_data, colWidths=[2*inch, 2.5*inch, 1*inch, 1*inch])
-        customer_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),  # 客戶名稱加粗
-            ('FONTSIZE', (0, 0), (0, 0), 12),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),  # 除了最後一行空行
-            ('LINEBELOW', (0, -2), (-1, -2), 1, colors.black),  # 表格底部線
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-        ]))
+        if not pages:
+            return jsonify({"message": "No orders for this date range!"}), 404
         
-        elements.append(customer_table)
-        elements.append(Spacer(1, 0.2*inch))
-    
-    # 生成 PDF
-    doc.build(elements)
-    buffer.seek(0)
+        writer = PdfWriter()
+        for label, pdf in pages:
+            writer.append(io.BytesIO(pdf), outline_item=label)
+        writer.write(output)
+    metrics.observe('pdf_size_bytes', output.tell(), {'kind': 'cutting_list_range'})
+    output.seek(0)
     
     return send_file(
-        buffer,
+        output,
         as_attachment=True,
-        download_name=f'cutting_list_{date}.pdf',
+        download_name=f"cutting_list_{date_from.strftime('%Y-%m-%d')}_{date_to.strftime('%Y-%m-%d')}.pdf",
         mimetype='application/pdf'
     )
 
 @invoices_bp.route("/<int:invoice_id>/pdf", methods=["GET"])
 def generate_invoice_pdf(invoice_id):
-    invoice = Invoice.query.get_or_404(invoice_id)
+    invoice = find_invoice(invoice_id, include_archived_arg())
     
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
@@ -423,7 +886,9 @@ def generate_invoice_pdf(invoice_id):
     ]))
     elements.append(total_table)
     
-    doc.build(elements)
+    with timed('pdf_render_duration_seconds', {'kind': 'invoice'}):
+        doc.build(elements)
+    metrics.observe('pdf_size_bytes', buffer.getbuffer().nbytes, {'kind': 'invoice'})
     buffer.seek(0)
     
     return send_file(
@@ -1,12 +1,54 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import db, Message
+from sse import ChangeNotifier, event_stream, last_event_id
 
 messages_bp = Blueprint("messages", __name__)
 
+# 同一 worker 內新增留言後喚醒 SSE 串流
+message_notifier = ChangeNotifier()
+
+def message_to_dict(m):
+    return {"id": m.id, "user": m.user, "content": m.content}
+
+def fetch_messages_since(since_id, limit):
+    """取得 id 大於 since_id 的留言（依 id 遞增）"""
+    return Message.query.filter(Message.id > since_id).order_by(Message.id).limit(limit).all()
+
 @messages_bp.route("/", methods=["GET"])
 def get_messages():
-    messages = Message.query.all()
-    return jsonify([{"id": m.id, "user": m.user, "content": m.content} for m in messages])
+    """
+    取得留言
+    - since_id: 只回傳比此 id 新的留言（增量輪詢）
+    - limit: 單次回傳上限，未指定 since_id 時回傳最新的 limit 筆
+    """
+    max_limit = current_app.config.get('MESSAGES_MAX_LIMIT', 500)
+    limit = min(request.args.get('limit', max_limit, type=int), max_limit)
+    if limit < 1:
+        return jsonify({"message": "limit must be positive!"}), 400
+    since_id = request.args.get('since_id', type=int)
+
+    if since_id is not None:
+        messages = fetch_messages_since(since_id, limit)
+    else:
+        latest = Message.query.order_by(Message.id.desc()).limit(limit).all()
+        messages = list(reversed(latest))
+
+    return jsonify([message_to_dict(m) for m in messages])
+
+@messages_bp.route("/stream", methods=["GET"])
+def stream_messages():
+    """以 Server-Sent Events 推送新留言，支援 Last-Event-ID 續傳"""
+    if 'Last-Event-ID' in request.headers or 'since_id' in request.args:
+        since_id = last_event_id()
+    else:
+        # 沒有指定起點時只推送之後的新留言
+        since_id = db.session.query(db.func.max(Message.id)).scalar() or 0
+    batch_size = current_app.config.get('MESSAGES_MAX_LIMIT', 500)
+
+    def fetch(cursor):
+        return [(m.id, message_to_dict(m)) for m in fetch_messages_since(cursor, batch_size)]
+
+    return event_stream(fetch, since_id, message_notifier, event='message')
 
 @messages_bp.route("/", methods=["POST"])
 def add_message():
@@ -14,4 +56,5 @@ def add_message():
     new_msg = Message(user=data["user"], content=data["content"])
     db.session.add(new_msg)
     db.session.commit()
-    return jsonify({"message": "Message added!"}), 201
+    message_notifier.notify()
+    return jsonify({"message": "Message added!", "id": new_msg.id}), 201
@@ -1,10 +1,31 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import IntegrityError
 from models import db, Product
+from db_utils import dialect_insert
+from bulk_import import IMPORT_MODES, ImportReport, read_csv_chunks, upload_stream
+import csv
+from idempotency import idempotent, refresh_pending_key
+from batch_lookup import parse_ids_arg, batch_response
+from invoice_maintenance import reprice_pending_lines
+from rollups import sync_rollup_subclass
+from routes.invoices import invoice_notifier
+from catalog_changes import record_catalog_changes, changes_response
 
 products_bp = Blueprint("products", __name__)
 
+def product_to_dict(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": product.price,
+        "subclass": product.subclass
+    }
+
 @products_bp.route("/", methods=["GET"])
 def get_products():
+    if 'ids' in request.args:
+        return get_products_by_ids()
+    
     limit = request.args.get('limit', type=int)
     search = request.args.get('search', type=str)
     
@@ -25,22 +46,26 @@ def get_products():
     else:
         products = query.all()
     
-    return jsonify([{
-        "id": p.id, 
-        "name": p.name, 
-        "price": p.price,
-        "subclass": p.subclass
-    } for p in products])
+    return jsonify([product_to_dict(p) for p in products])
+
+def get_products_by_ids():
+    """GET /api/products/?ids=a,b,c：以單一 IN 查詢取得多個產品，依請求順序回傳"""
+    try:
+        ids = parse_ids_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    products = Product.query.filter(Product.id.in_(set(ids)))
+    return batch_response(ids, {p.id: product_to_dict(p) for p in products}, 'product')
+
+@products_bp.route("/changes", methods=["GET"])
+def get_product_changes():
+    """增量同步產品資料：since=<version> 之後新增、修改的產品與刪除的產品 id"""
+    return changes_response('product', Product, product_to_dict)
 
 @products_bp.route("/<string:product_id>", methods=["GET"])
 def get_product(product_id):
     product = Product.query.get_or_404(product_id)
-    return jsonify({
-        "id": product.id,
-        "name": product.name,
-        "price": product.price,
-        "subclass": product.subclass
-    })
+    return jsonify(product_to_dict(product))
 
 @products_bp.route("/", methods=["POST"])
 def add_product():
@@ -63,12 +88,102 @@ def add_product():
     )
     
     db.session.add(new_product)
+    record_catalog_changes('product', [new_product.id])
     db.session.commit()
     
     return jsonify({"message": "Product added!", "id": data["id"]}), 201
 
+@products_bp.route("/import", methods=["POST"])
+@idempotent
+def import_products():
+    """
+    從 CSV 批次匯入產品（欄位: id, name, price, subclass）
+    - mode=upsert（預設）: 已存在的產品會被更新；mode=insert: 已存在的產品列為錯誤
+    每批以單一查詢檢查是否存在、單一 INSERT 寫入並提交，回傳逐列錯誤報告
+    """
+    mode = request.args.get('mode', 'upsert')
+    if mode not in IMPORT_MODES:
+        return jsonify({"message": f"Unknown mode: {mode}"}), 400
+    stream = upload_stream()
+    if stream is None:
+        return jsonify({"message": "CSV file is required!"}), 400
+    
+    report = ImportReport()
+    seen = set()
+    chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', 500)
+    try:
+        for chunk in read_csv_chunks(stream, ('id', 'name', 'price', 'subclass'), chunk_size):
+            rows = []
+            for line, row in chunk:
+                report.rows += 1
+                product_id = row.get('id', '')
+                if not product_id or not row.get('name') or not row.get('price') or not row.get('subclass'):
+                    report.error(line, product_id, "所有欄位都是必填的！")
+                    continue
+                try:
+                    price = float(row['price'])
+                except ValueError:
+                    report.error(line, product_id, "價格格式錯誤！")
+                    continue
+                if product_id in seen:
+                    report.error(line, product_id, "產品 ID 在檔案中重複！")
+                    continue
+                seen.add(product_id)
+                rows.append((line, {'id': product_id, 'name': row['name'], 'price': price, 'subclass': row['subclass']}))
+            
+            if rows:
+                import_product_chunk(rows, mode, report)
+            refresh_pending_key()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except (csv.Error, UnicodeDecodeError) as e:
+        report.error(None, None, f"Invalid CSV: {e}")
+    
+    return jsonify(report.to_dict())
+
+def import_product_chunk(rows, mode, report):
+    """寫入一批已驗證的產品並提交"""
+    existing = set(db.session.scalars(
+        db.select(Product.id).where(Product.id.in_([values['id'] for _, values in rows]))
+    ))
+    if mode == 'insert':
+        for line, values in rows:
+            if values['id'] in existing:
+                report.error(line, values['id'], "產品 ID 已存在！")
+        rows = [(line, values) for line, values in rows if values['id'] not in existing]
+        if not rows:
+            return
+    
+    stmt = dialect_insert(Product).values([values for _, values in rows])
+    if mode == 'upsert':
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.id],
+            set_={'name': stmt.excluded.name, 'price': stmt.excluded.price, 'subclass': stmt.excluded.subclass}
+        )
+    try:
+        db.session.execute(stmt)
+        if mode == 'upsert':
+            sync_rollup_subclass([values['id'] for _, values in rows if values['id'] in existing])
+        record_catalog_changes('product', [values['id'] for _, values in rows])
+        db.session.commit()
+    except IntegrityError as e:
+        # 與其他請求同時寫入相同 ID 時，整批放棄並列為錯誤
+        db.session.rollback()
+        for line, values in rows:
+            report.error(line, values['id'], f"Database error: {e.orig}")
+        return
+    
+    updated = sum(1 for _, values in rows if values['id'] in existing)
+    report.updated += updated
+    report.created += len(rows) - updated
+
 @products_bp.route("/<string:product_id>", methods=["PUT"])
 def update_product(product_id):
+    """
+    更新產品
+    reprice_pending 為 true 時，同一交易中把待處理發票裡此產品的單價改為目前價格並重新計算發票總金額
+    （已完成、已取消的發票保留下單時的價格）
+    """
     product = Product.query.get_or_404(product_id)
     data = request.json
     
@@ -76,17 +191,33 @@ def update_product(product_id):
         product.name = data["name"]
     if "price" in data:
         product.price = float(data["price"])
-    if "subclass" in data:
+    if "subclass" in data and data["subclass"] != product.subclass:
         product.subclass = data["subclass"]
+        # sales_daily 儲存產品分類，同一交易中更新既有的彙總列
+        sync_rollup_subclass([product.id])
     
+    if not data.get("reprice_pending"):
+        record_catalog_changes('product', [product.id])
+        db.session.commit()
+        return jsonify({"message": "Product updated!"})
+    
+    lines, invoice_ids = reprice_pending_lines(product.id, product.price)
+    record_catalog_changes('product', [product.id])
     db.session.commit()
+    if invoice_ids:
+        invoice_notifier.notify()
     
-    return jsonify({"message": "Product updated!"})
+    return jsonify({
+        "message": "Product updated!",
+        "repriced_lines": lines,
+        "repriced_invoices": len(invoice_ids)
+    })
 
 @products_bp.route("/<string:product_id>", methods=["DELETE"])
 def delete_product(product_id):
     product = Product.query.get_or_404(product_id)
     db.session.delete(product)
+    record_catalog_changes('product', [product.id], 'delete')
     db.session.commit()
     
     return jsonify({"message": "Product deleted!"})
\ No newline at end of file
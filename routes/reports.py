@@ -0,0 +1,206 @@
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from models import db, SalesDaily, Product, Customer, Invoice, OrderItem
+from datetime import datetime, date
+from metrics import metrics
+import csv
+import io
+import json
+
+reports_bp = Blueprint("reports", __name__)
+
+# group_by 參數對應的彙總欄位
+GROUP_COLUMNS = {
+    'day': [SalesDaily.sales_date],
+    'product': [SalesDaily.product_id, Product.name],
+    'subclass': [SalesDaily.subclass],
+    'customer': [SalesDaily.customer_id, Customer.name],
+}
+
+@reports_bp.route("/sales", methods=["GET"])
+def sales_report():
+    """
+    銷售報表（從 sales_daily 彙總表查詢，不掃描訂單明細）
+    參數: from, to (YYYY-MM-DD), group_by=day,product,subclass,customer,
+          product_id, customer_id, subclass
+    """
+    try:
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"message": "Invalid date format!"}), 400
+    
+    group_by = [g for g in request.args.get('group_by', 'day').split(',') if g]
+    unknown = [g for g in group_by if g not in GROUP_COLUMNS]
+    if unknown:
+        return jsonify({"message": f"Unknown group_by: {', '.join(unknown)}"}), 400
+    
+    columns = [column for g in group_by for column in GROUP_COLUMNS[g]]
+    query = db.select(
+        *columns,
+        db.func.sum(SalesDaily.quantity),
+        db.func.sum(SalesDaily.revenue),
+        db.func.sum(SalesDaily.line_count)
+    ).select_from(SalesDaily)
+    if 'product' in group_by:
+        query = query.join(Product, Product.id == SalesDaily.product_id)
+    if 'customer' in group_by:
+        query = query.join(Customer, Customer.id == SalesDaily.customer_id)
+    
+    if date_from:
+        query = query.where(SalesDaily.sales_date >= date_from)
+    if date_to:
+        query = query.where(SalesDaily.sales_date <= date_to)
+    if request.args.get('product_id'):
+        query = query.where(SalesDaily.product_id == request.args['product_id'])
+    if request.args.get('customer_id', type=int):
+        query = query.where(SalesDaily.customer_id == request.args.get('customer_id', type=int))
+    if request.args.get('subclass'):
+        query = query.where(SalesDaily.subclass == request.args['subclass'])
+    
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+    
+    rows = []
+    for row in db.session.execute(query):
+        entry = {}
+        values = list(row)
+        for g in group_by:
+            if g == 'day':
+                entry['date'] = values.pop(0).strftime('%Y-%m-%d')
+            elif g == 'product':
+                entry['product_id'] = values.pop(0)
+                entry['product_name'] = values.pop(0)
+            elif g == 'subclass':
+                entry['subclass'] = values.pop(0)
+            elif g == 'customer':
+                entry['customer_id'] = values.pop(0)
+                entry['customer_name'] = values.pop(0)
+        quantity, revenue, lines = values
+        entry['quantity'] = quantity or 0
+        entry['revenue'] = round(revenue or 0.0, 2)
+        entry['lines'] = lines or 0
+        rows.append(entry)
+    
+    return jsonify(rows)
+
+# 匯出欄位: (欄位名稱, 資料欄)
+EXPORT_COLUMNS = {
+    'invoices': [
+        ('invoice_id', Invoice.id),
+        ('invoice_number', Invoice.invoice_number),
+        ('customer_id', Invoice.customer_id),
+        ('customer_name', Customer.name),
+        ('delivery_date', Invoice.delivery_date),
+        ('created_date', Invoice.created_date),
+        ('status', Invoice.status),
+        ('total_amount', Invoice.total_amount),
+        ('version', Invoice.version),
+    ],
+    'items': [
+        ('item_id', OrderItem.id),
+        ('invoice_id', Invoice.id),
+        ('invoice_number', Invoice.invoice_number),
+        ('delivery_date', Invoice.delivery_date),
+        ('status', Invoice.status),
+        ('customer_id', Invoice.customer_id),
+        ('customer_name', Customer.name),
+        ('product_id', OrderItem.product_id),
+        ('product_name', Product.name),
+        ('product_subclass', Product.subclass),
+        ('quantity', OrderItem.quantity),
+        ('unit_price', OrderItem.unit_price),
+        ('total_price', OrderItem.total_price),
+    ],
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+def export_query(kind, date_from, date_to):
+    """匯出用的扁平查詢（只選取欄位，不建立 ORM 物件），依送貨日期、發票排序"""
+    query = db.select(*[column for _, column in EXPORT_COLUMNS[kind]])
+    if kind == 'items':
+        query = (
+            query.select_from(OrderItem)
+            .join(Invoice, OrderItem.invoice_id == Invoice.id)
+            .outerjoin(Product, OrderItem.product_id == Product.id)
+        )
+    else:
+        query = query.select_from(Invoice)
+    query = query.outerjoin(Customer, Invoice.customer_id == Customer.id)
+    
+    if date_from:
+        query = query.where(Invoice.delivery_date >= date_from)
+    if date_to:
+        query = query.where(Invoice.delivery_date <= date_to)
+    
+    order = [Invoice.delivery_date, Invoice.id]
+    if kind == 'items':
+        order.append(OrderItem.id)
+    return query.order_by(*order)
+
+def export_value(value):
+    """日期格式與 to_dict 一致"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+def export_chunks(kind, fmt, query, batch_size):
+    """
+    以 server-side cursor 分批讀取（yield_per），每批輸出一個區塊
+    記憶體只保留一批資料，與匯出總列數無關
+    """
+    names = [name for name, _ in EXPORT_COLUMNS[kind]]
+    result = db.session.execute(query.execution_options(yield_per=batch_size))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if fmt == 'csv':
+        writer.writerow(names)
+    
+    count = 0
+    for partition in result.partitions():
+        if fmt == 'csv':
+            writer.writerows([export_value(v) for v in row] for row in partition)
+        else:
+            for row in partition:
+                buffer.write(json.dumps(dict(zip(names, map(export_value, row))), ensure_ascii=False))
+                buffer.write('\n')
+        count += len(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if fmt == 'csv' and count == 0:
+        yield buffer.getvalue()
+    metrics.inc('export_rows_total', {'kind': kind, 'format': fmt}, count)
+
+@reports_bp.route("/export/<kind>", methods=["GET"])
+def export_rows(kind):
+    """
+    串流匯出發票（invoices）或訂單項目（items）的扁平資料
+    參數: from, to (YYYY-MM-DD，依送貨日期), format=csv|ndjson
+    """
+    if kind not in EXPORT_COLUMNS:
+        return jsonify({"message": f"Unknown export: {kind}"}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"message": f"Unknown format: {fmt}"}), 400
+    try:
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"message": "Invalid date format!"}), 400
+    
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 2000)
+    query = export_query(kind, date_from, date_to)
+    period = '_'.join(d.strftime('%Y%m%d') for d in (date_from, date_to) if d)
+    filename = f"{kind}{'_' + period if period else ''}.{fmt}"
+    
+    # stream_with_context 讓數據庫 session 在串流結束前保持可用
+    response = Response(stream_with_context(export_chunks(kind, fmt, query, batch_size)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,91 @@
+"""
+既有數據庫的結構遷移（migrate_db.py）
+db.create_all 只會建立不存在的資料表，既有資料表新增的欄位與索引由此補上
+- 每個遷移先檢查是否已套用，已套用的會略過，可重複執行
+- 依序執行：後面的遷移（例如合併重複發票時的 ORM 查詢）可能依賴前面補上的欄位
+- 不在 app 啟動時自動執行；啟動時只以 pending_migrations 檢查並記錄警告
+- SQLite 無法修改既有資料表的 AUTOINCREMENT，以建立新表、複製資料、改名的方式重建
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable
+
+from models import db, Invoice, OrderItem, ArchivedInvoice, ArchivedOrderItem
+from db_utils import sqlite_autoincrement_missing
+from invoice_maintenance import PENDING_INVOICE_INDEX, ensure_pending_invoice_index
+
+
+def has_column(table, column):
+    return column in {c['name'] for c in inspect(db.engine).get_columns(table)}
+
+
+def has_index(table, name):
+    return name in {index['name'] for index in inspect(db.engine).get_indexes(table)}
+
+
+def add_invoice_version():
+    db.session.execute(db.text("ALTER TABLE invoices ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    db.session.commit()
+    return 'added column'
+
+
+def add_pending_invoice_index():
+    merged = ensure_pending_invoice_index()
+    return f'created index, merged {merged} duplicate pending invoices'
+
+
+def rebuild_with_autoincrement(model, archive_model):
+    """
+    以 AUTOINCREMENT 重建 SQLite 資料表並保留所有資料與索引，
+    sqlite_sequence 設為熱資料表與封存表中最大的 id，之後的新資料不會重用已封存的 id
+    """
+    table = model.__table__
+    name = table.name
+    new_name = f'{name}_rebuild'
+    ddl = str(CreateTable(table).compile(db.engine)).replace(f'CREATE TABLE {name} ', f'CREATE TABLE {new_name} ', 1)
+    columns = ', '.join(column.name for column in table.columns)
+
+    db.session.execute(db.text(ddl))
+    db.session.execute(db.text(f'INSERT INTO {new_name} ({columns}) SELECT {columns} FROM {name}'))
+    db.session.execute(db.text(f'DROP TABLE {name}'))
+    db.session.execute(db.text(f'ALTER TABLE {new_name} RENAME TO {name}'))
+    connection = db.session.connection()
+    for index in table.indexes:
+        index.create(connection)
+
+    max_id = max(
+        db.session.query(db.func.max(model.id)).scalar() or 0,
+        db.session.query(db.func.max(archive_model.id)).scalar() or 0
+    )
+    db.session.execute(db.text('DELETE FROM sqlite_sequence WHERE name = :name'), {'name': name})
+    db.session.execute(db.text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)'),
+                       {'name': name, 'seq': max_id})
+    db.session.commit()
+    return f'rebuilt with AUTOINCREMENT, next id after {max_id}'
+
+
+# (名稱, 是否已套用, 套用並回傳說明)
+MIGRATIONS = [
+    ('invoices.version', lambda: has_column(Invoice.__tablename__, 'version'), add_invoice_version),
+    (PENDING_INVOICE_INDEX, lambda: has_index(Invoice.__tablename__, PENDING_INVOICE_INDEX), add_pending_invoice_index),
+    # 重建時會一併建立上面的索引，需放在合併重複發票之後
+    ('invoices AUTOINCREMENT', lambda: not sqlite_autoincrement_missing(Invoice.__tablename__),
+     lambda: rebuild_with_autoincrement(Invoice, ArchivedInvoice)),
+    ('order_items AUTOINCREMENT', lambda: not sqlite_autoincrement_missing(OrderItem.__tablename__),
+     lambda: rebuild_with_autoincrement(OrderItem, ArchivedOrderItem)),
+]
+
+
+def pending_migrations():
+    """尚未套用的遷移名稱"""
+    return [name for name, applied, _ in MIGRATIONS if not applied()]
+
+
+def run_migrations(dry_run=False):
+    """依序套用尚未套用的遷移，回傳 [(名稱, 說明)]"""
+    results = []
+    for name, applied, apply in MIGRATIONS:
+        if applied():
+            continue
+        results.append((name, 'pending' if dry_run else apply()))
+    return results
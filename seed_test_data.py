@@ -308,7 +308,7 @@ def create_test_invoices():
             'invoice_number': 'INV-2025-010',
             'customer': ben,
             'delivery_date': today + timedelta(days=2),
-            'status': 'Pending',
+            'status': 'Completed',
             'items': [
                 {'product_id': 'WBM', 'quantity': 20},
                 {'product_id': 'CHICKENB', 'quantity': 12},
@@ -372,7 +372,7 @@ def create_test_invoices():
             'invoice_number': 'INV-2025-016',
             'customer': kamal,
             'delivery_date': today + timedelta(days=3),
-            'status': 'Pending',
+            'status': 'Completed',
             'items': [
                 {'product_id': 'JCMB4SL', 'quantity': 8},
                 {'product_id': 'AMGSL', 'quantity': 6},
@@ -382,7 +382,7 @@ def create_test_invoices():
             'invoice_number': 'INV-2025-017',
             'customer': kago,
             'delivery_date': today + timedelta(days=3),
-            'status': 'Pending',
+            'status': 'Completed',
             'items': [
                 {'product_id': 'WBD', 'quantity': 10},
                 {'product_id': 'CHICKENT', 'quantity': 12},
@@ -447,7 +447,7 @@ def create_test_invoices():
             'invoice_number': 'INV-2025-023',
             'customer': ko,
             'delivery_date': today + timedelta(days=4),
-            'status': 'Pending',
+            'status': 'Completed',
             'items': [
                 {'product_id': 'JCMB2SL', 'quantity': 10},
                 {'product_id': 'WBD', 'quantity': 14},
@@ -466,7 +466,7 @@ def create_test_invoices():
             'invoice_number': 'INV-2025-025',
             'customer': kago,
             'delivery_date': today + timedelta(days=4),
-            'status': 'Pending',
+            'status': 'Completed',
             'items': [
                 {'product_id': 'AMGSL', 'quantity': 12},
                 {'product_id': 'AMGSL250', 'quantity': 15},
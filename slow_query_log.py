@@ -0,0 +1,153 @@
+"""
+慢查詢記錄
+- 超過 SLOW_QUERY_THRESHOLD_MS 的語句連同參數、呼叫端點放入佇列
+- 背景執行緒另開連線取得查詢計畫（SQLite: EXPLAIN QUERY PLAN，PostgreSQL: EXPLAIN）
+- 寫入可輪替的本地檔案，請求執行緒不需等待 EXPLAIN 或磁碟 I/O
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+EXPLAIN_PREFIXES = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+MAX_PARAM_LENGTH = 100
+
+logger = logging.getLogger('slow_query')
+
+
+def _format_params(parameters):
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{k}: {_truncate_value(v)}' for k, v in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(_truncate_value(v) for v in parameters) + ')'
+    return _truncate_value(parameters)
+
+
+def _truncate_value(value):
+    text = repr(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + '...'
+
+
+class SlowQueryLogger(threading.Thread):
+    """背景執行緒：取得查詢計畫並寫入 log 檔"""
+
+    def __init__(self, engine, explain, max_queue=1000):
+        super().__init__(daemon=True, name='slow-query-log')
+        self.engine = engine
+        self.explain = explain
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def submit(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            try:
+                self._write(record)
+            except Exception:
+                logger.exception('Failed to write slow query record')
+
+    def _write(self, record):
+        statement, parameters, executemany = record['statement'], record['parameters'], record['executemany']
+        plan = None
+        if self.explain and not executemany and statement.lstrip().upper().startswith(EXPLAIN_PREFIXES):
+            plan = self._explain(statement, parameters)
+
+        lines = [
+            f"[{record['timestamp']}] {record['duration_ms']:.1f} ms "
+            f"endpoint={record['endpoint']} {record['method']} {record['path']}",
+            f"  SQL: {' '.join(statement.split())}",
+            f"  Params: {_format_params(parameters)}",
+        ]
+        if plan:
+            lines.append('  Plan:')
+            lines.extend(f'    {row}' for row in plan)
+        if self.dropped:
+            lines.append(f'  ({self.dropped} slow queries dropped because the log queue was full)')
+            self.dropped = 0
+        logger.warning('\n'.join(lines))
+
+    def _explain(self, statement, parameters):
+        dialect = self.engine.dialect.name
+        if dialect == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif dialect == 'postgresql':
+            prefix = 'EXPLAIN '
+        else:
+            return None
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+                conn.rollback()
+        except Exception as e:
+            return [f'EXPLAIN failed: {e}']
+
+        if dialect == 'sqlite':
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
+
+
+def init_slow_query_log(app):
+    """依設定註冊慢查詢記錄；SLOW_QUERY_THRESHOLD_MS 未設定時不啟用"""
+    threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    if threshold_ms is None:
+        return None
+    threshold = threshold_ms / 1000.0
+
+    handler = RotatingFileHandler(
+        app.config['SLOW_QUERY_LOG_FILE'],
+        maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=app.config.get('SLOW_QUERY_LOG_BACKUP_COUNT', 5),
+        encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+    with app.app_context():
+        engine = db.engine
+    worker = SlowQueryLogger(engine, app.config.get('SLOW_QUERY_EXPLAIN', True))
+    worker.start()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start_time', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def check_slow(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get('slow_query_start_time')
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        if elapsed < threshold or statement.startswith('EXPLAIN'):
+            return
+
+        in_request = has_request_context()
+        worker.submit({
+            'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_ms': elapsed * 1000,
+            'statement': statement,
+            'parameters': parameters,
+            'executemany': executemany,
+            'endpoint': (request.endpoint if in_request else None) or '-',
+            'method': request.method if in_request else '',
+            'path': request.path if in_request else '',
+        })
+
+    app.extensions['slow_query_log'] = worker
+    return worker
@@ -0,0 +1,165 @@
+"""
+每個請求的 SQL 監控
+- 在 db engine 上註冊事件，統計每個請求的語句數量與耗時
+- 透過 Server-Timing 回應標頭輸出總計，SQL_DEBUG 開啟時附加 JSON 摘要
+  （標頭超過 SQL_SUMMARY_HEADER_MAX 時截斷，完整摘要寫入日誌）
+- 同一語句形狀在單一請求中執行超過門檻時，記錄 N+1 警告與呼叫位置
+"""
+
+import json
+import os
+import re
+import time
+import traceback
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%\([^)]+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\([^)]+\)s|%s|:\w+)\s*\)')
+
+
+def statement_shape(statement):
+    """將 SQL 正規化為「形狀」：壓縮空白，IN 參數列表合併為單一佔位符"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    return _PLACEHOLDER_LIST.sub('(?)', shape)
+
+
+def find_call_site():
+    """找出觸發查詢的專案內程式碼位置（略過第三方套件與本模組）"""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if not filename.startswith(_PROJECT_ROOT) or filename == os.path.abspath(__file__):
+            continue
+        if 'site-packages' in filename:
+            continue
+        return f"{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+def current_sql_stats():
+    """取得目前請求的 SQL 統計，非請求環境或未啟用時回傳 None"""
+    if not has_request_context():
+        return None
+    return g.get('sql_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+
+    stats = current_sql_stats()
+    if stats is None:
+        return
+
+    stats['count'] += 1
+    stats['time'] += elapsed
+
+    shape = statement_shape(statement)
+    entry = stats['shapes'].get(shape)
+    if entry is None:
+        entry = stats['shapes'][shape] = {'count': 0, 'time': 0.0, 'call_site': None}
+    entry['count'] += 1
+    entry['time'] += elapsed
+
+    # 剛好超過門檻時才解析呼叫堆疊，避免每次查詢都付出代價
+    if entry['count'] == stats['threshold'] + 1:
+        entry['call_site'] = find_call_site()
+        stats['repeated'].append(shape)
+
+
+def build_summary(stats, limit=5):
+    """整理 SQL 摘要（依耗時排序的語句形狀）"""
+    shapes = sorted(stats['shapes'].items(), key=lambda kv: kv[1]['time'], reverse=True)
+    return {
+        'queries': stats['count'],
+        'db_ms': round(stats['time'] * 1000, 2),
+        'repeated': [
+            {'statement': shape[:200], 'count': stats['shapes'][shape]['count'],
+             'call_site': stats['shapes'][shape]['call_site']}
+            for shape in stats['repeated']
+        ],
+        'top': [
+            {'statement': shape[:200], 'count': entry['count'],
+             'ms': round(entry['time'] * 1000, 2)}
+            for shape, entry in shapes[:limit]
+        ],
+    }
+
+
+def summary_header(summary, max_size):
+    """序列化摘要供標頭使用，超過 max_size 時逐一移除 top / repeated 的項目並標記 truncated"""
+    value = json.dumps(summary, ensure_ascii=True)
+    if len(value) <= max_size:
+        return value, False
+
+    summary = dict(summary, repeated=list(summary['repeated']), top=list(summary['top']), truncated=True)
+    for key in ('top', 'repeated'):
+        while summary[key]:
+            summary[key].pop()
+            value = json.dumps(summary, ensure_ascii=True)
+            if len(value) <= max_size:
+                return value, True
+    return json.dumps({'queries': summary['queries'], 'db_ms': summary['db_ms'], 'truncated': True}), True
+
+
+def init_sql_instrumentation(app):
+    """在 app 的 db engine 上註冊 SQL 監控"""
+    if not app.config.get('SQL_TIMING_ENABLED', True):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+    debug_summary = app.config.get('SQL_DEBUG', False)
+    header_max = app.config.get('SQL_SUMMARY_HEADER_MAX', 4096)
+
+    @app.before_request
+    def start_sql_stats():
+        g.request_start_time = time.perf_counter()
+        g.sql_stats = {'count': 0, 'time': 0.0, 'shapes': {}, 'repeated': [],
+                       'threshold': threshold}
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+
+        total_ms = (time.perf_counter() - g.request_start_time) * 1000
+        db_ms = stats['time'] * 1000
+        response.headers.add(
+            'Server-Timing',
+            f'db;desc="{stats["count"]} queries";dur={db_ms:.2f}, app;dur={total_ms - db_ms:.2f}, '
+            f'total;dur={total_ms:.2f}'
+        )
+
+        for shape in stats['repeated']:
+            entry = stats['shapes'][shape]
+            app.logger.warning(
+                'Possible N+1: statement ran %d times in %s %s (threshold %d) at %s: %s',
+                entry['count'], request.method, request.path, threshold,
+                entry['call_site'], shape[:200]
+            )
+
+        if debug_summary:
+            summary = build_summary(stats)
+            value, truncated = summary_header(summary, header_max)
+            if truncated:
+                app.logger.info('SQL summary for %s %s (header truncated): %s',
+                                request.method, request.path, json.dumps(summary, ensure_ascii=False))
+            response.headers['X-SQL-Summary'] = value
+        return response
+
@@ -0,0 +1,125 @@
+"""
+Server-Sent Events 共用工具
+- ChangeNotifier：同一 worker 內提交新資料後喚醒等待中的串流
+- event_stream：依 last_id 增量查詢並輸出 SSE；其他 worker 的提交則靠定期輪詢補上
+- 等待期間會釋放數據庫連線，長連線不會占用連線池
+- 每個串流占用一個 worker 執行緒直到 SSE_MAX_DURATION，需使用 threaded worker（gunicorn gthread）；
+  每個行程同時最多 SSE_MAX_STREAMS 個串流，超過時回傳 503，前端改為輪詢 /changes
+"""
+
+import json
+import threading
+import time
+
+from flask import Response, current_app, request, stream_with_context, jsonify
+
+from models import db
+
+
+class ChangeNotifier:
+    """以版本號 + Condition 通知有新資料"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def notify(self):
+        with self._condition:
+            self._version += 1
+            self._condition.notify_all()
+
+    def wait(self, version, timeout):
+        """等待版本變更或逾時，回傳最新版本"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+
+class StreamSlots:
+    """每個行程同時開啟的串流數"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self, limit):
+        with self._lock:
+            if self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+stream_slots = StreamSlots()
+
+
+def last_event_id(default=0):
+    """取得續傳位置：優先使用瀏覽器重連時帶的 Last-Event-ID，其次為 since_id 參數"""
+    value = request.headers.get('Last-Event-ID') or request.args.get('since_id')
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def format_event(event_id, data, event=None):
+    lines = [f'id: {event_id}']
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(fetch_since, last_id, notifier, event=None):
+    """
+    建立 SSE 回應
+    fetch_since(last_id) 回傳 [(event_id, data), ...]，依 event_id 遞增排序
+    """
+    config = current_app.config
+    poll_interval = config.get('SSE_POLL_INTERVAL', 2.0)
+    heartbeat = config.get('SSE_HEARTBEAT_INTERVAL', 15.0)
+    max_duration = config.get('SSE_MAX_DURATION', 300.0)
+    if not stream_slots.acquire(config.get('SSE_MAX_STREAMS', 8)):
+        response = jsonify({"message": "Too many open streams, poll the changes endpoint instead"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(max_duration))
+        return response
+
+    @stream_with_context
+    def generate():
+        cursor = last_id
+        started = last_sent = time.monotonic()
+        # 告訴瀏覽器斷線後多久重連
+        yield f'retry: {int(poll_interval * 1000)}\n\n'
+        while time.monotonic() - started < max_duration:
+            version = notifier.version
+            try:
+                rows = fetch_since(cursor)
+            finally:
+                # 等待前歸還連線，避免串流長期占用連線池
+                db.session.remove()
+            for event_id, data in rows:
+                cursor = event_id
+                yield format_event(event_id, data, event)
+            if rows:
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield ': keepalive\n\n'
+            notifier.wait(version, poll_interval)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # 連線結束（包含串流未開始就中斷）時由 WSGI server 呼叫
+    response.call_on_close(stream_slots.release)
+    return response
@@ -0,0 +1,152 @@
+let currentCustomerId = null;
+
+// 從 URL 獲取客戶 ID
+window.addEventListener('DOMContentLoaded', function() {
+const pathParts = window.location.pathname.split('/');
+currentCustomerId = pathParts[pathParts.length - 1];
+loadCustomer();
+
+// 監聽特殊產品輸入框變化
+document.getElementById('specialItems').addEventListener('input', updateItemCount);
+});
+
+// 更新產品計數
+function updateItemCount() {
+const input = document.getElementById('specialItems').value;
+const items = parseSpecialItems(input);
+const count = items.length;
+const countElement = document.querySelector('.item-count');
+countElement.textContent = `(${count}/99)`;
+countElement.style.color = count > 99 ? '#e74c3c' : '#e76f51';
+}
+
+// 解析特殊產品 ID
+function parseSpecialItems(input) {
+if (!input.trim()) return [];
+// 支持逗號分隔或換行分隔
+return input.split(/[,\n]/)
+.map(item => item.trim())
+.filter(item => item);
+}
+
+// 載入客戶資料
+function loadCustomer() {
+fetch(`/api/customers/${currentCustomerId}`)
+.then(response => {
+if (!response.ok) {
+throw new Error('Customer not found');
+}
+return response.json();
+})
+.then(customer => {
+document.getElementById('customerId').value = customer.id;
+document.getElementById('name').value = customer.name;
+document.getElementById('email').value = customer.email;
+// 將特殊產品 ID 數組轉換為換行分隔的字符串
+const specialItems = customer.special_item_ids || [];
+document.getElementById('specialItems').value = specialItems.join('\n');
+updateItemCount();
+document.getElementById('loading').style.display = 'none';
+document.getElementById('editForm').style.display = 'block';
+})
+.catch(error => {
+console.error('Error loading customer:', error);
+document.getElementById('loading').innerHTML = 
+'<p style="color: red;">Failed to load customer</p>';
+});
+}
+
+// 更新客戶
+function updateCustomer() {
+const name = document.getElementById('name').value;
+const email = document.getElementById('email').value;
+const password = document.getElementById('password').value;
+const specialItemsInput = document.getElementById('specialItems').value;
+
+if (!name || !email) {
+alert('Please fill in name and email');
+return;
+}
+
+// 簡單的電子郵件驗證
+const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+if (!emailRegex.test(email)) {
+alert('Please enter a valid email address');
+return;
+}
+
+const specialItems = parseSpecialItems(specialItemsInput);
+if (specialItems.length > 99) {
+alert('Special item IDs cannot exceed 99');
+return;
+}
+
+const updateData = {
+name: name,
+email: email,
+special_item_ids: specialItems
+};
+
+// 只有在輸入密碼時才更新密碼
+if (password) {
+if (password.length < 6) {
+alert('Password must be at least 6 characters long');
+return;
+}
+updateData.password = password;
+}
+
+fetch(`/api/customers/${currentCustomerId}`, {
+method: 'PUT',
+headers: {
+'Content-Type': 'application/json'
+},
+body: JSON.stringify(updateData)
+})
+.then(response => {
+if (!response.ok) {
+return response.json().then(err => {
+throw new Error(err.message || 'Update failed');
+});
+}
+return response.json();
+})
+.then(data => {
+alert(data.message);
+window.location.href = '/customers';
+})
+.catch(error => {
+console.error('Error updating customer:', error);
+alert('Failed to update customer: ' + error.message);
+});
+}
+
+// 刪除客戶
+function deleteCustomer() {
+if (!confirm('Are you sure you want to delete this customer?')) {
+return;
+}
+
+fetch(`/api/customers/${currentCustomerId}`, {
+method: 'DELETE'
+})
+.then(response => {
+if (!response.ok) {
+throw new Error('Delete failed');
+}
+return response.json();
+})
+.then(data => {
+alert(data.message);
+window.location.href = '/customers';
+})
+.catch(error => {
+console.error('Error deleting customer:', error);
+alert('Failed to delete customer');
+});
+}
+
+// 返回客戶列表
+function goBack() {
+window.location.href = '/customers';
+}
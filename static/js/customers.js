@@ -0,0 +1,154 @@
+let currentSearchTerm = '';
+
+// 頁面載入時自動獲取客戶
+window.addEventListener('DOMContentLoaded', function() {
+loadCustomers();
+});
+
+// 處理搜索框的 Enter 鍵
+function handleSearch(event) {
+if (event.key === 'Enter') {
+searchCustomers();
+}
+}
+
+// 搜索客戶
+function searchCustomers() {
+const searchInput = document.getElementById('searchInput');
+currentSearchTerm = searchInput.value.trim();
+loadCustomers(currentSearchTerm);
+}
+
+// 清除搜索
+function clearSearch() {
+document.getElementById('searchInput').value = '';
+currentSearchTerm = '';
+loadCustomers();
+}
+
+// 載入客戶列表
+function loadCustomers(searchTerm = '') {
+let url = '/api/customers?limit=100';
+if (searchTerm) {
+url += `&search=${encodeURIComponent(searchTerm)}`;
+}
+
+fetch(url)
+.then(response => {
+if (!response.ok) {
+throw new Error('Network response was not ok');
+}
+return response.json();
+})
+.then(customers => {
+const container = document.getElementById('customerContainer');
+container.innerHTML = '';
+
+if (customers.length === 0) {
+if (searchTerm) {
+container.innerHTML = `<div class="no-results">No customers found matching "${searchTerm}"</div>`;
+} else {
+container.innerHTML = '<p class="no-results">No customer data available</p>';
+}
+return;
+}
+
+customers.forEach(customer => {
+const customerCard = document.createElement('div');
+customerCard.className = 'customer-card';
+customerCard.onclick = () => editCustomer(customer.id);
+
+const specialItemsCount = customer.special_item_ids ? customer.special_item_ids.length : 0;
+const specialItemsText = specialItemsCount > 0 
+? `<span class="special-items-count">${specialItemsCount}</span> special items` 
+: 'No special items';
+
+customerCard.innerHTML = `
+<div class="customer-id">ID: ${customer.id}</div>
+<div class="customer-name">${customer.name}</div>
+<div class="customer-email">${customer.email}</div>
+<div class="customer-special-items">${specialItemsText}</div>
+`;
+container.appendChild(customerCard);
+});
+})
+.catch(error => {
+console.error('Error loading customers:', error);
+document.getElementById('customerContainer').innerHTML =
+'<p style="color: red;">Failed to load customers. Please try again later.</p>';
+});
+}
+
+// 點擊客戶卡片，跳轉到編輯頁面
+function editCustomer(customerId) {
+window.location.href = `/customers/edit/${customerId}`;
+}
+
+// 添加客戶
+function add_customer() {
+const name = document.getElementById('name').value;
+const email = document.getElementById('email').value;
+const password = document.getElementById('password').value;
+const specialItemsInput = document.getElementById('specialItems').value;
+
+if (!name || !email || !password) {
+alert('Please fill in name, email, and password');
+return;
+}
+
+// 密碼長度驗證
+if (password.length < 6) {
+alert('Password must be at least 6 characters long');
+return;
+}
+
+// 簡單的電子郵件驗證
+const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+if (!emailRegex.test(email)) {
+alert('Please enter a valid email address');
+return;
+}
+
+// 處理特殊產品 ID
+let specialItems = [];
+if (specialItemsInput.trim()) {
+specialItems = specialItemsInput.split(',').map(item => item.trim()).filter(item => item);
+if (specialItems.length > 99) {
+alert('Special item IDs cannot exceed 99');
+return;
+}
+}
+
+fetch('/api/customers', {
+method: 'POST',
+headers: {
+'Content-Type': 'application/json'
+},
+body: JSON.stringify({
+name: name,
+email: email,
+password: password,
+special_item_ids: specialItems
+})
+})
+.then(response => {
+if (!response.ok) {
+return response.json().then(err => {
+throw new Error(err.message || 'Network response was not ok');
+});
+}
+return response.json();
+})
+.then(data => {
+alert(data.message);
+document.getElementById('name').value = '';
+document.getElementById('email').value = '';
+document.getElementById('password').value = '';
+document.getElementById('specialItems').value = '';
+loadCustomers(currentSearchTerm);
+})
+.catch(error => {
+console.error('Error adding customer:', error);
+alert('Failed to add customer: ' + error.message);
+});
+}
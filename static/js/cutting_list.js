@@ -0,0 +1,127 @@
+let allInvoices = [];
+let dateGroups = {};
+
+// 頁面載入時獲取數據
+window.addEventListener('DOMContentLoaded', function() {
+console.log('Cutting List page loaded');
+loadCuttingList();
+});
+
+// 載入 Cutting List 數據
+function loadCuttingList() {
+fetch('/api/invoices?fields=id,delivery_date,customer_name,total_amount')
+.then(response => {
+if (!response.ok) {
+throw new Error('Network response was not ok');
+}
+return response.json();
+})
+.then(invoices => {
+console.log('Received invoices:', invoices.length);
+allInvoices = invoices;
+processDateGroups();
+updateStats();
+displayDateGroups();
+})
+.catch(error => {
+console.error('Error loading cutting list:', error);
+document.getElementById('datesContainer').innerHTML =
+'<div class="no-dates"><div class="no-dates-icon">⚠️</div><div>Failed to load. Please try again later.</div></div>';
+});
+}
+
+// 處理日期分組
+function processDateGroups() {
+dateGroups = {};
+
+allInvoices.forEach(invoice => {
+const date = invoice.delivery_date;
+if (!dateGroups[date]) {
+dateGroups[date] = {
+invoices: [],
+customers: new Set(),
+totalAmount: 0
+};
+}
+dateGroups[date].invoices.push(invoice);
+dateGroups[date].customers.add(invoice.customer_name);
+dateGroups[date].totalAmount += invoice.total_amount;
+});
+
+// 轉換 Set 為 Array
+Object.keys(dateGroups).forEach(date => {
+dateGroups[date].customers = Array.from(dateGroups[date].customers);
+});
+}
+
+// 更新統計數據
+function updateStats() {
+const totalDates = Object.keys(dateGroups).length;
+const totalInvoices = allInvoices.length;
+const allCustomers = new Set();
+allInvoices.forEach(inv => allCustomers.add(inv.customer_name));
+
+document.getElementById('totalDates').textContent = totalDates;
+document.getElementById('totalInvoices').textContent = totalInvoices;
+document.getElementById('totalCustomers').textContent = allCustomers.size;
+}
+
+// 顯示日期分組
+function displayDateGroups() {
+const container = document.getElementById('datesContainer');
+container.innerHTML = '';
+
+if (Object.keys(dateGroups).length === 0) {
+container.innerHTML = `
+<div class="no-dates">
+<div class="no-dates-icon">📋</div>
+<div>No cutting list available</div>
+</div>
+`;
+return;
+}
+
+// 按日期排序（最新的在前）
+const sortedDates = Object.keys(dateGroups).sort((a, b) => b.localeCompare(a));
+
+sortedDates.forEach(date => {
+const group = dateGroups[date];
+const dateCard = document.createElement('div');
+dateCard.className = 'date-card';
+dateCard.onclick = () => viewCuttingList(date);
+
+const customerList = group.customers.map(name => 
+`<span class="customer-tag">${name}</span>`
+).join('');
+
+dateCard.innerHTML = `
+<div class="date-header">
+<div class="date-title">
+<span class="date-icon">📅</span>
+<span>${date}</span>
+</div>
+<div class="date-info">
+<span class="date-badge">${group.invoices.length} invoices</span>
+<span class="customer-badge">${group.customers.length} customers</span>
+</div>
+</div>
+<div class="date-details">
+<div style="margin-bottom: 10px;">
+<strong>Total Amount:</strong> $${group.totalAmount.toFixed(2)}
+</div>
+<div>
+<strong>Customers:</strong>
+<div class="customer-list">${customerList}</div>
+</div>
+</div>
+`;
+
+container.appendChild(dateCard);
+});
+}
+
+// 查看指定日期的 Cutting List
+function viewCuttingList(date) {
+console.log('Viewing cutting list for date:', date);
+window.location.href = `/cutting-list/${date}`;
+}
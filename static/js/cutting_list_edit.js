@@ -0,0 +1,178 @@
+let currentDate = null;
+let invoices = [];
+let customerGroups = {};
+let lastEventId = 0;
+let changeStream = null;
+const CHANGE_POLL_INTERVAL = 5000;
+
+// 從 URL 獲取日期
+window.addEventListener('DOMContentLoaded', function() {
+const pathParts = window.location.pathname.split('/');
+currentDate = pathParts[pathParts.length - 1];
+console.log('Date from URL:', currentDate);
+loadCuttingListForDate();
+});
+
+// 載入指定日期的 Cutting List
+function loadCuttingListForDate() {
+fetch(`/api/invoices?date=${currentDate}`)
+.then(response => {
+if (!response.ok) {
+throw new Error('Network response was not ok');
+}
+lastEventId = response.headers.get('X-Invoice-Event-Id') || 0;
+return response.json();
+})
+.then(data => {
+console.log('Received invoices for date:', data.length);
+invoices = data;
+processCustomerGroups();
+displayCuttingList();
+document.getElementById('loading').style.display = 'none';
+document.getElementById('cuttingListDetails').style.display = 'block';
+subscribeInvoiceChanges();
+})
+.catch(error => {
+console.error('Error loading cutting list:', error);
+document.getElementById('loading').innerHTML =
+`<p style="color: red;">Failed to load: ${error.message}</p>
+<p><a href="/cutting-list">Back to list</a></p>`;
+});
+}
+
+// 訂閱此日期的發票變更，只套用差異而不重新載入
+function subscribeInvoiceChanges() {
+if (changeStream) return;
+if (!window.EventSource) {
+pollInvoiceChanges();
+return;
+}
+changeStream = new EventSource(`/api/invoices/changes/stream?date=${currentDate}&since_id=${lastEventId}`);
+changeStream.addEventListener('invoice', event => {
+applyInvoiceChange(JSON.parse(event.data));
+processCustomerGroups();
+displayCuttingList();
+});
+changeStream.onerror = () => {
+// 伺服器拒絕串流（503）時瀏覽器不會重連，改為輪詢
+if (changeStream.readyState === EventSource.CLOSED) {
+pollInvoiceChanges();
+}
+};
+}
+
+// 定期輪詢 /api/invoices/changes（無法使用 SSE 時）
+function pollInvoiceChanges() {
+fetch(`/api/invoices/changes?date=${currentDate}&since_id=${lastEventId}`)
+.then(response => response.ok ? response.json() : null)
+.then(data => {
+if (data) {
+data.events.forEach(applyInvoiceChange);
+lastEventId = data.last_event_id;
+if (data.events.length) {
+processCustomerGroups();
+displayCuttingList();
+}
+}
+})
+.catch(error => console.error('Error polling invoice changes:', error))
+.finally(() => setTimeout(pollInvoiceChanges, CHANGE_POLL_INTERVAL));
+}
+
+function applyInvoiceChange(change) {
+lastEventId = change.event_id;
+invoices = invoices.filter(inv => inv.id !== change.invoice_id);
+if (change.invoice && change.invoice.delivery_date === currentDate) {
+invoices.push(change.invoice);
+}
+}
+
+// 處理客戶分組
+function processCustomerGroups() {
+customerGroups = {};
+
+invoices.forEach(invoice => {
+const customerName = invoice.customer_name;
+if (!customerGroups[customerName]) {
+customerGroups[customerName] = {
+customer_id: invoice.customer_id,
+customer_email: invoice.customer_email,
+invoices: []
+};
+}
+customerGroups[customerName].invoices.push(invoice);
+});
+}
+
+// 顯示 Cutting List
+function displayCuttingList() {
+document.getElementById('pageTitle').textContent = `📋 Cutting List - ${currentDate}`;
+document.getElementById('deliveryDate').textContent = currentDate;
+document.getElementById('totalInvoices').textContent = invoices.length;
+document.getElementById('totalCustomers').textContent = Object.keys(customerGroups).length;
+
+const totalAmount = invoices.reduce((sum, inv) => sum + inv.total_amount, 0);
+document.getElementById('totalAmount').textContent = `$${totalAmount.toFixed(2)}`;
+
+// 顯示客戶列表
+const container = document.getElementById('customersContainer');
+container.innerHTML = '';
+
+if (invoices.length === 0) {
+container.innerHTML = '<div class="no-data">No orders for this date</div>';
+return;
+}
+
+// 按客戶名稱排序
+const sortedCustomers = Object.keys(customerGroups).sort();
+
+sortedCustomers.forEach(customerName => {
+const group = customerGroups[customerName];
+const customerSection = document.createElement('div');
+customerSection.className = 'customer-section';
+
+const invoicesList = group.invoices.map(invoice => {
+const products = invoice.items.map(item =>
+`<span class="product-item">${item.product_name} × ${item.quantity}</span>`
+).join('');
+
+return `
+<div class="invoice-item">
+<div class="invoice-number">${invoice.invoice_number}</div>
+<div class="invoice-products">${products}</div>
+<div class="invoice-total">$${invoice.total_amount.toFixed(2)}</div>
+</div>
+`;
+}).join('');
+
+customerSection.innerHTML = `
+<div class="customer-header">
+<div class="customer-name">👤 ${customerName}</div>
+<div class="customer-invoice-count">${group.invoices.length} invoices</div>
+</div>
+<div class="invoice-list">
+${invoicesList}
+</div>
+`;
+
+// 點擊客戶區域查看第一張發票
+customerSection.onclick = () => viewInvoice(group.invoices[0].id);
+
+container.appendChild(customerSection);
+});
+}
+
+// 查看發票
+function viewInvoice(invoiceId) {
+window.location.href = `/invoices/edit/${invoiceId}`;
+}
+
+// 下載 PDF
+function downloadPDF() {
+window.open(`/api/invoices/cutting-list/${currentDate}/pdf`, '_blank');
+}
+
+// 返回列表
+function goBack() {
+window.location.href = '/cutting-list';
+}
@@ -0,0 +1,77 @@
+// 頁面載入時獲取統計數據
+window.addEventListener('DOMContentLoaded', function() {
+checkSession();
+loadDashboardStats();
+});
+
+// 檢查登入狀態
+function checkSession() {
+fetch('/api/auth/check-session', {
+credentials: 'include'
+})
+.then(response => response.json())
+.then(data => {
+if (!data.logged_in) {
+window.location.href = '/login';
+} else if (data.user_type !== 'admin') {
+// 如果不是 admin，重定向到 testing-input
+window.location.href = '/testing-input';
+} else {
+// 顯示用戶名
+document.getElementById('welcomeText').textContent = `Welcome, ${data.username}`;
+}
+})
+.catch(error => {
+console.error('Session check error:', error);
+window.location.href = '/login';
+});
+}
+
+// 載入統計數據
+function loadDashboardStats() {
+// 載入產品統計
+fetch('/api/products')
+.then(response => response.json())
+.then(products => {
+document.getElementById('totalProducts').textContent = products.length;
+})
+.catch(error => console.error('Error loading products:', error));
+
+// 載入客戶統計
+fetch('/api/customers')
+.then(response => response.json())
+.then(customers => {
+document.getElementById('totalCustomers').textContent = customers.length;
+})
+.catch(error => console.error('Error loading customers:', error));
+
+// 載入發票統計
+fetch('/api/invoices?fields=id,total_amount')
+.then(response => response.json())
+.then(invoices => {
+document.getElementById('totalInvoices').textContent = invoices.length;
+// 計算總收入
+const totalRevenue = invoices.reduce((sum, inv) => sum + inv.total_amount, 0);
+document.getElementById('totalRevenue').textContent = `${totalRevenue.toFixed(2)}`;
+})
+.catch(error => console.error('Error loading invoices:', error));
+}
+
+// 登出功能
+function logout() {
+if (confirm('Are you sure you want to logout?')) {
+fetch('/api/auth/logout', {
+method: 'POST',
+credentials: 'include'
+})
+.then(response => response.json())
+.then(data => {
+alert(data.message);
+window.location.href = '/login';
+})
+.catch(error => {
+console.error('Logout error:', error);
+window.location.href = '/login';
+});
+}
+}
@@ -0,0 +1,177 @@
+let currentInvoiceId = null;
+let currentInvoice = null;
+
+// 從 URL 獲取發票 ID
+window.addEventListener('DOMContentLoaded', function() {
+const pathParts = window.location.pathname.split('/');
+currentInvoiceId = pathParts[pathParts.length - 1];
+console.log('Invoice ID from URL:', currentInvoiceId);
+loadInvoice();
+});
+
+// 載入發票資料
+function loadInvoice() {
+console.log('Fetching invoice:', currentInvoiceId);
+fetch(`/api/invoices/${currentInvoiceId}`)
+.then(response => {
+console.log('Response status:', response.status);
+if (!response.ok) {
+throw new Error('Invoice not found');
+}
+return response.json();
+})
+.then(invoice => {
+console.log('Invoice data:', invoice);
+currentInvoice = invoice;
+displayInvoice(invoice);
+document.getElementById('loading').style.display = 'none';
+document.getElementById('invoiceDetails').style.display = 'block';
+})
+.catch(error => {
+console.error('Error loading invoice:', error);
+document.getElementById('loading').innerHTML = 
+`<p style="color: red;">Failed to load invoice: ${error.message}</p>
+<p><a href="/invoices">Back to invoice list</a></p>`;
+});
+}
+
+// 顯示發票資料
+function displayInvoice(invoice) {
+document.getElementById('invoiceNumber').textContent = invoice.invoice_number;
+document.getElementById('createdDate').textContent = invoice.created_date;
+document.getElementById('deliveryDate').value = invoice.delivery_date;
+document.getElementById('status').value = invoice.status;
+document.getElementById('customerId').textContent = invoice.customer_id;
+document.getElementById('customerName').textContent = invoice.customer_name;
+document.getElementById('customerEmail').textContent = invoice.customer_email;
+
+// 顯示訂單項目
+const itemsContainer = document.getElementById('orderItemsContainer');
+itemsContainer.innerHTML = '';
+
+invoice.items.forEach((item, index) => {
+const itemDiv = document.createElement('div');
+itemDiv.className = 'order-item';
+itemDiv.innerHTML = `
+<div class="item-info">
+<div class="item-name">${item.product_name}</div>
+<div class="item-details">Product ID: ${item.product_id} | Category: ${item.product_subclass}</div>
+</div>
+<div class="item-quantity">
+<input type="number" min="1" value="${item.quantity}" 
+       onchange="updateItemQuantity(${item.id}, this.value)">
+</div>
+<div class="item-price">
+<div class="item-unit-price">Unit: ${item.unit_price.toFixed(2)}</div>
+<div class="item-total-price">${item.total_price.toFixed(2)}</div>
+</div>
+`;
+itemsContainer.appendChild(itemDiv);
+});
+
+updateTotalPrice();
+}
+
+// 更新項目數量
+function updateItemQuantity(itemId, newQuantity) {
+const quantity = parseInt(newQuantity);
+if (!quantity || quantity <= 0) {
+alert('Please enter a valid quantity');
+loadInvoice(); // 重新載入以恢復原值
+return;
+}
+
+// 在當前發票數據中更新
+const item = currentInvoice.items.find(i => i.id === itemId);
+if (item) {
+item.quantity = quantity;
+item.total_price = item.unit_price * quantity;
+updateTotalPrice();
+}
+}
+
+// 更新總價顯示
+function updateTotalPrice() {
+const total = currentInvoice.items.reduce((sum, item) => sum + item.total_price, 0);
+currentInvoice.total_amount = total;
+document.getElementById('totalPrice').textContent = `${total.toFixed(2)}`;
+}
+
+// 更新發票
+function updateInvoice() {
+const status = document.getElementById('status').value;
+const deliveryDate = document.getElementById('deliveryDate').value;
+
+const updateData = {
+version: currentInvoice.version,
+status: status,
+delivery_date: deliveryDate,
+items: currentInvoice.items.map(item => ({
+id: item.id,
+quantity: item.quantity
+}))
+};
+
+fetch(`/api/invoices/${currentInvoiceId}`, {
+method: 'PUT',
+headers: {
+'Content-Type': 'application/json'
+},
+body: JSON.stringify(updateData)
+})
+.then(response => response.json().then(data => ({ response, data })))
+.then(({ response, data }) => {
+if (response.status === 409 && data.conflict === 'version') {
+alert('This invoice was changed by someone else. The latest version will be reloaded.');
+loadInvoice();
+return;
+}
+if (!response.ok) {
+// 與其他待處理發票衝突或驗證失敗時保留目前的編輯內容
+alert(data.message || 'Failed to update invoice');
+return;
+}
+alert('Invoice updated successfully!');
+currentInvoice = data.invoice;
+displayInvoice(currentInvoice);
+})
+.catch(error => {
+console.error('Error updating invoice:', error);
+alert('Failed to update invoice');
+});
+}
+
+// 下載 PDF
+function downloadPDF() {
+window.open(`/api/invoices/${currentInvoiceId}/pdf`, '_blank');
+}
+
+// 刪除發票
+function deleteInvoice() {
+if (!confirm('Are you sure you want to delete this invoice? This action cannot be undone!')) {
+return;
+}
+
+fetch(`/api/invoices/${currentInvoiceId}`, {
+method: 'DELETE'
+})
+.then(response => {
+if (!response.ok) {
+throw new Error('Delete failed');
+}
+return response.json();
+})
+.then(data => {
+alert('Invoice deleted successfully!');
+window.location.href = '/invoices';
+})
+.catch(error => {
+console.error('Error deleting invoice:', error);
+alert('Failed to delete invoice');
+});
+}
+
+// 返回發票列表
+function goBack() {
+window.location.href = '/invoices';
+}
@@ -0,0 +1,230 @@
+let currentSearchTerm = '';
+let currentDateFilter = '';
+let allInvoices = [];
+let filteredInvoices = [];
+let lastEventId = 0;
+let changeStream = null;
+const CHANGE_POLL_INTERVAL = 5000;
+
+// 頁面載入時獲取發票
+window.addEventListener('DOMContentLoaded', function() {
+console.log('Invoices page loaded');
+loadInvoices();
+});
+
+// 處理搜索框的 Enter 鍵
+function handleSearch(event) {
+if (event.key === 'Enter') {
+searchInvoices();
+}
+}
+
+// 搜索發票
+function searchInvoices() {
+const searchInput = document.getElementById('searchInput');
+currentSearchTerm = searchInput.value.trim();
+applyFilters();
+}
+
+// 按日期篩選
+function filterByDate() {
+const dateInput = document.getElementById('dateFilter');
+currentDateFilter = dateInput.value;
+applyFilters();
+}
+
+// 清除篩選
+function clearFilters() {
+document.getElementById('searchInput').value = '';
+document.getElementById('dateFilter').value = '';
+currentSearchTerm = '';
+currentDateFilter = '';
+filteredInvoices = allInvoices;
+updateStats();
+displayInvoicesByDate();
+}
+
+// 應用篩選
+function applyFilters() {
+filteredInvoices = allInvoices.filter(invoice => {
+let matchSearch = true;
+let matchDate = true;
+
+if (currentSearchTerm) {
+matchSearch = invoice.invoice_number.toLowerCase().includes(currentSearchTerm.toLowerCase()) ||
+invoice.customer_name.toLowerCase().includes(currentSearchTerm.toLowerCase());
+}
+
+if (currentDateFilter) {
+matchDate = invoice.delivery_date === currentDateFilter;
+}
+
+return matchSearch && matchDate;
+});
+
+updateStats();
+displayInvoicesByDate();
+}
+
+// 載入發票列表
+function loadInvoices() {
+console.log('Fetching invoices from: /api/invoices');
+
+fetch('/api/invoices')
+.then(response => {
+console.log('Response status:', response.status);
+if (!response.ok) {
+throw new Error('Network response was not ok');
+}
+lastEventId = response.headers.get('X-Invoice-Event-Id') || 0;
+return response.json();
+})
+.then(invoices => {
+console.log('Received invoices:', invoices.length);
+allInvoices = invoices;
+filteredInvoices = invoices;
+updateStats();
+displayInvoicesByDate();
+subscribeInvoiceChanges();
+})
+.catch(error => {
+console.error('Error loading invoices:', error);
+const container = document.getElementById('invoicesContainer');
+if (container) {
+container.innerHTML =
+'<div class="no-results" style="color: red;">Failed to load invoices: ' + error.message + '</div>';
+}
+});
+}
+
+// 訂閱發票變更，只套用差異而不重新載入
+function subscribeInvoiceChanges() {
+if (changeStream) return;
+if (!window.EventSource) {
+pollInvoiceChanges();
+return;
+}
+changeStream = new EventSource(`/api/invoices/changes/stream?since_id=${lastEventId}`);
+changeStream.addEventListener('invoice', event => {
+applyInvoiceChange(JSON.parse(event.data));
+applyFilters();
+});
+changeStream.onerror = () => {
+// 伺服器拒絕串流（503）時瀏覽器不會重連，改為輪詢
+if (changeStream.readyState === EventSource.CLOSED) {
+pollInvoiceChanges();
+}
+};
+}
+
+// 定期輪詢 /api/invoices/changes（無法使用 SSE 時）
+function pollInvoiceChanges() {
+fetch(`/api/invoices/changes?since_id=${lastEventId}`)
+.then(response => response.ok ? response.json() : null)
+.then(data => {
+if (data) {
+data.events.forEach(applyInvoiceChange);
+lastEventId = data.last_event_id;
+if (data.events.length) {
+applyFilters();
+}
+}
+})
+.catch(error => console.error('Error polling invoice changes:', error))
+.finally(() => setTimeout(pollInvoiceChanges, CHANGE_POLL_INTERVAL));
+}
+
+function applyInvoiceChange(change) {
+lastEventId = change.event_id;
+allInvoices = allInvoices.filter(inv => inv.id !== change.invoice_id);
+if (change.invoice) {
+allInvoices.push(change.invoice);
+allInvoices.sort((a, b) => b.delivery_date.localeCompare(a.delivery_date) || b.created_date.localeCompare(a.created_date));
+}
+}
+
+// 更新統計數據
+function updateStats() {
+const totalInvoices = filteredInvoices.length;
+const totalAmount = filteredInvoices.reduce((sum, inv) => sum + inv.total_amount, 0);
+const pendingCount = filteredInvoices.filter(inv => inv.status === 'Pending').length;
+
+document.getElementById('totalInvoices').textContent = totalInvoices;
+document.getElementById('totalAmount').textContent = `$${totalAmount.toFixed(2)}`;
+document.getElementById('pendingInvoices').textContent = pendingCount;
+}
+
+// 按送貨日期顯示發票
+function displayInvoicesByDate() {
+const container = document.getElementById('invoicesContainer');
+if (!container) {
+console.error('invoicesContainer element not found!');
+return;
+}
+container.innerHTML = '';
+
+if (filteredInvoices.length === 0) {
+container.innerHTML = '<div class="no-results">No invoice data available</div>';
+return;
+}
+
+// 按送貨日期分組
+const invoicesByDate = {};
+filteredInvoices.forEach(invoice => {
+const date = invoice.delivery_date;
+if (!invoicesByDate[date]) {
+invoicesByDate[date] = [];
+}
+invoicesByDate[date].push(invoice);
+});
+
+// 按日期排序（最新的在前）
+const sortedDates = Object.keys(invoicesByDate).sort((a, b) => b.localeCompare(a));
+
+// 顯示每個日期的發票
+sortedDates.forEach(date => {
+const invoices = invoicesByDate[date];
+const dateGroup = document.createElement('div');
+dateGroup.className = 'date-group';
+
+const dateHeader = document.createElement('div');
+dateHeader.className = 'date-header';
+dateHeader.innerHTML = `
+<span>📅 Delivery Date: ${date}</span>
+<span class="date-count">${invoices.length} invoices</span>
+`;
+dateGroup.appendChild(dateHeader);
+
+invoices.forEach(invoice => {
+const invoiceCard = document.createElement('div');
+invoiceCard.className = 'invoice-card';
+invoiceCard.onclick = () => viewInvoice(invoice.id);
+
+const statusClass = `status-${invoice.status.toLowerCase()}`;
+
+invoiceCard.innerHTML = `
+<div class="invoice-header">
+<div class="invoice-number">${invoice.invoice_number}</div>
+<div class="invoice-status ${statusClass}">${invoice.status}</div>
+</div>
+<div class="invoice-details">
+<div class="invoice-info">
+<div class="invoice-customer">Customer: ${invoice.customer_name}</div>
+<div class="invoice-items-count">📦 ${invoice.items_count} products</div>
+<div style="font-size: 0.85em; color: #999; margin-top: 5px;">Created: ${invoice.created_date}</div>
+</div>
+<div class="invoice-total">$${invoice.total_amount.toFixed(2)}</div>
+</div>
+`;
+dateGroup.appendChild(invoiceCard);
+});
+
+container.appendChild(dateGroup);
+});
+}
+
+// 查看發票詳情
+function viewInvoice(invoiceId) {
+console.log('Viewing invoice:', invoiceId);
+window.location.href = `/invoices/edit/${invoiceId}`;
+}
@@ -0,0 +1,88 @@
+// 切換密碼顯示/隱藏
+function togglePassword() {
+    const passwordInput = document.getElementById('password');
+    const toggleIcon = document.querySelector('.toggle-password');
+
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        toggleIcon.textContent = '🙈';
+    } else {
+        passwordInput.type = 'password';
+        toggleIcon.textContent = '👁️';
+    }
+}
+
+// 顯示提示信息
+function showAlert(message, type = 'error') {
+    const alertDiv = document.getElementById('alert');
+    alertDiv.className = `alert alert-${type}`;
+    alertDiv.textContent = message;
+    alertDiv.style.display = 'block';
+
+    setTimeout(() => {
+        alertDiv.style.display = 'none';
+    }, 5000);
+}
+
+// 處理登入表單提交
+document.getElementById('loginForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const username = document.getElementById('username').value;
+    const password = document.getElementById('password').value;
+    const loginButton = document.getElementById('loginButton');
+    const buttonText = document.getElementById('buttonText');
+    const loadingSpinner = document.getElementById('loadingSpinner');
+
+    // 顯示載入狀態
+    loginButton.disabled = true;
+    buttonText.style.display = 'none';
+    loadingSpinner.style.display = 'block';
+
+    try {
+        const response = await fetch('/api/auth/login', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            credentials: 'include', // 重要：包含 cookies/session
+            body: JSON.stringify({
+                username: username,
+                password: password
+            })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            showAlert('Login successful! Redirecting...', 'success');
+
+            // 根據用戶類型跳轉
+            setTimeout(() => {
+                if (data.user_type === 'admin') {
+                    window.location.href = '/dashboard';
+                } else {
+                    window.location.href = '/testing-input';
+                }
+            }, 1000);
+        } else {
+            showAlert(data.message || 'Login failed. Please try again.', 'error');
+            loginButton.disabled = false;
+            buttonText.style.display = 'inline';
+            loadingSpinner.style.display = 'none';
+        }
+    } catch (error) {
+        console.error('Login error:', error);
+        showAlert('An error occurred. Please try again.', 'error');
+        loginButton.disabled = false;
+        buttonText.style.display = 'inline';
+        loadingSpinner.style.display = 'none';
+    }
+});
+
+// Enter 鍵提交
+document.getElementById('password').addEventListener('keypress', function(e) {
+    if (e.key === 'Enter') {
+        document.getElementById('loginForm').dispatchEvent(new Event('submit'));
+    }
+});
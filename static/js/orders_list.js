@@ -0,0 +1,136 @@
+let allOrders = [];
+let filteredOrders = [];
+
+// 頁面載入時獲取訂單
+window.addEventListener('DOMContentLoaded', function() {
+loadOrders();
+});
+
+// 載入訂單
+function loadOrders() {
+fetch('/api/orders')
+.then(response => {
+if (!response.ok) {
+throw new Error('Network response was not ok');
+}
+return response.json();
+})
+.then(orders => {
+allOrders = orders;
+filteredOrders = orders;
+updateStats();
+displayOrdersByDate();
+})
+.catch(error => {
+console.error('Error loading orders:', error);
+document.getElementById('ordersContainer').innerHTML =
+'<div class="no-orders" style="color: red;">載入訂單失敗，請稍後再試</div>';
+});
+}
+
+// 更新統計數據
+function updateStats() {
+const totalOrders = filteredOrders.length;
+const totalAmount = filteredOrders.reduce((sum, order) => sum + order.total_price, 0);
+const today = new Date().toISOString().split('T')[0];
+const todayOrders = filteredOrders.filter(order => 
+order.order_date.startsWith(today)
+).length;
+
+document.getElementById('totalOrders').textContent = totalOrders;
+document.getElementById('totalAmount').textContent = `$${totalAmount.toFixed(2)}`;
+document.getElementById('todayOrders').textContent = todayOrders;
+}
+
+// 按日期顯示訂單
+function displayOrdersByDate() {
+const container = document.getElementById('ordersContainer');
+container.innerHTML = '';
+
+if (filteredOrders.length === 0) {
+container.innerHTML = '<div class="no-orders">目前沒有訂單資料</div>';
+return;
+}
+
+// 按日期分組
+const ordersByDate = {};
+filteredOrders.forEach(order => {
+const date = order.order_date.split(' ')[0];
+if (!ordersByDate[date]) {
+ordersByDate[date] = [];
+}
+ordersByDate[date].push(order);
+});
+
+// 按日期排序（最新的在前）
+const sortedDates = Object.keys(ordersByDate).sort((a, b) => b.localeCompare(a));
+
+// 顯示每個日期的訂單
+sortedDates.forEach(date => {
+const orders = ordersByDate[date];
+const dateGroup = document.createElement('div');
+dateGroup.className = 'date-group';
+
+const dateHeader = document.createElement('div');
+dateHeader.className = 'date-header';
+dateHeader.innerHTML = `
+<span>${date}</span>
+<span class="date-count">${orders.length} 筆訂單</span>
+`;
+dateGroup.appendChild(dateHeader);
+
+orders.forEach(order => {
+const orderItem = document.createElement('div');
+orderItem.className = 'order-item';
+orderItem.onclick = () => viewOrder(order.id);
+
+const statusClass = `status-${order.status.toLowerCase()}`;
+const time = order.order_date.split(' ')[1];
+
+orderItem.innerHTML = `
+<div class="order-info">
+<div class="order-invoice">
+${order.invoice_number}
+<span class="order-status-badge ${statusClass}">${order.status}</span>
+</div>
+<div class="order-details">
+<span class="order-customer">${order.customer_name}</span> | 
+${order.product_name} × ${order.quantity}
+</div>
+<div class="order-time">${time}</div>
+</div>
+<div class="order-price">$${order.total_price.toFixed(2)}</div>
+`;
+dateGroup.appendChild(orderItem);
+});
+
+container.appendChild(dateGroup);
+});
+}
+
+// 按日期篩選
+function filterByDate() {
+const dateInput = document.getElementById('dateFilter').value;
+if (!dateInput) {
+filteredOrders = allOrders;
+} else {
+filteredOrders = allOrders.filter(order => 
+order.order_date.startsWith(dateInput)
+);
+}
+updateStats();
+displayOrdersByDate();
+}
+
+// 清除日期篩選
+function clearDateFilter() {
+document.getElementById('dateFilter').value = '';
+filteredOrders = allOrders;
+updateStats();
+displayOrdersByDate();
+}
+
+// 查看訂單詳情
+function viewOrder(orderId) {
+window.location.href = `/invoices/edit/${orderId}`;
+}
@@ -0,0 +1,101 @@
+let currentProductId = null;
+
+// 從 URL 獲取產品 ID
+window.addEventListener('DOMContentLoaded', function() {
+const pathParts = window.location.pathname.split('/');
+currentProductId = pathParts[pathParts.length - 1];
+loadProduct();
+});
+
+// 載入產品資料
+function loadProduct() {
+fetch(`/api/products/${currentProductId}`)
+.then(response => {
+if (!response.ok) {
+throw new Error('Product not found');
+}
+return response.json();
+})
+.then(product => {
+document.getElementById('productId').value = product.id;
+document.getElementById('name').value = product.name;
+document.getElementById('price').value = product.price;
+document.getElementById('subclass').value = product.subclass;
+document.getElementById('loading').style.display = 'none';
+document.getElementById('editForm').style.display = 'block';
+})
+.catch(error => {
+console.error('Error loading product:', error);
+document.getElementById('loading').innerHTML = 
+'<p style="color: red;">Failed to load product</p>';
+});
+}
+
+// 更新產品
+function updateProduct() {
+const name = document.getElementById('name').value;
+const price = document.getElementById('price').value;
+const subclass = document.getElementById('subclass').value;
+
+if (!name || !price || !subclass) {
+alert('Please fill in all fields');
+return;
+}
+
+fetch(`/api/products/${currentProductId}`, {
+method: 'PUT',
+headers: {
+'Content-Type': 'application/json'
+},
+body: JSON.stringify({
+name: name,
+price: parseFloat(price),
+subclass: subclass,
+reprice_pending: document.getElementById('repricePending').checked
+})
+})
+.then(response => {
+if (!response.ok) {
+throw new Error('Update failed');
+}
+return response.json();
+})
+.then(data => {
+alert(data.message);
+window.location.href = '/products';
+})
+.catch(error => {
+console.error('Error updating product:', error);
+alert('Failed to update product');
+});
+}
+
+// 刪除產品
+function deleteProduct() {
+if (!confirm('Are you sure you want to delete this product?')) {
+return;
+}
+
+fetch(`/api/products/${currentProductId}`, {
+method: 'DELETE'
+})
+.then(response => {
+if (!response.ok) {
+throw new Error('Delete failed');
+}
+return response.json();
+})
+.then(data => {
+alert(data.message);
+window.location.href = '/products';
+})
+.catch(error => {
+console.error('Error deleting product:', error);
+alert('Failed to delete product');
+});
+}
+
+// 返回產品列表
+function goBack() {
+window.location.href = '/products';
+}
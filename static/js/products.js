@@ -0,0 +1,125 @@
+let currentSearchTerm = '';
+
+// 頁面載入時自動獲取產品
+window.addEventListener('DOMContentLoaded', function() {
+loadProducts();
+});
+
+// 處理搜索框的 Enter 鍵
+function handleSearch(event) {
+if (event.key === 'Enter') {
+searchProducts();
+}
+}
+
+// 搜索產品
+function searchProducts() {
+const searchInput = document.getElementById('searchInput');
+currentSearchTerm = searchInput.value.trim();
+loadProducts(currentSearchTerm);
+}
+
+// 清除搜索
+function clearSearch() {
+document.getElementById('searchInput').value = '';
+currentSearchTerm = '';
+loadProducts();
+}
+
+// 載入產品列表
+function loadProducts(searchTerm = '') {
+let url = '/api/products?limit=100';
+if (searchTerm) {
+url += `&search=${encodeURIComponent(searchTerm)}`;
+}
+
+fetch(url)
+.then(response => {
+if (!response.ok) {
+throw new Error('Network response was not ok');
+}
+return response.json();
+})
+.then(products => {
+const container = document.getElementById('productContainer');
+container.innerHTML = '';
+
+if (products.length === 0) {
+if (searchTerm) {
+container.innerHTML = `<div class="no-results">No products found matching "${searchTerm}"</div>`;
+} else {
+container.innerHTML = '<p class="no-results">No product data available</p>';
+}
+return;
+}
+
+products.forEach(product => {
+const productCard = document.createElement('div');
+productCard.className = 'product-card';
+productCard.onclick = () => editProduct(product.id);
+productCard.innerHTML = `
+<div class="product-id">ID: ${product.id}</div>
+<div class="product-name">${product.name}</div>
+<div class="product-price">$${parseFloat(product.price).toFixed(2)}</div>
+<div class="product-subclass">${product.subclass}</div>
+`;
+container.appendChild(productCard);
+});
+})
+.catch(error => {
+console.error('Error loading products:', error);
+document.getElementById('productContainer').innerHTML =
+'<p style="color: red;">Failed to load products. Please try again later.</p>';
+});
+}
+
+// 點擊產品卡片，跳轉到編輯頁面
+function editProduct(productId) {
+window.location.href = `/products/edit/${productId}`;
+}
+
+// 添加產品
+function add_product() {
+const productId = document.getElementById('productId').value;
+const name = document.getElementById('name').value;
+const price = document.getElementById('price').value;
+const subclass = document.getElementById('subclass').value;
+
+if (!productId || !name || !price || !subclass) {
+alert('Please fill in all fields');
+return;
+}
+
+fetch('/api/products', {
+method: 'POST',
+headers: {
+'Content-Type': 'application/json'
+},
+body: JSON.stringify({ 
+id: productId,
+name: name, 
+price: parseFloat(price),
+subclass: subclass
+})
+})
+.then(response => {
+if (!response.ok) {
+return response.json().then(err => {
+throw new Error(err.message || 'Network response was not ok');
+});
+}
+return response.json();
+})
+.then(data => {
+alert(data.message);
+document.getElementById('productId').value = '';
+document.getElementById('name').value = '';
+document.getElementById('price').value = '';
+document.getElementById('subclass').value = '';
+loadProducts(currentSearchTerm);
+})
+.catch(error => {
+console.error('Error adding product:', error);
+alert('Failed to add product: ' + error.message);
+});
+}
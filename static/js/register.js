@@ -0,0 +1,19 @@
+async function register() {
+  const username = document.getElementById("username").value;
+  const email = document.getElementById("email").value;
+  const password = document.getElementById("password").value;
+
+  const response = await fetch("/api/auth/register", {
+    method: "POST",
+    headers: {"Content-Type": "application/json"},
+    body: JSON.stringify({username, email, password})
+  });
+
+  const data = await response.json();
+  alert(data.message);
+
+  if (response.ok) {
+    // 註冊成功，跳轉到 login 頁
+    window.location.href = "/login";
+  }
+}
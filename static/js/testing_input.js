@@ -0,0 +1,256 @@
+let cart = [];
+let cartSubmissionId = null;  // 同一購物車重新提交時沿用，作為 Idempotency-Key
+let currentProduct = null;
+let currentCustomer = null;
+
+// 頁面載入時獲取用戶信息
+window.addEventListener('DOMContentLoaded', function() {
+    fetch('/api/auth/check-session', {
+        credentials: 'include'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.logged_in) {
+            document.getElementById('currentUser').textContent = `Welcome, ${data.username}`;
+        } else {
+            window.location.href = '/login';
+        }
+    });
+});
+
+// 監聽產品 ID 輸入
+document.getElementById('productId').addEventListener('blur', function() {
+const productId = this.value.trim();
+if (productId) {
+fetchProductInfo(productId);
+}
+});
+
+// 監聽客戶 ID 輸入
+document.getElementById('customerId').addEventListener('blur', function() {
+const customerId = this.value.trim();
+if (customerId) {
+fetchCustomerInfo(customerId);
+}
+});
+
+// 獲取產品信息
+function fetchProductInfo(productId) {
+fetch(`/api/products/${productId}`)
+.then(response => {
+if (!response.ok) {
+throw new Error('Product not found');
+}
+return response.json();
+})
+.then(product => {
+currentProduct = product;
+const infoDiv = document.getElementById('productInfo');
+infoDiv.innerHTML = `
+<div class="info-success">
+✓ Product Name: ${product.name} | Price: $${product.price} | Category: ${product.subclass}
+</div>
+`;
+})
+.catch(error => {
+currentProduct = null;
+document.getElementById('productInfo').innerHTML = `
+<div class="info-error">✗ Product ID not found: ${productId}</div>
+`;
+});
+}
+
+// 獲取客戶信息
+function fetchCustomerInfo(customerId) {
+fetch(`/api/customers/${customerId}`)
+.then(response => {
+if (!response.ok) {
+throw new Error('Customer not found');
+}
+return response.json();
+})
+.then(customer => {
+currentCustomer = customer;
+const infoDiv = document.getElementById('customerInfo');
+infoDiv.innerHTML = `
+<div class="info-success">
+✓ Customer Name: ${customer.name} | Email: ${customer.email}
+</div>
+`;
+})
+.catch(error => {
+currentCustomer = null;
+document.getElementById('customerInfo').innerHTML = `
+<div class="info-error">✗ Customer ID not found: ${customerId}</div>
+`;
+});
+}
+
+// 添加到購物車
+function addToCart() {
+if (!currentProduct) {
+alert('Please enter a valid Product ID');
+return;
+}
+
+if (!currentCustomer) {
+alert('Please enter a valid Customer ID');
+return;
+}
+
+const quantity = parseInt(document.getElementById('quantity').value);
+if (!quantity || quantity <= 0) {
+alert('Please enter a valid quantity');
+return;
+}
+
+const deliveryDate = document.getElementById('deliveryDate').value;
+
+const cartItem = {
+product: currentProduct,
+customer: currentCustomer,
+quantity: quantity,
+deliveryDate: deliveryDate || null,
+totalPrice: currentProduct.price * quantity
+};
+
+cart.push(cartItem);
+updateCartDisplay();
+
+// 清空輸入
+document.getElementById('productId').value = '';
+document.getElementById('customerId').value = '';
+document.getElementById('quantity').value = '1';
+document.getElementById('deliveryDate').value = '';
+document.getElementById('productInfo').innerHTML = '';
+document.getElementById('customerInfo').innerHTML = '';
+currentProduct = null;
+currentCustomer = null;
+
+alert('Added to cart!');
+}
+
+// 更新購物車顯示
+function updateCartDisplay() {
+// 購物車內容改變後視為新的訂單
+cartSubmissionId = null;
+const cartItemsDiv = document.getElementById('cartItems');
+
+if (cart.length === 0) {
+cartItemsDiv.innerHTML = '<p style="color: #999;">Cart is empty</p>';
+return;
+}
+
+let html = '';
+let grandTotal = 0;
+
+cart.forEach((item, index) => {
+grandTotal += item.totalPrice;
+const deliveryInfo = item.deliveryDate ? `Delivery: ${item.deliveryDate}` : 'No delivery date set';
+html += `
+<div class="cart-item">
+<div class="cart-item-info">
+<div class="cart-item-name">${item.product.name}</div>
+<div class="cart-item-details">
+Customer: ${item.customer.name} | 
+Product ID: ${item.product.id} | 
+Unit Price: $${item.product.price} | 
+Quantity: ${item.quantity}
+</div>
+<div class="cart-item-details" style="color: #e76f51; margin-top: 5px;">
+📅 ${deliveryInfo}
+</div>
+</div>
+<div class="cart-item-price">$${item.totalPrice.toFixed(2)}</div>
+<button class="cart-item-remove" onclick="removeFromCart(${index})">Remove</button>
+</div>
+`;
+});
+
+html += `
+<div class="cart-summary">
+<div>Total: <span class="cart-summary-total">$${grandTotal.toFixed(2)}</span></div>
+<div style="font-size: 0.9em; margin-top: 5px;">${cart.length} items</div>
+</div>
+`;
+
+cartItemsDiv.innerHTML = html;
+}
+
+// 從購物車移除
+function removeFromCart(index) {
+cart.splice(index, 1);
+updateCartDisplay();
+}
+
+// 清空購物車
+function clearCart() {
+if (cart.length === 0) {
+alert('Cart is already empty');
+return;
+}
+
+if (confirm('Are you sure you want to clear the cart?')) {
+cart = [];
+updateCartDisplay();
+}
+}
+
+// 提交訂單
+function submitOrder() {
+if (cart.length === 0) {
+alert('Cart is empty, cannot submit order');
+return;
+}
+
+if (!confirm(`Are you sure you want to submit ${cart.length} orders?`)) {
+return;
+}
+
+// 按客戶和送貨日期分組訂單
+const groupedOrders = {};
+
+cart.forEach(item => {
+const key = `${item.customer.id}_${item.deliveryDate || 'no-date'}`;
+if (!groupedOrders[key]) {
+groupedOrders[key] = {
+customer_id: item.customer.id,
+delivery_date: item.deliveryDate,
+items: []
+};
+}
+groupedOrders[key].items.push({
+product_id: item.product.id,
+quantity: item.quantity
+});
+});
+
+// 為每組創建發票（重新提交同一購物車時，伺服器會直接回傳第一次的結果，不會重複加入數量）
+if (!cartSubmissionId) {
+cartSubmissionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+const promises = Object.entries(groupedOrders).map(([key, orderGroup]) => {
+return fetch('/api/invoices/create', {
+method: 'POST',
+headers: {
+'Content-Type': 'application/json',
+'Idempotency-Key': `${cartSubmissionId}:${key}`
+},
+body: JSON.stringify(orderGroup)
+});
+});
+
+Promise.all(promises)
+.then(responses => Promise.all(responses.map(r => r.json())))
+.then(results => {
+alert(`Successfully created/updated ${results.length} invoice(s)!`);
+cart = [];
+updateCartDisplay();
+// 跳轉到發票列表
+window.location.href = '/invoices';
+})
+.catch(error => {
+console.error('Error submitting orders:', error);
+alert('Error occurred while submitting orders');
+});
+}
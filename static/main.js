@@ -1,14 +1,32 @@
 
 /* Index DashBoard */
-async function loadMessages() {
-      const res = await fetch("/api/messages/");
-      const data = await res.json();
+let lastMessageId = 0;
+let messageStream = null;
+
+function appendMessages(messages) {
       const list = document.getElementById("messages");
-      list.innerHTML = "";
-      data.forEach(m => {
+      messages.forEach(m => {
+        if (m.id <= lastMessageId) return;
         const li = document.createElement("li");
         li.textContent = `${m.user}: ${m.content}`;
         list.appendChild(li);
+        lastMessageId = m.id;
+      });
+    }
+
+async function loadMessages() {
+      // 只取比目前最新 id 更新的留言
+      const url = lastMessageId ? `/api/messages/?since_id=${lastMessageId}` : "/api/messages/";
+      const res = await fetch(url);
+      appendMessages(await res.json());
+      subscribeMessages();
+    }
+
+function subscribeMessages() {
+      if (messageStream || !window.EventSource) return;
+      messageStream = new EventSource(`/api/messages/stream?since_id=${lastMessageId}`);
+      messageStream.addEventListener("message", event => {
+        appendMessages([JSON.parse(event.data)]);
       });
     }
 
@@ -25,7 +43,8 @@ async function addMessage() {
       const data = await res.json();
       alert(data.message);
       document.getElementById("content").value = "";
-      loadMessages();
+      // 有 SSE 串流時新留言會自動推送，否則增量補抓
+      if (!messageStream) loadMessages();
     }
 
     window.onload = loadMessages;
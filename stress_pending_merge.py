@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+待處理發票合併的併發壓力測試
+每一輪讓多個執行緒同時對同一客戶、同一送貨日期呼叫 /api/invoices/create，
+檢查最後只有一張待處理發票、所有訂單項目都有合併進去、總金額與銷售彙總一致、發票編號不重複。
+
+預設使用臨時 SQLite 數據庫；--database-url 可指定 PostgreSQL 等測試用數據庫（所有資料表會被清空重建）
+
+用法:
+    python stress_pending_merge.py
+    python stress_pending_merge.py --rounds 50 --threads 16
+    python stress_pending_merge.py --database-url postgresql://localhost/verduno_stress
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+parser = argparse.ArgumentParser(description='Concurrent stress test for merging orders into pending invoices')
+parser.add_argument('--rounds', type=int, default=20, help='測試的 (客戶, 送貨日期) 組數')
+parser.add_argument('--threads', type=int, default=8, help='每組同時送出的請求數')
+parser.add_argument('--database-url', help='測試用數據庫（會清空所有資料表），預設為臨時 SQLite')
+args = parser.parse_args()
+
+# 必須在載入 app 之前指定數據庫，避免覆蓋開發數據庫
+os.environ['DATABASE_URL'] = args.database_url or \
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='stress_'), 'stress.db')}"
+os.environ['ORDER_INTAKE_WORKER'] = '0'
+
+from sqlalchemy import insert
+
+from app import app
+from models import db, Product, Customer, Invoice, InvoiceEvent, SalesDaily
+from rollups import rebuild_sales_rollup
+
+BASE_DATE = date(2030, 1, 1)
+PRICES = {'S0001': 10.0, 'S0002': 2.5}
+ITEMS = [{'product_id': 'S0001', 'quantity': 1}, {'product_id': 'S0002', 'quantity': 2}]
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(Product), [
+        {'id': product_id, 'name': f'Stress Cut {product_id}', 'price': price, 'subclass': 'Beef'}
+        for product_id, price in PRICES.items()
+    ])
+    db.session.execute(insert(Customer), [{
+        'id': i + 1,
+        'name': f'Stress Customer {i + 1}',
+        'email': f'stress{i + 1}@stress.local',
+        'password': 'x',
+        'special_item_ids': '[]'
+    } for i in range(args.rounds)])
+    db.session.commit()
+
+
+def run_round(round_index, statuses):
+    payload = {
+        'customer_id': round_index + 1,
+        'delivery_date': (BASE_DATE + timedelta(days=round_index)).strftime('%Y-%m-%d'),
+        'items': ITEMS
+    }
+    barrier = threading.Barrier(args.threads)
+    lock = threading.Lock()
+
+    def submit():
+        client = app.test_client()
+        barrier.wait()
+        response = client.post('/api/invoices/create', json=payload)
+        with lock:
+            statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=submit) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def check():
+    """回傳錯誤訊息列表"""
+    errors = []
+    expected_items = args.threads * len(ITEMS)
+    expected_total = args.threads * sum(PRICES[i['product_id']] * i['quantity'] for i in ITEMS)
+
+    for round_index in range(args.rounds):
+        invoices = Invoice.query.filter_by(
+            customer_id=round_index + 1,
+            delivery_date=BASE_DATE + timedelta(days=round_index),
+            status='Pending'
+        ).all()
+        if len(invoices) != 1:
+            errors.append(f'round {round_index}: {len(invoices)} pending invoices')
+            continue
+        invoice = invoices[0]
+        if len(invoice.order_items) != expected_items:
+            errors.append(f'round {round_index}: {len(invoice.order_items)} items, expected {expected_items}')
+        if abs(invoice.total_amount - expected_total) > 1e-6:
+            errors.append(f'round {round_index}: total {invoice.total_amount}, expected {expected_total}')
+        actions = Counter(e.action for e in InvoiceEvent.query.filter_by(invoice_id=invoice.id))
+        if actions['created'] != 1 or actions['merged'] != args.threads - 1:
+            errors.append(f'round {round_index}: events {dict(actions)}')
+
+    numbers = [n for (n,) in db.session.query(Invoice.invoice_number)]
+    if len(numbers) != len(set(numbers)):
+        errors.append('duplicate invoice numbers')
+    if any(n.startswith('PENDING-') for n in numbers):
+        errors.append('invoice left with a placeholder number')
+
+    # 增量維護的銷售彙總必須與完整重建的結果相同
+    def rollup():
+        return sorted(tuple(row) for row in db.session.query(
+            SalesDaily.sales_date, SalesDaily.product_id, SalesDaily.customer_id,
+            SalesDaily.quantity, SalesDaily.revenue, SalesDaily.line_count))
+    incremental = rollup()
+    rebuild_sales_rollup()
+    if incremental != rollup():
+        errors.append('sales_daily differs from a full rebuild')
+    return errors
+
+
+def main():
+    print("=" * 60)
+    print("🔀 PENDING INVOICE MERGE STRESS TEST")
+    print("=" * 60)
+    print(f"  {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print(f"  {args.rounds} rounds x {args.threads} concurrent requests")
+
+    with app.app_context():
+        seed()
+
+    statuses = Counter()
+    start = time.perf_counter()
+    for round_index in range(args.rounds):
+        run_round(round_index, statuses)
+    elapsed = time.perf_counter() - start
+    print(f"\n  Responses: {dict(statuses)} in {elapsed:.2f}s")
+
+    with app.app_context():
+        errors = check()
+    if statuses.keys() != {201}:
+        errors.append(f'unexpected response codes: {dict(statuses)}')
+
+    if errors:
+        print(f"\n❌ {len(errors)} problem(s) found")
+        for error in errors:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("\n✅ Exactly one pending invoice per customer and delivery date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+共用的背景 process pool（CPU 密集的工作：PDF 生成、密碼雜湊）
+每種工作一個 pool，第一次使用時建立，之後在同一個 worker 內重複使用
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def process_pool(name, max_workers):
+    """取得名稱為 name 的 process pool；max_workers <= 1 時回傳 None（呼叫端直接在目前行程執行）"""
+    if max_workers <= 1:
+        return None
+    with _pools_lock:
+        if name not in _pools:
+            # 使用 spawn，避免 fork 出帶有背景執行緒（metrics、profiler）狀態的子行程
+            _pools[name] = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pools[name]